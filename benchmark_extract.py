@@ -0,0 +1,284 @@
+"""
+extract_excel_result 效能基準測試
+
+以合成的大型賽事成績（1 萬 / 10 萬 / 100 萬完賽者）逐段量測：
+    parse_group     完賽時間轉秒數 + 依 (賽別, 分組) 分組（group_seconds_from_frame）
+    histograms      build_histograms
+    sorted_seconds  build_sorted_seconds
+    output_js       iter_event_entries + output_event_js（含 compact 版本）
+    excel_read      （--excel 時）讀取 Excel
+
+每一段記錄 wall time（取 --repeat 次中最快的一次）與 tracemalloc 峰值，
+結果寫成 JSON；加上 --compare 可與舊結果比對，變慢超過門檻時回傳非 0。
+
+用法：
+    python benchmark_extract.py
+    python benchmark_extract.py --sizes 10000 100000 --repeat 3 --output bench.json
+    python benchmark_extract.py --compare bench_baseline.json --threshold 1.25
+"""
+import os
+import io
+import sys
+import json
+import time
+import argparse
+import platform
+import tempfile
+import tracemalloc
+import contextlib
+from datetime import datetime
+import numpy as np
+import pandas as pd
+
+from extract_excel_result import (
+    group_seconds_from_frame,
+    build_histograms,
+    build_sorted_seconds,
+    iter_event_entries,
+    create_metadata,
+    output_event_js,
+    read_excel_frame,
+    seconds_to_time_str,
+)
+
+
+# ========= 合成成績產生器 =========
+
+# 賽別：(人數比例, 中位數秒數, 對數常態 sigma, 關門秒數)
+RACE_PROFILES = {
+    "全程馬拉松(42.195KM)": (0.35, 4 * 3600 + 50 * 60, 0.17, 7 * 3600),
+    "半程馬拉松(21.0975km)": (0.45, 2 * 3600 + 20 * 60, 0.18, 3 * 3600 + 30 * 60),
+    "11KM": (0.20, 1 * 3600 + 12 * 60, 0.20, 2 * 3600),
+}
+
+# 分組：(人數比例, 速度係數；< 1 表示較快)
+GROUP_PROFILES = {
+    "男19歲-": (0.03, 0.98),
+    "男20-29歲": (0.12, 0.94),
+    "男30-39歲": (0.16, 0.93),
+    "男40-49歲": (0.16, 0.95),
+    "男50-59歲": (0.09, 1.00),
+    "男60歲+": (0.04, 1.08),
+    "女19歲-": (0.02, 1.08),
+    "女20-29歲": (0.09, 1.06),
+    "女30-39歲": (0.11, 1.05),
+    "女40-49歲": (0.10, 1.07),
+    "女50-59歲": (0.05, 1.12),
+    "女60歲+": (0.02, 1.20),
+    "男視障選手": (0.004, 1.10),
+    "女視障選手": (0.002, 1.18),
+    "男輪椅組": (0.003, 0.70),
+    "女輪椅組": (0.001, 0.78),
+}
+
+# 沒有完賽成績的比例與寫法（與 INVALID_TIME_TOKENS 對應）
+DNF_RATIO = 0.02
+DNF_TOKENS = ["DNF", "DNS", "--", "-"]
+
+DEFAULT_SIZES = [10_000, 100_000, 1_000_000]
+
+
+def _normalized(profiles: dict) -> tuple[list[str], np.ndarray]:
+    names = list(profiles)
+    weights = np.array([profiles[n][0] for n in names], dtype=float)
+    return names, weights / weights.sum()
+
+
+def generate_results(n_finishers: int, seed: int = 0) -> pd.DataFrame:
+    """
+    產生 n_finishers 位完賽者（另加約 DNF_RATIO 的未完賽列）的成績 DataFrame，
+    欄位與 scrap_result 輸出的 Excel 相同（賽別 / 分組 / 完賽時間 為 'HH:MM:SS' 字串）。
+    完賽時間依賽別取對數常態分布，再乘上分組速度係數，並截在關門時間內。
+    """
+    rng = np.random.default_rng(seed)
+    n_dnf = int(round(n_finishers * DNF_RATIO))
+    n_rows = n_finishers + n_dnf
+
+    race_names, race_weights = _normalized(RACE_PROFILES)
+    group_names, group_weights = _normalized(GROUP_PROFILES)
+    race_idx = rng.choice(len(race_names), size=n_rows, p=race_weights)
+    group_idx = rng.choice(len(group_names), size=n_rows, p=group_weights)
+
+    median = np.array([RACE_PROFILES[r][1] for r in race_names], dtype=float)[race_idx]
+    sigma = np.array([RACE_PROFILES[r][2] for r in race_names], dtype=float)[race_idx]
+    cutoff = np.array([RACE_PROFILES[r][3] for r in race_names], dtype=float)[race_idx]
+    factor = np.array([GROUP_PROFILES[g][1] for g in group_names], dtype=float)[group_idx]
+
+    seconds = median * factor * np.exp(rng.standard_normal(n_rows) * sigma)
+    seconds = np.clip(np.rint(seconds), median * 0.45, cutoff).astype(np.int64)
+    times = pd.Series([seconds_to_time_str(int(s)) for s in seconds], dtype=object)
+
+    dnf_rows = rng.choice(n_rows, size=n_dnf, replace=False)
+    times.iloc[dnf_rows] = rng.choice(DNF_TOKENS, size=n_dnf)
+
+    return pd.DataFrame({
+        "姓名": "跑者",
+        "背號": np.arange(1, n_rows + 1).astype(str),
+        "賽別": np.asarray(race_names, dtype=object)[race_idx],
+        "賽事類型": np.asarray(race_names, dtype=object)[race_idx],
+        "分組": np.asarray(group_names, dtype=object)[group_idx],
+        "完賽時間": times,
+    })
+
+
+def synthetic_event_config(n_finishers: int) -> dict:
+    return {
+        "id": f"bench_{n_finishers}",
+        "name": f"合成賽事（{n_finishers:,} 人）",
+        "date": "2026-01-01",
+        "race_types": list(RACE_PROFILES),
+        "total_count": 0,
+    }
+
+
+# ========= 量測工具 =========
+
+def measure(fn, repeat: int = 1, trace_memory: bool = True) -> tuple[object, dict]:
+    """
+    執行 fn() repeat 次取最快 wall time，另以 tracemalloc 再跑一次量峰值記憶體
+    （tracemalloc 本身會拖慢 Python 物件配置，所以不和計時混在同一次）。
+    各階段的 print 一律吞掉，避免 100 萬人時洗版。
+    """
+    timings = []
+    result = None
+    for _ in range(max(repeat, 1)):
+        with contextlib.redirect_stdout(io.StringIO()):
+            started = time.perf_counter()
+            result = fn()
+            timings.append(time.perf_counter() - started)
+
+    stats = {
+        "wall_sec": round(min(timings), 4),
+        "wall_sec_runs": [round(t, 4) for t in timings],
+    }
+    if trace_memory:
+        tracemalloc.start()
+        try:
+            with contextlib.redirect_stdout(io.StringIO()):
+                fn()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+        stats["peak_tracemalloc_mb"] = round(peak / 2**20, 2)
+    return result, stats
+
+
+def bench_size(n_finishers: int, repeat: int, seed: int, with_excel: bool,
+               trace_memory: bool, work_dir: str) -> dict:
+    """對單一規模跑完所有階段，回傳 {"finishers", "rows", "groups", "stages": {...}}"""
+    print(f"🧪 產生 {n_finishers:,} 位完賽者的合成成績...")
+    df = generate_results(n_finishers, seed)
+    event_config = synthetic_event_config(n_finishers)
+    stages: dict[str, dict] = {}
+
+    if with_excel:
+        excel_path = os.path.join(work_dir, f"bench_{n_finishers}.xlsx")
+        print("   寫出 Excel（不計時）...")
+        df.to_excel(excel_path, index=False)
+        _, stages["excel_read"] = measure(lambda: read_excel_frame(excel_path), repeat, trace_memory)
+        stages["excel_read"]["bytes"] = os.path.getsize(excel_path)
+
+    group_seconds, stages["parse_group"] = measure(lambda: group_seconds_from_frame(df), repeat, trace_memory)
+    _, stages["histograms"] = measure(lambda: build_histograms(group_seconds), repeat, trace_memory)
+    _, stages["sorted_seconds"] = measure(lambda: build_sorted_seconds(group_seconds), repeat, trace_memory)
+
+    for name, compact in (("output_js", False), ("output_js_compact", True)):
+        js_path = os.path.join(work_dir, f"bench_{n_finishers}_{name}.js")
+
+        def write_js():
+            metadata = create_metadata(event_config)
+            output_event_js(iter_event_entries(group_seconds, event_config), metadata, js_path, compact=compact)
+
+        _, stages[name] = measure(write_js, repeat, trace_memory)
+        stages[name]["bytes"] = os.path.getsize(js_path)
+
+    for name, s in stages.items():
+        line = f"   ⏱️ {name:<18} {s['wall_sec']:>8.3f}s"
+        if "peak_tracemalloc_mb" in s:
+            line += f"  peak {s['peak_tracemalloc_mb']:>8.1f} MB"
+        print(line)
+
+    return {
+        "finishers": n_finishers,
+        "rows": len(df),
+        "groups": len(group_seconds),
+        "stages": stages,
+    }
+
+
+# ========= 與舊結果比對 =========
+
+def compare_results(current: dict, baseline: dict, threshold: float) -> list[str]:
+    """
+    比對同規模、同階段的 wall time，回傳變慢超過 threshold 倍的描述。
+    只比對兩邊都有的規模 / 階段；極短的階段（< 10ms）忽略，避免計時雜訊。
+    """
+    base_runs = {r["finishers"]: r for r in baseline.get("runs", [])}
+    regressions = []
+    for run in current["runs"]:
+        base = base_runs.get(run["finishers"])
+        if base is None:
+            continue
+        for stage, stats in run["stages"].items():
+            old = base["stages"].get(stage, {}).get("wall_sec")
+            if not old or max(old, stats["wall_sec"]) < 0.01:
+                continue
+            ratio = stats["wall_sec"] / old
+            if ratio > threshold:
+                regressions.append(
+                    f"{run['finishers']:,} 人 / {stage}: {old:.3f}s → {stats['wall_sec']:.3f}s（×{ratio:.2f}）"
+                )
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="extract_excel_result 各階段效能基準測試（合成資料）")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES,
+                        help="完賽人數規模（預設 10000 100000 1000000）")
+    parser.add_argument("--repeat", type=int, default=1, help="每階段重複次數，取最快一次")
+    parser.add_argument("--seed", type=int, default=0, help="合成資料的亂數種子")
+    parser.add_argument("--excel", action="store_true",
+                        help="額外量測讀取 Excel（需先寫出 xlsx，100 萬人時很慢）")
+    parser.add_argument("--no-memory", action="store_true", help="不跑 tracemalloc（只計時）")
+    parser.add_argument("--output", default="bench_results.json", help="結果 JSON 路徑")
+    parser.add_argument("--compare", help="舊的結果 JSON；任一階段變慢超過門檻則回傳 1")
+    parser.add_argument("--threshold", type=float, default=1.2,
+                        help="--compare 的變慢門檻倍數（預設 1.2）")
+    args = parser.parse_args()
+
+    report = {
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "environment": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "pandas": pd.__version__,
+            "platform": platform.platform(),
+            "cpu_count": os.cpu_count(),
+        },
+        "seed": args.seed,
+        "repeat": args.repeat,
+        "runs": [],
+    }
+    with tempfile.TemporaryDirectory(prefix="bench_extract_") as work_dir:
+        for n in args.sizes:
+            report["runs"].append(bench_size(n, args.repeat, args.seed, args.excel,
+                                             not args.no_memory, work_dir))
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"✅ 輸出：{args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare_results(report, baseline, args.threshold)
+        if regressions:
+            print(f"❌ {len(regressions)} 個階段變慢超過 ×{args.threshold}：")
+            for line in regressions:
+                print(f"   {line}")
+            sys.exit(1)
+        print(f"✅ 與 {args.compare} 相比沒有超過 ×{args.threshold} 的退步")
+
+
+if __name__ == "__main__":
+    main()
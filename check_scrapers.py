@@ -0,0 +1,537 @@
+"""
+scrap_result 離線檢查：對 standin_rank_site 的本機假成績頁跑爬蟲，與假資料的正確答案比對。
+
+    python check_scrapers.py
+    python check_scrapers.py --only http_full http_missing_page --verbose
+
+不需要網路與 Chrome；每個檢查印出 ✅ / ❌，任何一項失敗就回傳 1。
+"""
+import io
+import os
+import sys
+import json
+import base64
+import argparse
+import tempfile
+import traceback
+import contextlib
+import subprocess
+
+import scrap_result
+from scrap_result import (
+    ScrapeFingerprints,
+    ScrapeIncompleteError,
+    ScrapeTaskError,
+    run_driver_pool,
+    scrape_contest_http,
+)
+from extract_excel_result import EVENTS
+from standin_rank_site import GROUPS, RACES, StandinSite, start_standin_server
+
+SCRAP_RESULT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "scrap_result.py")
+PUBLISH_EVENT = os.path.join(os.path.dirname(os.path.abspath(__file__)), "publish_event.py")
+NETWORK_FIXTURE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "fixtures", "network_capture_11km.json")
+
+# 名稱 -> 檢查函式 fn(site, base_url, work_dir)；失敗時丟 AssertionError
+CHECKS: dict = {}
+
+
+def check(fn):
+    CHECKS[fn.__name__.removeprefix("check_")] = fn
+    return fn
+
+
+def run_main(base_url: str, work_dir: str, *args) -> subprocess.CompletedProcess:
+    """在 work_dir 裡以子行程執行 scrap_result.py（輸出檔、checkpoint、指紋檔都留在 work_dir）"""
+    return subprocess.run([sys.executable, SCRAP_RESULT, "--backend", "http", "--base-url", base_url, *args],
+                          cwd=work_dir, capture_output=True, text=True, encoding="utf-8")
+
+
+# ========= HTTP 後端 =========
+
+@check
+def check_http_full(site, base_url, work_dir):
+    """完整抓取與假資料完全相同，且與併發數無關"""
+    expected = site.expected_records()
+    for workers in (1, 8):
+        records = scrape_contest_http(base_url, workers)
+        assert records == expected, f"workers={workers}：{len(records)} 筆，預期 {len(expected)} 筆"
+
+
+@check
+def check_http_transient_failure(site, base_url, work_dir):
+    """第 1 頁與中間頁各失敗一次（404 不會被 urllib3 重試），下一輪重抓後結果仍完整"""
+    site.control({"op": "fail", "race": "1001", "group": "男30-39歲", "page": 3, "times": 1, "status": 404})
+    site.control({"op": "fail", "race": "1002", "group": "男19歲-", "page": 1, "times": 1, "status": 404})
+    assert scrape_contest_http(base_url, 4) == site.expected_records()
+
+
+@check
+def check_http_missing_page(site, base_url, work_dir):
+    """中間頁一直失敗：丟出 ScrapeIncompleteError，列出缺的頁"""
+    site.control({"op": "fail", "race": "1001", "group": "男30-39歲", "page": 3, "times": -1, "status": 404})
+    try:
+        scrape_contest_http(base_url, 4)
+    except ScrapeIncompleteError as e:
+        assert e.missing == ["全程馬拉松(42.195KM) / 男30-39歲 第 3 頁"], e.missing
+    else:
+        raise AssertionError("缺頁卻沒有丟出 ScrapeIncompleteError")
+
+
+@check
+def check_http_missing_first_page(site, base_url, work_dir):
+    """第 1 頁一直失敗：該分組的總頁數未知，不能當成只有 1 頁"""
+    site.control({"op": "fail", "race": "1003", "group": "女20-29歲", "page": 1, "times": -1, "status": 404})
+    try:
+        scrape_contest_http(base_url, 4)
+    except ScrapeIncompleteError as e:
+        assert e.missing == ["11KM / 女20-29歲（第 1 頁，總頁數未知）"], e.missing
+    else:
+        raise AssertionError("第 1 頁失敗卻沒有丟出 ScrapeIncompleteError")
+
+
+@check
+def check_main_exit_code(site, base_url, work_dir):
+    """抓取不完整時 main 回傳非 0 且不寫 Excel；完整時回傳 0 並寫出 Excel"""
+    site.control({"op": "fail", "race": "1002", "group": "女30-39歲", "page": 2, "times": -1, "status": 404})
+    proc = run_main(base_url, work_dir, "--output", "partial.xlsx")
+    assert proc.returncode == 1, f"returncode={proc.returncode}\n{proc.stdout[-500:]}"
+    assert not os.path.exists(os.path.join(work_dir, "partial.xlsx")), "不完整的結果不應寫出 Excel"
+
+    site.control({"op": "reset"})
+    proc = run_main(base_url, work_dir, "--output", "full.xlsx")
+    assert proc.returncode == 0, f"returncode={proc.returncode}\n{proc.stdout[-500:]}"
+    assert os.path.exists(os.path.join(work_dir, "full.xlsx"))
+
+
+# ========= 增量更新（每頁指紋） =========
+
+def crawl_with_fingerprints(base_url: str, path: str, incremental: bool,
+                            verify_pages: bool = False) -> tuple[list, ScrapeFingerprints]:
+    fingerprints = ScrapeFingerprints(path, incremental=incremental, verify_pages=verify_pages)
+    records = scrape_contest_http(base_url, 4, fingerprints=fingerprints)
+    fingerprints.save()
+    return records, fingerprints
+
+
+def middle_correction(site, race: str, group: str, page: int) -> dict:
+    """把第 page 頁中間一位跑者的完賽時間改 1 秒但不改變名次（模擬晶片時間更正）"""
+    rows = site.runners(race, group)
+    start = (page - 1) * 20
+    for index in range(start + 5, start + 15):
+        if rows[index - 1][4] < rows[index][4] + 1 < rows[index + 1][4]:
+            return {"op": "time", "race": race, "group": group, "index": int(rows[index][1][-4:]),
+                    "sec": rows[index][4] + 1}
+    raise AssertionError("找不到可以只改時間、不改名次的跑者")
+
+
+@check
+def check_incremental_middle_page(site, base_url, work_dir):
+    """--verify-pages：中間頁的成績更正（總頁數、第 1 頁、最後一頁都沒變）也會被抓到並列為變動"""
+    path = os.path.join(work_dir, "fingerprints.json")
+    crawl_with_fingerprints(base_url, path, incremental=False)
+    site.control(middle_correction(site, "1001", "男30-39歲", 3))
+
+    records, fingerprints = crawl_with_fingerprints(base_url, path, incremental=True, verify_pages=True)
+    assert records == site.expected_records(), "增量更新的結果應與重新完整抓取相同"
+    race = RACES["1001"]
+    assert fingerprints.changed_pages(race, "男30-39歲") == [3], fingerprints.changed_pages(race, "男30-39歲")
+    changed = [key for key in fingerprints.current if not fingerprints.unchanged(*key)]
+    assert changed == [(race, "男30-39歲")], changed
+
+
+@check
+def check_incremental_dq(site, base_url, work_dir):
+    """--verify-pages 與中段 DQ（刪一筆、總頁數不變）：被刪的那頁到最後一頁都列為變動，結果與完整抓取相同"""
+    path = os.path.join(work_dir, "fingerprints.json")
+    crawl_with_fingerprints(base_url, path, incremental=False)
+    rows = site.runners("1002", "女30-39歲")
+    rank = next(i for i, row in enumerate(rows) if row[1].endswith("0030"))
+    site.control({"op": "remove", "race": "1002", "group": "女30-39歲", "index": 30})
+    assert site.total_pages("1002", "女30-39歲") == -(-len(rows) // 20), "測試資料應維持相同總頁數"
+
+    records, fingerprints = crawl_with_fingerprints(base_url, path, incremental=True, verify_pages=True)
+    assert records == site.expected_records()
+    pages = fingerprints.changed_pages(RACES["1002"], "女30-39歲")
+    assert pages == list(range(rank // 20 + 1, -(-len(rows) // 20) + 1)), (rank, pages)
+
+
+def read_output_records(path: str) -> list:
+    import pandas as pd
+    df = pd.read_excel(path, sheet_name="完整成績", dtype=str, keep_default_na=False)
+    return sorted(map(tuple, df[scrap_result.RECORD_COLUMNS].values.tolist()))
+
+
+@check
+def check_incremental_skip(site, base_url, work_dir):
+    """--incremental：沒變的分組只探測第 1 頁與最後一頁、沿用資料集；有變的分組重抓後合併，結果與完整抓取相同"""
+    proc = run_main(base_url, work_dir, "--dataset", "ds", "--no-checkpoint", "--output", "full.xlsx")
+    assert proc.returncode == 0, proc.stdout[-500:]
+    totals = {(race, group): site.total_pages(race, group) for race in RACES for group in GROUPS[race]}
+    overhead = site.hits - sum(totals.values())
+
+    # 女30-39歲 中段 DQ：第 1 頁沒變、最後一頁變了；男30-39歲 第 1 名成績更正：第 1 頁變了
+    site.control({"op": "reset"})
+    site.control({"op": "remove", "race": "1002", "group": "女30-39歲", "index": 30})
+    site.control({"op": "time", "race": "1001", "group": "男30-39歲",
+                  "index": int(site.runners("1001", "男30-39歲")[0][1][-4:]), "sec": 3000})
+    changed = {("1002", "女30-39歲"), ("1001", "男30-39歲")}
+    assert all(site.total_pages(*key) == totals[key] for key in changed), "測試資料應維持相同總頁數"
+
+    proc = run_main(base_url, work_dir, "--dataset", "ds", "--no-checkpoint", "--incremental",
+                    "--excel", "--output", "incremental.xlsx")
+    assert proc.returncode == 0, proc.stdout[-500:]
+    expected_hits = overhead + sum(
+        total if key in changed else 1 + (total > 1) for key, total in totals.items())
+    assert site.hits == expected_hits, f"預期 {expected_hits} 個請求，實際 {site.hits}"
+    expected = sorted(tuple(r[c] for c in scrap_result.RECORD_COLUMNS) for r in site.expected_records())
+    assert read_output_records(os.path.join(work_dir, "incremental.xlsx")) == expected, "合併後的結果應與完整抓取相同"
+    with open(os.path.join(work_dir, "ds", "stats.json"), encoding="utf-8") as f:
+        assert json.load(f)["total"] == len(expected)
+
+    # 沒有任何變動時也不寫壞資料集：再跑一次，結果不變
+    proc = run_main(base_url, work_dir, "--dataset", "ds", "--no-checkpoint", "--incremental",
+                    "--excel", "--output", "again.xlsx")
+    assert proc.returncode == 0, proc.stdout[-500:]
+    assert read_output_records(os.path.join(work_dir, "again.xlsx")) == expected
+
+
+# ========= 分頁資料集 =========
+
+def dataset_files(dataset_dir: str) -> list:
+    return sorted(os.path.relpath(os.path.join(root, name), dataset_dir)
+                  for root, _, names in os.walk(dataset_dir) for name in names)
+
+
+@check
+def check_dataset_fresh_run(site, base_url, work_dir):
+    """重新執行時舊資料集裡已消失的分組、多出來的頁不會留在 stats.json；不完整的執行不動上次的資料集"""
+    dataset = os.path.join(work_dir, "ds")
+    proc = run_main(base_url, work_dir, "--dataset", "ds", "--no-checkpoint")
+    assert proc.returncode == 0, proc.stdout[-500:]
+    first_files = dataset_files(dataset)
+
+    # 上次留下、這次網站上已不存在的分組與頁
+    race_dir = scrap_result._partition_name("11KM")
+    stale_group = os.path.join(dataset, race_dir, scrap_result._partition_name("男99歲+"))
+    os.makedirs(stale_group)
+    page_file = next(f for f in first_files if f.startswith(race_dir) and "page-00001" in f)
+    for target in (os.path.join(stale_group, "page-00001" + os.path.splitext(page_file)[1]),
+                   os.path.join(dataset, os.path.dirname(page_file), "page-00009" + os.path.splitext(page_file)[1])):
+        with open(os.path.join(dataset, page_file), "rb") as src, open(target, "wb") as dst:
+            dst.write(src.read())
+
+    site.control({"op": "fail", "race": "1001", "group": "男40-49歲", "page": 2, "times": -1, "status": 404})
+    proc = run_main(base_url, work_dir, "--dataset", "ds", "--no-checkpoint")
+    assert proc.returncode == 1, proc.stdout[-500:]
+    assert len(dataset_files(dataset)) == len(first_files) + 2, "不完整的執行不應改動上次的資料集"
+
+    site.control({"op": "reset"})
+    proc = run_main(base_url, work_dir, "--dataset", "ds", "--no-checkpoint")
+    assert proc.returncode == 0, proc.stdout[-500:]
+    assert dataset_files(dataset) == first_files, "資料集應只剩這次寫入的頁"
+    with open(os.path.join(dataset, "stats.json"), encoding="utf-8") as f:
+        assert json.load(f)["total"] == len(site.expected_records())
+
+
+@check
+def check_dataset_resume(site, base_url, work_dir):
+    """--resume：checkpoint 裡的頁也寫進這次的資料集，補抓後資料集完整"""
+    site.control({"op": "fail", "race": "1002", "group": "男30-39歲", "page": 4, "times": -1, "status": 404})
+    proc = run_main(base_url, work_dir, "--dataset", "ds")
+    assert proc.returncode == 1, proc.stdout[-500:]
+
+    site.control({"op": "reset"})
+    proc = run_main(base_url, work_dir, "--dataset", "ds", "--resume")
+    assert proc.returncode == 0, proc.stdout[-500:]
+    assert site.hits == 1 + 3 + 1, f"--resume 應只補抓缺的那一頁（加上選單），實際 {site.hits} 個請求"
+    with open(os.path.join(work_dir, "ds", "stats.json"), encoding="utf-8") as f:
+        assert json.load(f)["total"] == len(site.expected_records())
+
+
+@check
+def check_dataset_partition_collision(site, base_url, work_dir):
+    """換掉不允許的字元後同名的分組（男/女、男_女、男:女）各自有資料夾，頁檔不互相覆蓋、不被誤刪"""
+    dataset = os.path.join(work_dir, "ds")
+    sink = scrap_result.PageSink(dataset)
+    expected = []
+    for group, total in (("男/女", 3), ("男_女", 1), ("男:女", 2)):
+        for page in range(1, total + 1):
+            records = [{"姓名": f"{group}{page}-{i}", "背號": f"{page}{i:03d}", "賽別": "11KM", "賽事類型": "11KM",
+                        "分組": group, "完賽時間": "01:00:00", "來源分組標籤": group} for i in range(3)]
+            sink.record_page("11KM", group, page, total, records)
+            expected.extend(records)
+    sink.close()
+    assert scrap_result.finalize_dataset(sink.staging_dir)
+    sink.publish()
+    groups = scrap_result.load_dataset_records(dataset)
+    assert sorted(r["姓名"] for rs in groups.values() for r in rs) == sorted(r["姓名"] for r in expected), list(groups)
+    assert len(os.listdir(os.path.join(dataset, scrap_result._partition_name("11KM")))) == 3
+
+
+# ========= selenium driver pool / publish_event =========
+
+class FailingWorker:
+    """假的 DriverWorker：名稱在 broken 裡的分組永遠失敗，其餘回傳一筆紀錄"""
+
+    def __init__(self, worker_id: int, broken: set):
+        self.worker_id = worker_id
+        self.broken = broken
+
+    def run(self, race_type_info, cat_info) -> list:
+        if cat_info in self.broken:
+            raise ScrapeTaskError(f"{cat_info} 壞掉了")
+        return [{"分組": cat_info}]
+
+    def reset(self):
+        pass
+
+
+@check
+def check_driver_pool_incomplete(site, base_url, work_dir):
+    """driver pool 裡重試用完的分組要丟出 ScrapeIncompleteError，而不是默默少一組"""
+    tasks = [(("全馬", "1001"), group) for group in ("A", "B", "C", "D")]
+    workers = [FailingWorker(i, {"C"}) for i in range(2)]
+    try:
+        run_driver_pool(tasks, workers, max_attempts=2)
+    except ScrapeIncompleteError as e:
+        assert e.missing == ["全馬 / C"], e.missing
+        assert [r["分組"] for r in e.records] == ["A", "B", "D"], e.records
+    else:
+        raise AssertionError("分組失敗卻沒有丟出 ScrapeIncompleteError")
+    assert run_driver_pool(tasks, [FailingWorker(0, set())]) == [{"分組": g} for g in "ABCD"]
+
+
+@check
+def check_publish_incomplete(site, base_url, work_dir):
+    """publish_event.py：抓取不完整時以非 0 結束且不覆蓋既有的 {id}_data.js"""
+    js_path = os.path.join(work_dir, "2026_chartered_tpe_data.js")
+    with open(js_path, "w", encoding="utf-8") as f:
+        f.write("// 上線中的版本\n")
+    command = [sys.executable, PUBLISH_EVENT, "--event", "2026_chartered_tpe", "--base-url", base_url]
+
+    site.control({"op": "fail", "race": "1003", "group": "女20-29歲", "page": 2, "times": -1, "status": 404})
+    proc = subprocess.run(command, cwd=work_dir, capture_output=True, text=True, encoding="utf-8")
+    assert proc.returncode == 1, f"returncode={proc.returncode}\n{proc.stdout[-500:]}"
+    with open(js_path, encoding="utf-8") as f:
+        assert f.read() == "// 上線中的版本\n", "不完整的抓取不應覆蓋線上的檔案"
+
+    site.control({"op": "reset"})
+    proc = subprocess.run(command, cwd=work_dir, capture_output=True, text=True, encoding="utf-8")
+    assert proc.returncode == 0, f"returncode={proc.returncode}\n{proc.stdout[-500:]}"
+    with open(js_path, encoding="utf-8") as f:
+        assert f"{len(site.expected_records())}人" in f.read(2000)
+
+
+@check
+def check_publish_build_record(site, base_url, work_dir):
+    """publish_event.py 發布後，Excel 沒變時 extract 略過該賽事；Excel 更新後才以 Excel 重建"""
+    event_id = "2026_chartered_tpe"
+    js_path = os.path.join(work_dir, f"{event_id}_data.js")
+    excel_path = os.path.join(work_dir, next(e["excel"] for e in EVENTS if e["id"] == event_id))
+    stale = site.expected_records()[:200]
+    scrap_result.write_results_excel(stale, excel_path)
+
+    proc = subprocess.run([sys.executable, PUBLISH_EVENT, "--event", event_id, "--base-url", base_url],
+                          cwd=work_dir, capture_output=True, text=True, encoding="utf-8")
+    assert proc.returncode == 0, proc.stdout[-500:]
+    with open(os.path.join(work_dir, ".build_cache", "builds.json"), encoding="utf-8") as f:
+        assert json.load(f)[event_id]["source"] == "publish_event"
+
+    def extract() -> str:
+        code = ("import extract_excel_result as e; "
+                f"r = e.run_builds([x for x in e.EVENTS if x['id'] == {event_id!r}], "
+                "{'compact': False, 'shards': False, 'dense_tables': False}); print('status=' + r[0]['status'])")
+        proc = subprocess.run([sys.executable, "-c", code], cwd=work_dir, capture_output=True, text=True,
+                              encoding="utf-8", env={**os.environ, "PYTHONPATH": os.path.dirname(SCRAP_RESULT)})
+        assert proc.returncode == 0, proc.stderr[-500:]
+        return proc.stdout.strip().splitlines()[-1]
+
+    assert extract() == "status=skipped", "Excel 沒變時不應用舊的 Excel 蓋掉剛發布的檔案"
+    with open(js_path, encoding="utf-8") as f:
+        assert f"{len(site.expected_records())}人" in f.read(2000)
+
+    scrap_result.write_results_excel(stale[:100], excel_path)
+    assert extract() == "status=built", "Excel 更新後應以 Excel 重新建置"
+    with open(js_path, encoding="utf-8") as f:
+        assert "100人" in f.read(2000)
+
+
+# ========= --extract network：CDP performance log 重播 =========
+
+class ReplayDriver:
+    """
+    依 fixture 重播一頁的 performance log：每次 get_log 依序吐出一批事件，
+    getResponseBody 回傳錄下的 body，頁面上第一張卡片的背號 / 頁碼取自 fixture。
+    """
+
+    def __init__(self, step: dict, session_id: str = "replay"):
+        self.session_id = session_id
+        self.step = step
+        self.polls = list(step["polls"])
+        self.quit_called = False
+
+    def get_log(self, log_type: str) -> list:
+        assert log_type == "performance", log_type
+        return self.polls.pop(0) if self.polls else []
+
+    def execute_cdp_cmd(self, command: str, params: dict) -> dict:
+        assert command == "Network.getResponseBody", command
+        return self.step["bodies"][params["requestId"]]
+
+    def execute_script(self, script: str, *args):
+        if script == scrap_result._FIRST_BIB_JS:
+            return self.step["first_bib"]
+        if script == scrap_result._PAGINATION_PAGE_JS:
+            return str(self.step["page"])
+        raise AssertionError(f"重播時不應執行其他 script：{script[:60]}")
+
+    def quit(self):
+        self.quit_called = True
+
+
+def _log_entry(method: str, **params) -> dict:
+    """Chrome performance log 的一筆（message 是 JSON 字串）"""
+    return {"level": "INFO", "timestamp": 0,
+            "message": json.dumps({"message": {"method": method, "params": params}, "webview": "page"},
+                                  ensure_ascii=False)}
+
+
+def record_network_fixture(path: str = NETWORK_FIXTURE, race: str = "1003"):
+    """
+    從假成績頁的 JSON API 產生 performance log fixture（Chrome 的事件格式），
+    每頁一步，摻入頁面實際會看到的干擾回應：
+      * 切換賽事類型時預設分組的成績列表（第一頁才有）、上一頁慢到的舊回應
+      * 符合網址特徵但不是成績列表的 summary、圖片、不符合網址特徵的設定檔、失敗的請求
+      * 目標回應的 responseReceived 與 loadingFinished 分在兩次 get_log
+    expected 是同一頁 HTML 用 parse_result_cards 解析的結果。
+    """
+    site = StandinSite()
+    base = "https://standin.local"
+    race_name = RACES[race]
+    steps = []
+    request_id = 0
+    previous_list = None
+    for group in GROUPS[race]:
+        for page in range(1, site.total_pages(race, group) + 1):
+            polls, bodies = [[], []], {}
+
+            def respond(url, payload, poll=0, finish_poll=0, resource="XHR", mime="application/json",
+                        encode=False, failed=False):
+                nonlocal request_id
+                request_id += 1
+                rid = f"{request_id}.1"
+                polls[poll].append(_log_entry("Network.responseReceived", requestId=rid, type=resource,
+                                              response={"url": url, "status": 200, "mimeType": mime}))
+                if failed:
+                    polls[finish_poll].append(_log_entry("Network.loadingFailed", requestId=rid,
+                                                         errorText="net::ERR_ABORTED"))
+                    return
+                polls[finish_poll].append(_log_entry("Network.loadingFinished", requestId=rid))
+                text = payload if isinstance(payload, str) else json.dumps(payload, ensure_ascii=False)
+                bodies[rid] = ({"body": base64.b64encode(text.encode("utf-8")).decode("ascii"), "base64Encoded": True}
+                               if encode else {"body": text, "base64Encoded": False})
+
+            if page == 1:
+                default_group = GROUPS[race][0]
+                if group != default_group:
+                    respond(f"{base}/api/rank/list?raceId={race}&group={default_group}&page=1",
+                            site.page_json(race, default_group, 1))
+                respond(f"{base}/api/rank/summary?raceId={race}", site.summary_json(race))
+            elif previous_list is not None:
+                respond(f"{base}/api/rank/list?stale=1", previous_list)
+            respond(f"{base}/static/logo.png", "", resource="Image", mime="image/png")
+            respond(f"{base}/api/config", {"locale": "zh-TW", "items": [{"name": "設定"}]})
+            respond(f"{base}/api/rank/list?raceId={race}&group={group}&page={page}&retry=1", None, failed=True)
+            payload = site.page_json(race, group, page)
+            respond(f"{base}/api/rank/list?raceId={race}&group={group}&page={page}", payload,
+                    poll=0, finish_poll=1, resource="Fetch" if page % 2 else "XHR", encode=page % 2 == 0)
+
+            expected = scrap_result.parse_result_cards(site.page_html(race, group, page), group, race_name)
+            steps.append({"race_type": race_name, "group": group, "page": page,
+                          "first_bib": expected[0]["背號"] if expected else None,
+                          "polls": polls, "bodies": bodies, "expected": expected})
+            previous_list = payload
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "w", encoding="utf-8", newline="\n") as f:
+        json.dump({"source": "standin_rank_site.py JSON API（Chrome performance log 格式）",
+                   "steps": steps}, f, ensure_ascii=False, indent=1)
+        f.write("\n")
+    print(f"✅ 輸出 fixture：{path}（{len(steps)} 頁）")
+
+
+@check
+def check_network_fixture_replay(site, base_url, work_dir):
+    """重播錄下的 performance log：每頁都挑到正確的成績 API 回應，結果與解析 HTML 相同；存下的 fixture 可離線重跑"""
+    with open(NETWORK_FIXTURE, encoding="utf-8") as f:
+        steps = json.load(f)["steps"]
+    saved_dir = os.path.join(work_dir, "saved")
+    timeout = scrap_result.WAIT_TIMEOUTS["network"]
+    scrap_result.NETWORK_FIXTURE_DIR = saved_dir
+    scrap_result.WAIT_TIMEOUTS["network"] = 2
+    try:
+        for step in steps:
+            driver = ReplayDriver(step)
+            records = scrap_result.extract_cards_from_network(driver, step["group"], step["race_type"])
+            assert records == step["expected"], f"{step['group']} 第 {step['page']} 頁解析結果不同"
+            scrap_result.release_network_capture(driver)
+    finally:
+        scrap_result.NETWORK_FIXTURE_DIR = None
+        scrap_result.WAIT_TIMEOUTS["network"] = timeout
+
+    expected = [record for step in steps for record in step["expected"]]
+    assert scrap_result.replay_network_fixtures(saved_dir) == expected, "--replay-network 結果不同"
+    assert len(os.listdir(saved_dir)) == len(steps)
+
+
+@check
+def check_network_capture_released(site, base_url, work_dir):
+    """driver 關閉時丟掉它的收集器，_network_captures 不會一直長大"""
+    with open(NETWORK_FIXTURE, encoding="utf-8") as f:
+        step = json.load(f)["steps"][0]
+    driver = ReplayDriver(step, session_id="released")
+    scrap_result.extract_cards_from_network(driver, step["group"], step["race_type"])
+    assert "released" in scrap_result._network_captures
+    worker = scrap_result.DriverWorker(0, base_url, driver)
+    worker.close()
+    assert driver.quit_called and "released" not in scrap_result._network_captures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="scrap_result 離線檢查（本機假成績頁）")
+    parser.add_argument("--only", nargs="+", choices=list(CHECKS), help="只跑指定的檢查")
+    parser.add_argument("--verbose", action="store_true", help="顯示爬蟲本身的輸出")
+    parser.add_argument("--record-network-fixture", action="store_true",
+                        help=f"重新產生 {os.path.relpath(NETWORK_FIXTURE)} 後結束")
+    args = parser.parse_args()
+    if args.record_network_fixture:
+        record_network_fixture()
+        return
+
+    server, site, base_url = start_standin_server()
+    failed = []
+    try:
+        for name in args.only or list(CHECKS):
+            site.control({"op": "reset"})
+            output = io.StringIO()
+            with tempfile.TemporaryDirectory(prefix="check_scrapers_") as work_dir:
+                try:
+                    with contextlib.redirect_stdout(sys.stdout if args.verbose else output):
+                        CHECKS[name](site, base_url, work_dir)
+                    print(f"✅ {name}")
+                except Exception:
+                    failed.append(name)
+                    print(f"❌ {name}：{CHECKS[name].__doc__.strip()}")
+                    print(traceback.format_exc().rstrip())
+    finally:
+        server.shutdown()
+
+    if failed:
+        print(f"❌ {len(failed)} 項檢查失敗：{', '.join(failed)}")
+        sys.exit(1)
+    print(f"✅ 全部 {len(args.only or CHECKS)} 項檢查通過")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,9 +1,28 @@
+import os
 import math
 import json
+import base64
+import hashlib
+import argparse
+import time
+import tracemalloc
+from contextlib import contextmanager
 from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime
+from typing import Iterable, Iterator
+import numpy as np
 import pandas as pd
 
+try:
+    import resource  # Unix：peak RSS
+except ImportError:
+    resource = None
+try:
+    import psutil  # Windows 上可選用
+except ImportError:
+    psutil = None
+
 
 # ========= 基本工具函式 =========
 
@@ -27,9 +46,112 @@ def seconds_to_time_str(sec: int) -> str:
     return f"{h:02d}:{m:02d}:{s:02d}"
 
 
+def file_sha256(path: str, chunk_size: int = 1 << 20) -> str:
+    """計算檔案內容的 sha256"""
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+# ========= ⏱️ 階段量測（wall time / 筆數 / 記憶體） =========
+
+def peak_rss_mb() -> float | None:
+    """目前行程的 RSS 最高值（MB）；平台不支援時回傳 None"""
+    if resource is not None:
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        # Linux 單位是 KB，macOS 是 bytes
+        return round(peak / (2**20 if os.uname().sysname == "Darwin" else 2**10), 1)
+    if psutil is not None:
+        info = psutil.Process().memory_info()
+        return round(getattr(info, "peak_wset", info.rss) / 2**20, 1)
+    return None
+
+
+def new_stage_report(event_id: str) -> dict:
+    """單一賽事的量測紀錄：{"event_id", "stages": {階段: {...}}}"""
+    return {"event_id": event_id, "stages": {}}
+
+
+def record_stage(report: dict | None, name: str, wall_sec: float, rows: int = 0):
+    """
+    把一次量測累加到 report["stages"][name]。
+    串流輸出時同一階段會被呼叫很多次（每個分組一次），所以 wall_sec / rows 是累加的。
+    """
+    if report is None:
+        return
+    s = report["stages"].setdefault(name, {"wall_sec": 0.0, "rows": 0, "calls": 0})
+    s["wall_sec"] = round(s["wall_sec"] + wall_sec, 4)
+    s["rows"] += int(rows)
+    s["calls"] += 1
+    s["peak_rss_mb"] = peak_rss_mb()
+
+
+@contextmanager
+def timed_stage(report: dict | None, name: str):
+    """
+    量測一個頂層階段。yield 出的 dict 可以填 "rows"（處理筆數）。
+    有開 tracemalloc 時另外記錄這個階段內的 Python 配置峰值。
+    """
+    info = {"rows": 0}
+    tracing = report is not None and tracemalloc.is_tracing()
+    if tracing:
+        tracemalloc.reset_peak()
+    started = time.perf_counter()
+    try:
+        yield info
+    finally:
+        record_stage(report, name, time.perf_counter() - started, info["rows"])
+        if tracing:
+            peak_mb = round(tracemalloc.get_traced_memory()[1] / 2**20, 2)
+            s = report["stages"][name]
+            s["peak_tracemalloc_mb"] = max(s.get("peak_tracemalloc_mb", 0), peak_mb)
+
+
+def format_stage_report(report: dict) -> list[str]:
+    """量測紀錄的精簡摘要（每個階段一行）"""
+    lines = []
+    for name, s in report["stages"].items():
+        line = f"   ⏱️ {name:<16} {s['wall_sec']:>8.3f}s  {s['rows']:>10,} 筆"
+        if s.get("peak_rss_mb") is not None:
+            line += f"  RSS {s['peak_rss_mb']:>7.1f} MB"
+        if "peak_tracemalloc_mb" in s:
+            line += f"  py {s['peak_tracemalloc_mb']:>7.1f} MB"
+        lines.append(line)
+    return lines
+
+
+def classify_group(group: str) -> str:
+    """分組類型（與 index.html 的 classifyGroup 相同）：輪椅 / 視障 / 一般"""
+    g = str(group)
+    if "輪椅" in g:
+        return "輪椅"
+    if "視障" in g:
+        return "視障"
+    return "一般"
+
+
+def group_gender(group: str) -> str | None:
+    """從分組名稱判斷性別（與 index.html 相同：含「男」為男、含「女」為女）"""
+    g = str(group)
+    if "男" in g:
+        return "男"
+    if "女" in g:
+        return "女"
+    return None
+
+
+def aggregate_group_key(bucket: str, gender: str) -> str:
+    """性別合計的分組 key，例如 ('一般', '男') -> '一般/男合計'"""
+    return f"{bucket}/{gender}合計"
+
 
 def build_group_keys(row) -> list[tuple[str, str]]:
-    """給一列成績，回傳它應該被歸到哪些 (賽別, 分組key)"""
+    """
+    給一組 (賽別, 分組)，回傳它應該被歸到哪些 (賽別, 分組key)。
+    row 只需要支援 row["賽別"]、row["分組"]（DataFrame 列或 dict 皆可）。
+    """
     keys: list[tuple[str, str]] = []
     race_type = row["賽別"]
     group = str(row["分組"])
@@ -38,14 +160,30 @@ def build_group_keys(row) -> list[tuple[str, str]]:
     keys.append((race_type, "ALL"))
     # 2) 賽別 + 原始分組
     keys.append((race_type, group))
+    # 3) 賽別 + 分組類型/性別合計（前端查性別排名時不必再合併排序）
+    gender = group_gender(group)
+    if gender:
+        keys.append((race_type, aggregate_group_key(classify_group(group), gender)))
     return keys
 
 
 # ========= 讀取 Excel & 整理秒數 =========
 
-def load_and_group_seconds(excel_path: str) -> dict[tuple[str, str], list[int]]:
+# 視為沒有完賽成績的時間字串
+INVALID_TIME_TOKENS = ["--", "-", "DNF", "DNS", ""]
+
+
+# 整理秒數只需要這幾欄；sidecar 也只存這幾欄（Excel 有 seconds 欄時一併存下，
+# 讓 group_seconds_from_frame 不論讀 sidecar 或 Excel 都用同一份秒數）
+SIDECAR_COLUMNS = ["賽別", "分組", "完賽時間"]
+SIDECAR_OPTIONAL_COLUMNS = ["seconds"]
+SIDECAR_SUFFIX = ".columns.npz"
+SIDECAR_VERSION = 2
+
+
+def read_excel_frame(excel_path: str) -> pd.DataFrame:
     """
-    從 Excel 讀取資料，依 (賽別, 分組key) 回傳完賽秒數 list。
+    用 pandas/openpyxl 讀取爬蟲輸出的 Excel 並檢查必要欄位。
     Excel 欄位（A1~I1）：
         姓名, 背號, 賽別, 賽事類型, 分組, 完賽時間, 來源分組標籤, 完賽時間_td, 總排名
     """
@@ -55,62 +193,234 @@ def load_and_group_seconds(excel_path: str) -> dict[tuple[str, str], list[int]]:
     for col in required_cols:
         if col not in df.columns:
             raise ValueError(f"Excel 缺少必要欄位: {col}")
+    return df
+
+
+def sidecar_path(excel_path: str) -> str:
+    """Excel 旁邊的欄式 sidecar 檔名，例如 xxx.xlsx.columns.npz"""
+    return excel_path + SIDECAR_SUFFIX
+
+
+def write_sidecar(excel_path: str, df: pd.DataFrame, excel_hash: str):
+    """把需要的欄位存成 sidecar，並記下來源 Excel 的 mtime / 大小 / sha256"""
+    stat = os.stat(excel_path)
+    names = SIDECAR_COLUMNS + [col for col in SIDECAR_OPTIONAL_COLUMNS if col in df.columns]
+    meta = {
+        "version": SIDECAR_VERSION,
+        "source_mtime_ns": stat.st_mtime_ns,
+        "source_size": stat.st_size,
+        "source_sha256": excel_hash,
+        "columns": names,
+    }
+    # 與 group_seconds_from_frame 相同用 astype(str)；完賽時間的空值存成空字串（同樣是無效成績）；
+    # seconds 存成 float（空值為 NaN），讀回後與直接讀 Excel 的數值相同
+    columns = {}
+    for i, col in enumerate(names):
+        if col == "seconds":
+            columns[f"col_{i}"] = pd.to_numeric(df[col], errors="coerce").to_numpy(dtype=float)
+            continue
+        values = df[col].astype(object)
+        if col == "完賽時間":
+            values = values.where(values.notna(), "")
+        columns[f"col_{i}"] = values.astype(str).to_numpy(dtype=str)
+    path = sidecar_path(excel_path)
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez_compressed(tmp_path, meta=np.array(json.dumps(meta)), **columns)
+    os.replace(tmp_path, path)
 
-    # 篩選有效資料 + 轉秒數
-    def safe_time_to_seconds(t):
-        """安全轉換：無效值回傳 None"""
-        if pd.isna(t) or str(t).strip() in ['--', '-', 'DNF', 'DNS', '']:
-            return None
+
+def read_sidecar(excel_path: str, excel_hash: str | None = None) -> pd.DataFrame | None:
+    """
+    讀取 sidecar；不存在或已過期則回傳 None。
+    先比對 Excel 的 mtime 與大小，不符時再比對 sha256
+    （內容沒變只是被複製 / touch 過，仍可使用）。
+    """
+    path = sidecar_path(excel_path)
+    if not os.path.exists(path):
+        return None
+    try:
+        with np.load(path) as data:
+            meta = json.loads(str(data["meta"]))
+            if meta.get("version") != SIDECAR_VERSION:
+                return None
+            stat = os.stat(excel_path)
+            if (meta["source_mtime_ns"], meta["source_size"]) != (stat.st_mtime_ns, stat.st_size):
+                if (excel_hash or file_sha256(excel_path)) != meta["source_sha256"]:
+                    return None
+            return pd.DataFrame({col: data[f"col_{i}"] for i, col in enumerate(meta["columns"])})
+    except (OSError, ValueError, KeyError):
+        return None
+
+
+def read_result_frame(excel_path: str, excel_hash: str | None = None,
+                      use_sidecar: bool = True, force: bool = False) -> pd.DataFrame:
+    """
+    取得整理秒數所需的成績欄位。
+    優先讀 Excel 旁的欄式 sidecar；sidecar 不存在或過期時才解析 Excel，並重新寫出 sidecar。
+    force=True 時不讀 sidecar，一律重新解析 Excel（並覆寫 sidecar）。
+    """
+    if use_sidecar and not force:
+        df = read_sidecar(excel_path, excel_hash)
+        if df is not None:
+            print(f"⚡ 使用 sidecar：{sidecar_path(excel_path)}")
+            return df
+
+    df = read_excel_frame(excel_path)
+    if use_sidecar:
         try:
-            return time_str_to_seconds(str(t))
-        except:
-            return None
+            write_sidecar(excel_path, df, excel_hash or file_sha256(excel_path))
+        except OSError as e:
+            print(f"⚠️ 無法寫入 sidecar：{e}")
+    return df
+
 
-    # 如有 seconds 欄位，可以直接用；否則從完賽時間轉
+def parse_time_column(times: pd.Series) -> tuple[np.ndarray, np.ndarray]:
+    """
+    以向量化字串運算把整欄 'HH:MM:SS' 轉成秒數。
+    回傳 (seconds, valid)：seconds 為 int64 陣列，valid 為 bool mask；
+    空值、DNF/DNS/-- 與格式不合法的列 valid 皆為 False。
+    """
+    text = times.astype("string").str.strip()
+    valid = times.notna().to_numpy() & ~text.isin(INVALID_TIME_TOKENS).fillna(True).to_numpy()
+    valid &= (text.str.count(":") == 2).fillna(False).to_numpy()
+
+    parts = text.where(valid).str.split(":", n=2, expand=True)
+    seconds = np.zeros(len(times), dtype=np.int64)
+    if parts.shape[1] == 3:
+        hms = np.stack(
+            [pd.to_numeric(parts[i], errors="coerce").to_numpy(dtype=float) for i in range(3)],
+            axis=1,
+        )
+        valid &= np.isfinite(hms).all(axis=1) & (hms == np.round(hms)).all(axis=1)
+        hms = np.where(valid[:, None], hms, 0).astype(np.int64)
+        seconds = hms[:, 0] * 3600 + hms[:, 1] * 60 + hms[:, 2]
+    else:
+        valid[:] = False
+    return seconds, valid
+
+
+def group_seconds_from_frame(df: pd.DataFrame) -> dict[tuple[str, str], np.ndarray]:
+    """
+    欄式（columnar）整理：依 (賽別, 分組key) 回傳已排序的完賽秒數陣列。
+
+    1. 完賽時間一次向量化轉秒數，DNF/DNS/-- 等以 mask 排除
+    2. 賽別、分組轉成 categorical codes
+    3. 一次 lexsort（賽別, 分組, 秒數），每個 (賽別, 分組) 都是同一個 uint32
+       陣列裡的連續 slice
+    4. 每個 (賽別, 分組) 透過 build_group_keys 決定要歸到哪些 key；
+       只對應單一 slice 的 key 直接回傳 view，需要合併的 key（如 ALL）才排序複製
+    """
+    # 如有 seconds 欄位，可以直接用；否則從完賽時間轉。
+    # 完賽時間是否有效一律看字串（空值 / DNF / DNS / --），sidecar 把空值存成空字串也判斷得一樣
     if "seconds" in df.columns:
-        df["seconds"] = df["seconds"].astype(int)
+        seconds = pd.to_numeric(df["seconds"], errors="coerce")
+        text = df["完賽時間"].astype("string").str.strip()
+        valid = (df["完賽時間"].notna().to_numpy() & ~text.isin(INVALID_TIME_TOKENS).fillna(True).to_numpy()
+                 & seconds.notna().to_numpy())
+        seconds = seconds.fillna(0).to_numpy(dtype=np.int64)
     else:
-        df["seconds"] = df["完賽時間"].apply(safe_time_to_seconds)
+        seconds, valid = parse_time_column(df["完賽時間"])
 
-    group_seconds: dict[tuple[str, str], list[int]] = defaultdict(list)
+    race_codes, race_names = pd.factorize(df["賽別"].astype(str).to_numpy()[valid])
+    group_codes, group_names = pd.factorize(df["分組"].astype(str).to_numpy()[valid])
+    seconds = seconds[valid]
 
-    for _, row in df.iterrows():
-        time_val = row["完賽時間"]
-        if pd.isna(time_val):
-            continue
+    # 一次排序：主鍵賽別、次鍵分組、最後秒數
+    order = np.lexsort((seconds, group_codes, race_codes))
+    sorted_seconds = seconds[order].astype(np.uint32)
+    pair_codes = race_codes[order].astype(np.int64) * max(len(group_names), 1) + group_codes[order]
+    starts = np.flatnonzero(np.r_[True, pair_codes[1:] != pair_codes[:-1]]) if len(order) else np.array([], dtype=np.int64)
+    ends = np.r_[starts[1:], len(order)]
 
-        try:
-            sec = int(row["seconds"])
-        except Exception:
-            try:
-                sec = time_str_to_seconds(time_val)
-            except Exception:
-                continue
+    # 每個 key 由哪些 slice 組成
+    key_slices: dict[tuple[str, str], list[np.ndarray]] = defaultdict(list)
+    for start, end in zip(starts, ends):
+        race_type = race_names[race_codes[order[start]]]
+        group = group_names[group_codes[order[start]]]
+        for key in build_group_keys({"賽別": race_type, "分組": group}):
+            key_slices[key].append(sorted_seconds[start:end])
 
-        # DNF / 空值排除可以在這裡加條件
-        for race_type, key in build_group_keys(row):
-            group_seconds[(race_type, key)].append(sec)
+    group_seconds: dict[tuple[str, str], np.ndarray] = {}
+    for key, slices in key_slices.items():
+        if len(slices) == 1:
+            group_seconds[key] = slices[0]
+        else:
+            group_seconds[key] = np.sort(np.concatenate(slices))
+    return group_seconds
 
-    # 排序
-    for k in group_seconds:
-        group_seconds[k].sort()
 
+def load_and_group_seconds(excel_path: str, excel_hash: str | None = None,
+                           report: dict | None = None, force: bool = False) -> dict[tuple[str, str], np.ndarray]:
+    """
+    從 Excel（或其 sidecar）讀取資料，依 (賽別, 分組key) 回傳已排序的完賽秒數（uint32 陣列）。
+    force=True 時略過 sidecar，直接解析 Excel。
+    """
+    with timed_stage(report, "read_excel") as stage:
+        df = read_result_frame(excel_path, excel_hash, force=force)
+        stage["rows"] = len(df)
+    with timed_stage(report, "group_seconds") as stage:
+        group_seconds = group_seconds_from_frame(df)
+        stage["rows"] = len(df)
     return group_seconds
 
 
-# ========= 建立 5 分鐘 histogram =========
+# ========= 建立多解析度 histogram =========
+
+# histogram 金字塔的 bin 大小（秒）：1 / 5 / 10 / 15 分鐘
+HISTOGRAM_BIN_SIZES = (1 * 60, 5 * 60, 10 * 60, 15 * 60)
+
+
+def histogram_label(bin_size_sec: int) -> str:
+    """bin 大小（秒）轉成 key 名稱，例如 300 -> '5min'。"""
+    return f"{bin_size_sec // 60}min"
+
+
+def build_histogram_pyramid(arr, bin_sizes=HISTOGRAM_BIN_SIZES) -> dict[str, dict]:
+    """
+    對單一組的秒數做多解析度 histogram。
+    先以所有 bin 大小的最大公因數做一次 bincount，再往上合併成較粗的 bin，
+    因此原始秒數只需掃過一次。
+    每個 bin 計數範圍為 lo <= sec < hi，區間從 min // bin 到 ceil(max / bin)。
+    回傳:
+        {"5min": {"start_sec": 7200, "bin_sec": 300, "counts": [3, 10, ...]}, ...}
+    """
+    arr = np.asarray(arr, dtype=np.int64)
+    base = math.gcd(*bin_sizes)
+    min_s = int(arr.min())
+    max_s = int(arr.max())
+
+    # 最細的 bin：一次掃描
+    base_start = min_s // base
+    fine = np.bincount(arr // base - base_start)
+    fine_lo = (base_start + np.arange(len(fine), dtype=np.int64)) * base
+
+    pyramid: dict[str, dict] = {}
+    for bin_size in bin_sizes:
+        start_bin = min_s // bin_size
+        end_bin = -(-max_s // bin_size)  # ceil
+        counts = np.bincount(fine_lo // bin_size - start_bin,
+                             weights=fine,
+                             minlength=end_bin - start_bin + 1)
+        pyramid[histogram_label(bin_size)] = {
+            "start_sec": start_bin * bin_size,
+            "bin_sec": bin_size,
+            "counts": counts.astype(np.int64).tolist(),
+        }
+    return pyramid
+
 
-def build_histograms(group_seconds: dict[tuple[str, str], list[int]],
-                     bin_size_sec: int = 5 * 60) -> dict[str, dict]:
+def build_histograms(group_seconds: dict[tuple[str, str], np.ndarray],
+                     bin_sizes=HISTOGRAM_BIN_SIZES) -> dict[str, dict]:
     """
-    為每個 (賽別, 分組key) 做 5 分鐘 bin 的 histogram。
+    為每個 (賽別, 分組key) 做 1/5/10/15 分鐘 bin 的 histogram。
     回傳:
         {
           "HM__ALL": {
-            "histogram_5min": [
-              {"start_sec":..., "end_sec":..., "start_time":..., "end_time":..., "count":...},
+            "histograms": {
+              "1min": {"start_sec":..., "bin_sec": 60, "counts": [...]},
+              "5min": {"start_sec":..., "bin_sec": 300, "counts": [...]},
               ...
-            ]
+            }
           },
           ...
         }
@@ -118,48 +428,25 @@ def build_histograms(group_seconds: dict[tuple[str, str], list[int]],
     result: dict[str, dict] = {}
 
     for (race_type, group_key), arr in group_seconds.items():
-        if not arr:
+        if len(arr) == 0:
             continue
-        print(f'KEYS = {(race_type, group_key)} -> len = {len(arr)}')
-        min_s = min(arr)
-        max_s = max(arr)
-
-        start_bin = int(min_s // bin_size_sec)
-        end_bin = int(math.ceil(max_s / bin_size_sec))
-
-        bins = []
-        for b in range(start_bin, end_bin + 1):
-            lo = b * bin_size_sec
-            hi = (b + 1) * bin_size_sec
-            # 計數：lo <= sec < hi
-            count = sum(1 for x in arr if lo <= x < hi)
-            bins.append({
-                "start_sec": lo,
-                "end_sec": hi,
-                "start_time": seconds_to_time_str(lo),
-                "end_time": seconds_to_time_str(hi),
-                "count": count,
-            })
-
         key = f"{race_type}__{group_key}"
-        if key not in result:
-            result[key] = {}
-        result[key]["histogram_5min"] = bins
+        result[key] = {"histograms": build_histogram_pyramid(arr, bin_sizes)}
 
     return result
 
 
 # ========= 各組 summary（人數/最短/最長/平均/中位數） =========
 
-def build_sorted_seconds(group_seconds: dict[tuple[str, str], list[int]]) -> dict[str, dict]:
+def build_sorted_seconds(group_seconds: dict[tuple[str, str], np.ndarray]) -> dict[str, dict]:
     """建立 sorted_seconds"""
     result: dict[str, dict] = {}
     for (race_type, group_key), arr in group_seconds.items():
-        if not arr:
+        if len(arr) == 0:
             continue
         key = f"{race_type}__{group_key}"
         result[key] = {
-            "sorted_seconds": [int(x) for x in sorted(arr)]
+            "sorted_seconds": np.sort(arr).tolist()
         }
     return result
 
@@ -175,108 +462,943 @@ def create_metadata(event_config: dict) -> dict:
         "race_types": event_config["race_types"],
         "group_categories": event_config.get("group_categories", ["ALL", "一般", "輪椅", "視障"]),
         "data_structure": {
-            "histogram_bin_size": "5min",
+            "histogram_bin_size": histogram_label(5 * 60),
+            "histogram_bin_sizes": [histogram_label(b) for b in HISTOGRAM_BIN_SIZES],
             "percentile_precision": "0.1%",
-            "time_format": "HH:MM:SS"
+            "time_format": "HH:MM:SS",
+            "aggregate_group_key": aggregate_group_key("{分組類型}", "{男|女}"),
         }
     }
 
-def build_data(excel_path: str, event_config: dict) -> tuple[dict, dict, dict]:
-    """建立完整資料集：combined + summary + metadata"""
-    print("🔄 讀取並整理秒數中...")
-    group_seconds = load_and_group_seconds(excel_path)
-    
-    print("📊 計算 histogram...")
-    hist_json = build_histograms(group_seconds)
-    
-    print("⚡ 建立 sorted_seconds...")
-    sorted_json = build_sorted_seconds(group_seconds)
-    
-    # 合併成 event 前綴 key
-    combined: dict[str, dict] = {}
-    all_keys = set(hist_json.keys()) | set(sorted_json.keys())
-    for k in all_keys:
-        full_key = f"{event_config['id']}__{k}"
-        combined[full_key] = {}
-        if k in hist_json:
-            combined[full_key].update(hist_json[k])
-        if k in sorted_json:
-            combined[full_key]["sorted_seconds"] = sorted_json[k]["sorted_seconds"]
-    
+def iter_event_entries(group_seconds: dict[tuple[str, str], np.ndarray],
+                       event_config: dict, dense_tables: bool = False,
+                       report: dict | None = None) -> Iterator[tuple[str, dict]]:
+    """
+    逐一產生 binsAndPr 的 (完整 key, 資料)，每次只在記憶體中保留一組的
+    histograms + sorted_seconds，供 output_event_js 串流寫出。
+    dense_tables=True（或賽事設定 "pr_only": True）時另外附上 dense 名次 / PR 查表；
+    pr_only 的賽事不輸出 sorted_seconds。
+    有傳 report 時，histograms / sorted_seconds / dense_tables 各自累計耗時與筆數。
+    """
+    pr_only = bool(event_config.get("pr_only"))
+    for (race_type, group_key), arr in group_seconds.items():
+        if len(arr) == 0:
+            continue
+        full_key = f"{event_config['id']}__{race_type}__{group_key}"
+
+        started = time.perf_counter()
+        entry = {"histograms": build_histogram_pyramid(arr)}
+        record_stage(report, "histograms", time.perf_counter() - started, len(arr))
+
+        started = time.perf_counter()
+        entry["sorted_seconds"] = np.sort(arr).tolist()
+        record_stage(report, "sorted_seconds", time.perf_counter() - started, len(arr))
+
+        if dense_tables or pr_only:
+            started = time.perf_counter()
+            add_dense_tables(entry, arr, drop_raw=pr_only)
+            record_stage(report, "dense_tables", time.perf_counter() - started, len(arr))
+        yield full_key, entry
+
+
+def build_data(excel_path: str, event_config: dict,
+               group_seconds: dict[tuple[str, str], np.ndarray] | None = None,
+               dense_tables: bool = False,
+               report: dict | None = None) -> tuple[Iterator[tuple[str, dict]], dict]:
+    """
+    建立資料集：(binsAndPr entries 產生器, metadata)。
+    entries 是 lazy 的，要交給 output_event_js 邊算邊寫。
+    group_seconds 可由快取直接傳入；未提供時從 excel_path 讀取。
+    report（new_stage_report 建立）會記錄各階段的耗時 / 筆數 / 記憶體。
+    """
+    if group_seconds is None:
+        print("🔄 讀取並整理秒數中...")
+        group_seconds = load_and_group_seconds(excel_path, report=report)
+
     metadata = create_metadata(event_config)
-    return combined,  metadata
+    # 總人數 = 各賽別 ALL 的人數
+    metadata["total_participants"] = int(sum(
+        len(arr) for (_, group_key), arr in group_seconds.items() if group_key == "ALL"
+    ))
+
+    metadata["data_structure"]["dense_tables"] = dense_tables or bool(event_config.get("pr_only"))
+
+    n_keys = sum(1 for arr in group_seconds.values() if len(arr))
+    print(f"📊 計算 histogram + sorted_seconds（串流輸出）：{n_keys} 個分組 / "
+          f"{metadata['total_participants']:,} 人")
+    return iter_event_entries(group_seconds, event_config, dense_tables, report), metadata
+
+# ========= 📦 compact 編碼：delta + base64 typed array =========
+
+# delta 的打包格式：dtype 名稱 → numpy little-endian dtype
+PACKED_DTYPES = {"u8": "<u1", "u16": "<u2", "u32": "<u4"}
+
+
+def encode_sorted_seconds(arr) -> dict:
+    """
+    把已排序（非遞減）的整數陣列做 delta 編碼，依最大 delta 打包成 little-endian
+    Uint8/Uint16/Uint32 的 base64 字串。sorted_seconds 與 dense 查表都用這個格式。
+    前端 (index.html 的 decodePacked) 以 prefix sum 還原成 Uint32Array。
+    回傳:
+        {"base": 第一個值, "count": 長度, "dtype": "u8" | "u16" | "u32", "deltas": "<base64>"}
+    """
+    arr = np.asarray(arr, dtype=np.int64)
+    deltas = np.diff(arr, prepend=arr[:1])
+    max_delta = int(deltas.max()) if len(deltas) else 0
+    dtype = "u8" if max_delta <= 0xFF else ("u16" if max_delta <= 0xFFFF else "u32")
+    packed = deltas.astype(PACKED_DTYPES[dtype]).tobytes()
+    return {
+        "base": int(arr[0]) if len(arr) else 0,
+        "count": int(len(arr)),
+        "dtype": dtype,
+        "deltas": base64.b64encode(packed).decode("ascii"),
+    }
+
+
+def decode_sorted_seconds(packed: dict) -> np.ndarray:
+    """encode_sorted_seconds 的反向：還原成 uint32 秒數陣列。"""
+    deltas = np.frombuffer(base64.b64decode(packed["deltas"]),
+                           dtype=PACKED_DTYPES[packed["dtype"]]).astype(np.int64)
+    if len(deltas):
+        deltas[0] = packed["base"]
+    return np.cumsum(deltas).astype(np.uint32)
+
+
+def pack_entry(entry: dict) -> dict:
+    """把 binsAndPr 單一 key 的 sorted_seconds 換成 sorted_seconds_packed"""
+    if "sorted_seconds" not in entry:
+        return entry
+    packed = {k: v for k, v in entry.items() if k != "sorted_seconds"}
+    packed["sorted_seconds_packed"] = encode_sorted_seconds(entry["sorted_seconds"])
+    return packed
+
+
+def count_finishers(entry: dict) -> int:
+    """binsAndPr 單一 key 的完賽人數（相容一般、compact 與只有 dense 查表的格式）"""
+    if "finishers" in entry:
+        return entry["finishers"]
+    if "sorted_seconds_packed" in entry:
+        return entry["sorted_seconds_packed"]["count"]
+    return len(entry.get("sorted_seconds", []))
+
+
+# ========= 🔢 dense 查表：O(1) 名次與 PR 反查 =========
+
+# PR 反查表的解析度：0.1%（與 metadata 的 percentile_precision 一致）
+PR_TABLE_STEPS = 1000
+
+
+def build_rank_table(arr) -> dict:
+    """
+    dense 名次表：table[sec - start_sec] = 完賽時間 < sec 的人數（即 lowerBound），
+    sec 涵蓋 [最快, 最慢 + 1]，因此最後一格就是總人數。
+    以 encode_sorted_seconds 格式存放（每秒的人數增量多半 < 256，用 Uint8 即可）。
+    """
+    arr = np.sort(np.asarray(arr, dtype=np.int64))
+    start = int(arr[0])
+    per_second = np.bincount(arr - start)
+    table = np.concatenate([[0], np.cumsum(per_second)])
+    return {"start_sec": start, **encode_sorted_seconds(table)}
+
+
+def build_pr_table(arr) -> dict:
+    """
+    PR 反查表：與 index.html 的 lookupTimeForPr 相同算法，預先算好 PR 100.0% ~ 0.0%
+    每 0.1% 對應的時間。table[i] 對應 PR = (PR_TABLE_STEPS - i) / 10 %，
+    由快到慢非遞減，所以同樣可用 delta 編碼。
+    """
+    arr = np.sort(np.asarray(arr, dtype=np.int64))
+    n = len(arr)
+    pr_pct = np.arange(PR_TABLE_STEPS, -1, -1) / 10
+    slower = np.floor((pr_pct / 100) * n).astype(np.int64)
+    target_rank = np.clip(n - slower, 1, n)  # PR 100% 時取第 1 名
+    return encode_sorted_seconds(arr[target_rank - 1])
+
+
+def add_dense_tables(entry: dict, arr, drop_raw: bool = False) -> dict:
+    """
+    在 binsAndPr 單一 key 加上 finishers / rank_table / pr_table。
+    drop_raw=True 時移除 sorted_seconds（只需回答名次 / PR 的賽事）。
+    """
+    entry["finishers"] = int(len(arr))
+    entry["rank_table"] = build_rank_table(arr)
+    entry["pr_table"] = build_pr_table(arr)
+    if drop_raw:
+        entry.pop("sorted_seconds", None)
+    return entry
+
+
+def _indent_json(text: str, indent: str) -> str:
+    """把多行 JSON 的第 2 行之後加上縮排，用來嵌進外層物件"""
+    return text.replace("\n", "\n" + indent)
+
+
+def _dump_value(value, compact: bool) -> str:
+    dump_kwargs = {"separators": (",", ":")} if compact else {"indent": 2}
+    return json.dumps(value, ensure_ascii=False, **dump_kwargs)
+
+
+def _json_member(key: str, value_json: str, compact: bool, level: int, first: bool) -> str:
+    """物件裡的一個 "key": value（含前置的逗號與換行），level 是物件本身的縮排層數"""
+    nl, pad = ("", "") if compact else ("\n", "  ")
+    sep = ":" if compact else ": "
+    inner = pad * (level + 1)
+    return (("" if first else ",") + nl + inner
+            + json.dumps(key, ensure_ascii=False) + sep + _indent_json(value_json, inner))
+
+
+def _json_object_end(compact: bool, level: int, count: int) -> str:
+    nl, pad = ("", "") if compact else ("\n", "  ")
+    return (nl + pad * level if count else "") + "}"
+
+
+def _write_json_object(f, items, compact: bool, level: int = 0, on_item=None):
+    """
+    把 (key, value) 逐一串流寫成 JSON 物件，排版與 json.dump(indent=2) 相同。
+    level 是這個物件本身所在的縮排層數；每寫完一個 value 會呼叫 on_item(key, value, value_json)，
+    value_json 是已經序列化好的 value（頂層排版），可以直接寫進別的檔案。
+    """
+    f.write("{")
+    count = 0
+    for key, value in items:
+        value_json = _dump_value(value, compact)
+        f.write(_json_member(key, value_json, compact, level, first=not count))
+        count += 1
+        if on_item is not None:
+            on_item(key, value, value_json)
+    f.write(_json_object_end(compact, level, count))
+
+
+def output_event_js(entries, metadata: dict, js_filename: str, compact: bool = False, on_item=None):
+    """
+    串流輸出標準化 .js 檔案，包含完整 metadata。
+    entries 可以是 build_data 回傳的 (key, 資料) 產生器，也可以是 dict；
+    每算完一個 key 就寫入檔案，統計資訊也邊寫邊累計。
+    compact=True 時 sorted_seconds 改為 sorted_seconds_packed（delta + base64），
+    JSON 也不再縮排。
+    on_item(key, value, value_json) 會收到每個寫出的分組（例如 EventShardWriter.add 同時寫 shard）。
+    """
+    if isinstance(entries, dict):
+        entries = entries.items()
+    if compact:
+        entries = ((full_key, pack_entry(entry)) for full_key, entry in entries)
+
+    stats = {"keys": 0, "people": 0, "race_types": set()}
+
+    def count_entry(full_key: str, entry: dict):
+        # 統計資訊邊寫邊算
+        _, race_type, group_key = full_key.split("__", 2)
+        stats["keys"] += 1
+        stats["race_types"].add(race_type)
+        if group_key == "ALL":
+            stats["people"] += count_finishers(entry)
+
+    def on_entry(full_key: str, entry: dict, entry_json: str):
+        count_entry(full_key, entry)
+        if on_item is not None:
+            on_item(full_key, entry, entry_json)
 
-def output_event_js(combined: dict, metadata: dict, js_filename: str):
-    """輸出標準化 .js 檔案，包含完整 metadata"""
     with open(js_filename, "w", encoding="utf-8") as f:
         f.write("// ================================================\n")
         f.write(f"// {metadata['event_name']} 前處理資料\n")
         f.write(f"// 生成時間：{metadata['generated_at']}\n")
         f.write(f"// 總人數：{metadata['total_participants']}人\n")
-        f.write("// 包含：histogram_5min + sorted_seconds\n")
+        if compact:
+            f.write("// 包含：histograms (1/5/10/15min) + sorted_seconds_packed (delta + base64)\n")
+        else:
+            f.write("// 包含：histograms (1/5/10/15min) + sorted_seconds\n")
         f.write("// ================================================\n\n")
         
         f.write("window.marathonData = window.marathonData || {};\n\n")
         f.write(f"// {metadata['event_name']} 資料\n")
         f.write(f"window.marathonData['{metadata['event_id']}'] = ")
-        json.dump({
-            "metadata": metadata,
-            "binsAndPr": combined,
-        }, f, ensure_ascii=False, indent=2)
+
+        # 與 json.dump(indent=2) 相同的排版，只是 binsAndPr 一個 key 一個 key 寫
+        nl, pad = ("", "") if compact else ("\n", "  ")
+        sep = ":" if compact else ": "
+        metadata_json = json.dumps(metadata, ensure_ascii=False,
+                                   **({"separators": (",", ":")} if compact else {"indent": 2}))
+        f.write("{" + nl + pad + '"metadata"' + sep + _indent_json(metadata_json, pad) + "," + nl)
+        f.write(pad + '"binsAndPr"' + sep)
+        _write_json_object(f, entries, compact, level=1, on_item=on_entry)
+        f.write(nl + "}")
         f.write(f";\n\n")
         
         # 統計資訊註解
-        total_keys = len(combined)
-        total_races = len(set(k.split('_')[1].split('__')[0] for k in combined))
-        total_people = sum(len(v.get('sorted_seconds', [])) for v in combined.values())
+        total_keys, total_people, total_races = stats["keys"], stats["people"], len(stats["race_types"])
         f.write(f"// 📊 統計：{total_races}賽別 × {total_keys}分組 = {total_people:,}完賽記錄\n")
     
     print(f"✅ 輸出：{js_filename}")
     print(f"   📅 {metadata['event_name']}")
     print(f"   👥 {total_people:,}人 / {total_races}賽別 / {total_keys}分組")
 
+
+# ========= 🧩 分片輸出：manifest + 每個 (賽事, 賽別) 一個 shard =========
+
+SHARD_DIR = "data"
+SITE_MANIFEST = "manifest.js"
+
+
+def shard_id(event_id: str, race_type: str) -> str:
+    """shard 檔名用的 id；賽別名稱含中文與括號，改用短 hash 讓 URL 穩定又安全"""
+    digest = hashlib.sha1(race_type.encode("utf-8")).hexdigest()[:10]
+    return f"{event_id}__{digest}"
+
+
+def event_fragment_path(event_id: str, out_dir: str = SHARD_DIR) -> str:
+    """單一賽事的 manifest 片段（組合成 manifest.js 用）"""
+    return os.path.join(out_dir, f"{event_id}.manifest.json")
+
+
+class EventShardWriter:
+    """
+    每個賽別輸出一個 shard（data/{shard_id}.js），內容只有該賽別的 binsAndPr：
+        window.marathonShards['{shard_id}'] = {"{event}__{賽別}__{分組}": {...}, ...};
+    作為 output_event_js 的 on_item 使用：{id}_data.js 每寫一個分組就照原樣寫進對應的 shard，
+    histograms / sorted_seconds / dense 查表只算一次。close() 收尾並寫出該賽事的 manifest 片段
+    （賽別 → shard URL / 大小 / 分組列表）。
+    """
+
+    def __init__(self, metadata: dict, event_config: dict, compact: bool = False, out_dir: str = SHARD_DIR):
+        self.metadata = metadata
+        self.event_id = event_config["id"]
+        self.compact = compact
+        self.out_dir = out_dir
+        self.files: dict[str, object] = {}  # 賽別 → 開著的 shard 檔
+        self.counts: dict[str, int] = {}    # 賽別 → 已寫入的分組數
+        self.fragment = {"metadata": metadata, "race_types": {}}
+        os.makedirs(out_dir, exist_ok=True)
+
+    def add(self, full_key: str, entry: dict, entry_json: str):
+        _, race_type, group_key = full_key.split("__", 2)
+        f = self.files.get(race_type)
+        if f is None:
+            sid = shard_id(self.event_id, race_type)
+            f = self.files[race_type] = open(os.path.join(self.out_dir, f"{sid}.js"), "w", encoding="utf-8")
+            f.write(f"// {self.metadata['event_name']} / {race_type}\n")
+            f.write("window.marathonShards = window.marathonShards || {};\n")
+            f.write(f"window.marathonShards['{sid}'] = {{")
+            self.counts[race_type] = 0
+            self.fragment["race_types"][race_type] = {
+                "shard_id": sid,
+                "url": f"{self.out_dir}/{sid}.js",
+                "bytes": 0,
+                "count": 0,
+                "groups": [],
+            }
+        f.write(_json_member(full_key, entry_json, self.compact, 0, first=not self.counts[race_type]))
+        self.counts[race_type] += 1
+        info = self.fragment["race_types"][race_type]
+        info["groups"].append(group_key)
+        if group_key == "ALL":
+            info["count"] = count_finishers(entry)
+
+    def close(self):
+        for race_type, f in self.files.items():
+            f.write(_json_object_end(self.compact, 0, self.counts[race_type]) + ";\n")
+            f.close()
+            info = self.fragment["race_types"][race_type]
+            info["bytes"] = os.path.getsize(os.path.join(self.out_dir, f"{info['shard_id']}.js"))
+        self.files = {}
+        with open(event_fragment_path(self.event_id, self.out_dir), "w", encoding="utf-8") as f:
+            json.dump(self.fragment, f, ensure_ascii=False, indent=2)
+        print(f"🧩 輸出 {len(self.fragment['race_types'])} 個 shard 到 {self.out_dir}/")
+
+
+def event_shards_exist(event_id: str, out_dir: str = SHARD_DIR) -> bool:
+    """賽事的 manifest 片段與其中列出的每個 shard .js 都在"""
+    try:
+        with open(event_fragment_path(event_id, out_dir), encoding="utf-8") as f:
+            fragment = json.load(f)
+    except (OSError, ValueError):
+        return False
+    return all(os.path.exists(os.path.join(out_dir, f"{info['shard_id']}.js"))
+               for info in fragment.get("race_types", {}).values())
+
+
+def output_site_manifest(events: list[dict], out_dir: str = SHARD_DIR):
+    """把各賽事的 manifest 片段組合成 data/manifest.js（index.html 只先載入這個小檔）"""
+    manifest_events = []
+    for event in events:
+        path = event_fragment_path(event["id"], out_dir)
+        if os.path.exists(path):
+            with open(path, encoding="utf-8") as f:
+                manifest_events.append(json.load(f))
+
+    manifest = {
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "events": manifest_events,
+    }
+    path = os.path.join(out_dir, SITE_MANIFEST)
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("// 賽事資料索引：index.html 依選擇的賽事 / 賽別再載入對應 shard\n")
+        f.write("window.marathonManifest = ")
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+        f.write(";\n")
+    print(f"🗂️ 輸出：{path}（{len(manifest_events)} 場賽事）")
+
+# ========= 🗃️ 增量建置快取 =========
+
+# 輸出格式或演算法有變動時請加一，舊快取會自動失效
+# （4：seconds 欄的有效判斷改成與完賽時間字串相同，sidecar 也保留 seconds）
+PIPELINE_VERSION = 4
+
+BUILD_CACHE_DIR = ".build_cache"
+BUILD_MANIFEST = "builds.json"
+# groups/ 底下最多保留幾份中間結果（依最後使用時間淘汰）
+BUILD_CACHE_MAX_ENTRIES = 32
+
+
+def event_build_key(event_config: dict, excel_hash: str, options: dict) -> str:
+    """單一賽事的建置 key：來源 Excel 內容 + 賽事設定 + 輸出選項 + pipeline 版本"""
+    payload = json.dumps({
+        "excel_sha256": excel_hash,
+        "event": event_config,
+        "options": options,
+        "pipeline_version": PIPELINE_VERSION,
+    }, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def save_group_seconds(path: str, group_seconds: dict[tuple[str, str], np.ndarray]):
+    """把 {(賽別, 分組key): 秒數陣列} 存成單一 .npz（一條 uint32 陣列 + offsets）"""
+    keys = list(group_seconds.keys())
+    lengths = [len(group_seconds[k]) for k in keys]
+    offsets = np.concatenate([[0], np.cumsum(lengths)]).astype(np.int64)
+    seconds = (np.concatenate([np.asarray(group_seconds[k], dtype=np.uint32) for k in keys])
+               if keys else np.array([], dtype=np.uint32))
+    tmp_path = f"{path}.{os.getpid()}.tmp.npz"
+    np.savez(tmp_path, seconds=seconds, offsets=offsets,
+             keys=np.array(json.dumps(keys, ensure_ascii=False)))
+    os.replace(tmp_path, path)
+
+
+def load_group_seconds(path: str) -> dict[tuple[str, str], np.ndarray]:
+    """讀回 save_group_seconds 存的 .npz"""
+    with np.load(path) as data:
+        seconds = data["seconds"]
+        offsets = data["offsets"]
+        keys = json.loads(str(data["keys"]))
+    return {
+        (race_type, group_key): seconds[offsets[i]:offsets[i + 1]]
+        for i, (race_type, group_key) in enumerate(keys)
+    }
+
+
+def cached_group_seconds(excel_path: str, excel_hash: str,
+                         cache_dir: str = BUILD_CACHE_DIR,
+                         force: bool = False,
+                         report: dict | None = None) -> dict[tuple[str, str], np.ndarray]:
+    """
+    依來源 Excel 內容取得整理好的秒數；只要 Excel 沒變就重用快取，
+    即使賽事設定或輸出選項改了也不必重新讀 Excel。
+    force=True 時分組快取與 sidecar 都不用，從 Excel 重新整理（並覆寫兩者）。
+    """
+    groups_dir = os.path.join(cache_dir, "groups")
+    path = os.path.join(groups_dir, f"{excel_hash}_v{PIPELINE_VERSION}.npz")
+    if not force and os.path.exists(path):
+        print("♻️ 使用快取的分組秒數")
+        os.utime(path)  # 更新最後使用時間，供淘汰參考
+        with timed_stage(report, "load_cache") as stage:
+            group_seconds = load_group_seconds(path)
+            stage["rows"] = sum(len(arr) for (_, group_key), arr in group_seconds.items()
+                                if group_key == "ALL")
+        return group_seconds
+
+    print("🔄 讀取並整理秒數中...")
+    group_seconds = load_and_group_seconds(excel_path, excel_hash, report, force=force)
+    os.makedirs(groups_dir, exist_ok=True)
+    with timed_stage(report, "save_cache"):
+        save_group_seconds(path, group_seconds)
+    return group_seconds
+
+
+def evict_build_cache(cache_dir: str = BUILD_CACHE_DIR,
+                      max_entries: int = BUILD_CACHE_MAX_ENTRIES):
+    """只保留最近使用的 max_entries 份分組快取，其餘刪除"""
+    groups_dir = os.path.join(cache_dir, "groups")
+    if not os.path.isdir(groups_dir):
+        return
+    entries = sorted(
+        (os.path.join(groups_dir, name) for name in os.listdir(groups_dir) if name.endswith(".npz")),
+        key=os.path.getmtime,
+        reverse=True,
+    )
+    for path in entries[max_entries:]:
+        os.remove(path)
+        print(f"🧹 淘汰快取：{os.path.basename(path)}")
+
+
+def load_build_manifest(cache_dir: str = BUILD_CACHE_DIR) -> dict:
+    """讀取上次建置紀錄 {event_id: {"build_key", "js", "built_at"}}"""
+    path = os.path.join(cache_dir, BUILD_MANIFEST)
+    if not os.path.exists(path):
+        return {}
+    try:
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return {}
+
+
+def save_build_manifest(manifest: dict, cache_dir: str = BUILD_CACHE_DIR):
+    os.makedirs(cache_dir, exist_ok=True)
+    path = os.path.join(cache_dir, BUILD_MANIFEST)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=2)
+    os.replace(path + ".tmp", path)
+
+
+# ========= 🗄️ memory-mapped 秒數庫：所有賽事一個檔 =========
+
+STORE_DIR = "marathon_store"
+STORE_INDEX = "index.json"
+STORE_VERSION = 1
+
+
+def output_seconds_store(events: Iterable[tuple[dict, dict[tuple[str, str], np.ndarray]]],
+                         out_dir: str = STORE_DIR) -> str:
+    """
+    把多場賽事的 (metadata, group_seconds) 寫成一個可 np.memmap 的秒數庫：
+        {out_dir}/seconds.{時間戳}.u32   所有分組的已排序秒數，little-endian uint32 首尾相接
+        {out_dir}/index.json             {"version", "dtype", "seconds_file", "count",
+                                          "events": {event_id: metadata},
+                                          "groups": [[event_id, 賽別, 分組key, offset, count], ...]}
+    秒數檔每次用新檔名，index.json 最後才以 os.replace 換上，讀取端不會看到寫一半的資料；
+    舊的秒數檔在換上新 index 後刪除（仍被開啟而刪不掉時留到下次）。
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    seconds_file = f"seconds.{datetime.now().strftime('%Y%m%d%H%M%S')}.{os.getpid()}.u32"
+    index = {
+        "version": STORE_VERSION,
+        "dtype": "<u4",
+        "seconds_file": seconds_file,
+        "count": 0,
+        "events": {},
+        "groups": [],
+    }
+    offset = 0
+    with open(os.path.join(out_dir, seconds_file), "wb") as f:
+        for metadata, group_seconds in events:
+            event_id = metadata["event_id"]
+            index["events"][event_id] = metadata
+            for (race_type, group_key), arr in group_seconds.items():
+                if len(arr) == 0:
+                    continue
+                f.write(np.sort(np.asarray(arr)).astype("<u4").tobytes())
+                index["groups"].append([event_id, race_type, group_key, offset, int(len(arr))])
+                offset += len(arr)
+    index["count"] = offset
+
+    index_path = os.path.join(out_dir, STORE_INDEX)
+    with open(index_path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(index, f, ensure_ascii=False, indent=2)
+    os.replace(index_path + ".tmp", index_path)
+
+    for name in os.listdir(out_dir):
+        if name.startswith("seconds.") and name.endswith(".u32") and name != seconds_file:
+            try:
+                os.remove(os.path.join(out_dir, name))
+            except OSError:
+                pass
+    print(f"🗄️ 輸出秒數庫：{out_dir}/（{len(index['events'])} 場賽事 / "
+          f"{len(index['groups'])} 分組 / {offset:,} 筆）")
+    return index_path
+
+
+def open_seconds_store(store_dir: str = STORE_DIR) -> tuple[dict, np.ndarray]:
+    """
+    開啟秒數庫：回傳 (index, seconds)，seconds 是唯讀 np.memmap，
+    只有實際查詢到的分組頁面才會被讀進記憶體。
+    """
+    with open(os.path.join(store_dir, STORE_INDEX), encoding="utf-8") as f:
+        index = json.load(f)
+    if index.get("version") != STORE_VERSION:
+        raise ValueError(f"不支援的秒數庫版本：{index.get('version')}")
+    if index["count"] == 0:
+        return index, np.zeros(0, dtype=index["dtype"])
+    seconds = np.memmap(os.path.join(store_dir, index["seconds_file"]), dtype=index["dtype"],
+                        mode="r", shape=(index["count"],))
+    return index, seconds
+
+
+def iter_built_event_seconds(events: list[dict], results: list[dict]) -> Iterator[tuple[dict, dict]]:
+    """
+    依建置結果逐場產生 (metadata, group_seconds)：成功或略過的賽事都從分組快取讀取
+    （快取被淘汰時才重讀 Excel），一次只在記憶體中保留一場賽事；建置失敗的賽事略過。
+    """
+    for event, result in zip(events, results):
+        if result["status"] == "failed" or not result.get("excel_sha256"):
+            print(f"⚠️ {event['name']} 建置失敗，略過")
+            continue
+        group_seconds = cached_group_seconds(event["excel"], result["excel_sha256"])
+        metadata = create_metadata(event)
+        metadata["total_participants"] = int(sum(
+            len(arr) for (_, group_key), arr in group_seconds.items() if group_key == "ALL"
+        ))
+        yield metadata, group_seconds
+
+
+def build_seconds_store(events: list[dict], results: list[dict], out_dir: str = STORE_DIR):
+    """依建置結果組合秒數庫"""
+    return output_seconds_store(iter_built_event_seconds(events, results), out_dir)
+
+
+# ========= 🔁 跨賽事 PR 換算表 =========
+
+EQUIVALENCE_JS = "equivalence.js"
+
+# 不同賽事對同一距離的寫法不同（MA / 全程馬拉松(42.195KM)），換算前先統一
+RACE_TYPE_CANONICAL = {"MA": "MA", "FM": "MA", "HM": "HM"}
+RACE_TYPE_PATTERNS = [("MA", ("全程", "42")), ("HM", ("半程", "21"))]
+
+
+def canonical_race_type(race_type: str) -> str:
+    """賽別統一名稱：'全程馬拉松(42.195KM)' → 'MA'、'半程馬拉松(21.0975km)' → 'HM'，其餘轉大寫去空白"""
+    rt = str(race_type).strip()
+    if rt.upper() in RACE_TYPE_CANONICAL:
+        return RACE_TYPE_CANONICAL[rt.upper()]
+    for canonical, tokens in RACE_TYPE_PATTERNS:
+        if any(token in rt for token in tokens):
+            return canonical
+    return rt.upper().replace(" ", "")
+
+
+def build_equivalence_tables(event_seconds: Iterable[tuple[dict, dict[tuple[str, str], np.ndarray]]]) -> dict:
+    """
+    跨賽事 PR 換算表。每個 (統一賽別, 分組key) 存各賽事的 0.1% PR 反查表（build_pr_table），
+    只保留至少兩場賽事都有的分組；任兩場賽事 A、B 的換算表就是兩欄 pr_table 並排：
+        A 跑 t 秒 → i = 第一個 pr_table_A[i] >= t 的格點（PR = (1000 - i) / 10 %）→ B 的 pr_table_B[i]
+    回傳:
+        {"generated_at", "steps", "percentile_precision",
+         "events": {event_id: {"event_name", "race_types": {原賽別: 統一賽別}}},
+         "tables": {"MA__男30-39歲": {event_id: {"race_type", "finishers", "pr_table"}, ...}, ...}}
+    """
+    events: dict[str, dict] = {}
+    tables: dict[str, dict] = defaultdict(dict)
+    for metadata, group_seconds in event_seconds:
+        event_id = metadata["event_id"]
+        race_map = {}
+        for (race_type, group_key), arr in group_seconds.items():
+            if len(arr) == 0:
+                continue
+            canonical = race_map.setdefault(race_type, canonical_race_type(race_type))
+            tables[f"{canonical}__{group_key}"][event_id] = {
+                "race_type": race_type,
+                "finishers": int(len(arr)),
+                "pr_table": build_pr_table(arr),
+            }
+        events[event_id] = {"event_name": metadata["event_name"], "race_types": race_map}
+
+    shared = {key: per_event for key, per_event in tables.items() if len(per_event) >= 2}
+    return {
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "steps": PR_TABLE_STEPS,
+        "percentile_precision": "0.1%",
+        "events": events,
+        "tables": dict(sorted(shared.items())),
+    }
+
+
+INDEX_HTML = "index.html"
+INDEX_SCRIPTS_BEGIN = "<!-- optional-data-scripts:begin -->"
+INDEX_SCRIPTS_END = "<!-- optional-data-scripts:end -->"
+
+
+def update_index_scripts(index_path: str = INDEX_HTML, shards: bool = False, events: list[dict] | None = None):
+    """
+    改寫 index.html 標記區塊裡的 <script>：shards 時載入 data/manifest.js（shard 按需下載），
+    否則載入 events（預設 EVENTS）各賽事整包的 {id}_data.js；equivalence.js 存在就一併載入。
+    只引用實際存在的檔案，訪客不會收到 404。
+    """
+    if not os.path.exists(index_path):
+        return
+    with open(index_path, encoding="utf-8", newline="") as f:
+        html = f.read()
+    begin, end = html.find(INDEX_SCRIPTS_BEGIN), html.find(INDEX_SCRIPTS_END)
+    if begin < 0 or end < begin:
+        print(f"⚠️ {index_path} 沒有 {INDEX_SCRIPTS_BEGIN} 區塊，略過")
+        return
+
+    nl = "\r\n" if "\r\n" in html else "\n"
+    indent = html[html.rfind("\n", 0, begin) + 1:begin]
+    root = os.path.dirname(index_path)
+    data_scripts = ([f"{SHARD_DIR}/{SITE_MANIFEST}"] if shards
+                    else [f"{e['id']}_data.js" for e in (events or EVENTS)])
+    scripts = [url for url in (*data_scripts, EQUIVALENCE_JS) if os.path.exists(os.path.join(root, url))]
+    block = INDEX_SCRIPTS_BEGIN + "".join(f'{nl}{indent}<script src="{url}"></script>' for url in scripts)
+    updated = html[:begin] + block + nl + indent + html[end:]
+    if updated != html:
+        with open(index_path, "w", encoding="utf-8", newline="") as f:
+            f.write(updated)
+        print(f"🔗 更新 {index_path} 載入的資料檔：{', '.join(scripts) or '（無）'}")
+
+
+def output_equivalence_js(equivalence: dict, js_filename: str = EQUIVALENCE_JS):
+    """輸出 window.marathonEquivalence（index.html 的跨賽事換算區塊使用）"""
+    with open(js_filename, "w", encoding="utf-8") as f:
+        f.write("// 跨賽事 PR 換算表：各賽事同賽別同分組的 0.1% PR → 時間\n")
+        f.write("window.marathonEquivalence = ")
+        json.dump(equivalence, f, ensure_ascii=False, separators=(",", ":"))
+        f.write(";\n")
+    n_pairs = sum(len(v) * (len(v) - 1) // 2 for v in equivalence["tables"].values())
+    print(f"🔁 輸出：{js_filename}（{len(equivalence['tables'])} 個分組 / {n_pairs} 組賽事配對）")
+
+
 # ========= 🎯 主程式：支援多賽事擴充 =========
+
+# 🌟 賽事配置表（未來加新賽事只要加一列！）
+EVENTS = [
+    {
+        "id": "2025_tpe",
+        "name": "2025台北馬拉松",
+        "excel": "2025_台北馬拉松_完整成績.xlsx",
+        "date": "2025-12-21",
+        "race_types": ["MA", "HM"],
+        "total_count": 0  # 會自動計算
+    },
+    {
+        "id": "2026_chartered_tpe", 
+        "name": "2026渣打台北公益馬拉松",
+        "excel": "2026_渣打台北馬拉松_完整成績.xlsx",
+        "rank_url": "https://www.bravelog.tw/contest/rank/2026011101",  # publish_event.py 直接爬取用
+        "date": "2026-01-18",
+        "race_types": ["全程馬拉松(42.195KM)", "半程馬拉松(21.0975km)", "11KM"],
+        "total_count": 0
+    }
+    # 未來加新賽事：
+    # {
+    #     "id": "2027_tpe_full", 
+    #     "name": "2027台北馬拉松",
+    #     "excel": "2027_xxx.xlsx",
+    #     "rank_url": "https://www.bravelog.tw/contest/rank/xxxxxxxxxx",  # 可省略；有設定才能用 publish_event.py
+    #     "date": "2027-12-19",
+    #     "race_types": ["MA", "HM"],
+    #     "total_count": 0,
+    #     "pr_only": False  # True：只輸出 dense 名次 / PR 查表，不輸出 sorted_seconds
+    # }
+]
+
+
+def write_event_outputs(event: dict, group_seconds: dict[tuple[str, str], np.ndarray],
+                        options: dict, report: dict | None = None) -> dict:
+    """
+    由整理好的秒數寫出 {id}_data.js（options["shards"] 時另寫 shard 與 manifest 片段），回傳 metadata。
+    Excel 建置（build_event）與直接爬取（publish_event.py）共用。
+    """
+    js_filename = f"{event['id']}_data.js"
+    n_keys = sum(1 for arr in group_seconds.values() if len(arr))
+    entries, metadata = build_data(event.get("excel"), event, group_seconds,
+                                   dense_tables=options.get("dense_tables", False),
+                                   report=report)
+    shards = EventShardWriter(metadata, event, compact=options["compact"]) if options.get("shards") else None
+    with timed_stage(report, "write_js") as stage:
+        output_event_js(entries, metadata, js_filename, compact=options["compact"],
+                        on_item=shards.add if shards else None)
+        if shards:
+            shards.close()
+        stage["rows"] = n_keys
+    return metadata
+
+
+def build_event(event: dict, options: dict, previous_build_key: str | None = None,
+                force: bool = False, trace_memory: bool = False) -> dict:
+    """
+    建置單一賽事（可在子行程中執行）。
+    不會拋出例外，成功 / 略過 / 失敗都以結果 dict 回傳：
+        {"event_id", "name", "status": "built" | "skipped" | "failed",
+         "error", "excel_sha256", "build_key", "js", "built_at", "elapsed_sec",
+         "stages": {階段: {"wall_sec", "rows", "calls", "peak_rss_mb", ...}},
+         "peak_rss_mb", "peak_tracemalloc_mb"}
+    write_js 的耗時包含串流中才計算的 histograms / sorted_seconds / dense_tables 與 shard 寫出。
+    trace_memory=True 時以 tracemalloc 記錄各階段 Python 配置峰值（會變慢）。
+    """
+    started = time.perf_counter()
+    js_filename = f"{event['id']}_data.js"
+    report = new_stage_report(event["id"])
+    if trace_memory:
+        tracemalloc.start()
+    result = {
+        "event_id": event["id"],
+        "name": event["name"],
+        "status": "failed",
+        "error": None,
+        "excel_sha256": None,
+        "build_key": None,
+        "js": js_filename,
+        "built_at": None,
+    }
+    try:
+        excel_path = event["excel"]
+        excel_hash = file_sha256(excel_path)
+        build_key = event_build_key(event, excel_hash, options)
+        result["excel_sha256"] = excel_hash
+        result["build_key"] = build_key
+
+        outputs_exist = os.path.exists(js_filename)
+        if options.get("shards"):
+            outputs_exist = outputs_exist and event_shards_exist(event["id"])
+
+        if not force and previous_build_key == build_key and outputs_exist:
+            print(f"⏭️ {event['name']} 未變更，略過（{js_filename}）\n")
+            result["status"] = "skipped"
+        else:
+            group_seconds = cached_group_seconds(excel_path, excel_hash, force=force, report=report)
+            metadata = write_event_outputs(event, group_seconds, options, report)
+            result["status"] = "built"
+            result["built_at"] = metadata["generated_at"]
+            for line in format_stage_report(report):
+                print(line)
+            print()
+    except Exception as e:
+        print(f"❌ {event['name']} 處理失敗：{e}")
+        result["error"] = str(e)
+    finally:
+        if trace_memory:
+            tracemalloc.stop()
+    result["elapsed_sec"] = round(time.perf_counter() - started, 3)
+    result["stages"] = report["stages"]
+    result["peak_rss_mb"] = peak_rss_mb()
+    traced = [s["peak_tracemalloc_mb"] for s in report["stages"].values() if "peak_tracemalloc_mb" in s]
+    result["peak_tracemalloc_mb"] = max(traced) if traced else None
+    return result
+
+
+def run_builds(events: list[dict], options: dict, force: bool = False, workers: int = 1,
+               trace_memory: bool = False) -> list[dict]:
+    """
+    依序或平行建置所有賽事，回傳與 events 同順序的結果列表。
+    workers > 1 時以 process pool 平行處理（每場賽事互相獨立）。
+    """
+    manifest = load_build_manifest()
+    previous = {e["id"]: manifest.get(e["id"], {}).get("build_key") for e in events}
+
+    if workers <= 1 or len(events) <= 1:
+        results = [build_event(e, options, previous[e["id"]], force, trace_memory) for e in events]
+    else:
+        results = [None] * len(events)
+        with ProcessPoolExecutor(max_workers=min(workers, len(events))) as pool:
+            futures = {
+                pool.submit(build_event, e, options, previous[e["id"]], force, trace_memory): i
+                for i, e in enumerate(events)
+            }
+            for future in as_completed(futures):
+                i = futures[future]
+                try:
+                    results[i] = future.result()
+                except Exception as e:
+                    # 子行程本身掛掉（例如 BrokenProcessPool）也當作該賽事失敗
+                    print(f"❌ {events[i]['name']} 處理失敗：{e}")
+                    results[i] = {
+                        "event_id": events[i]["id"], "name": events[i]["name"],
+                        "status": "failed", "error": str(e), "excel_sha256": None, "build_key": None,
+                        "js": f"{events[i]['id']}_data.js", "built_at": None, "elapsed_sec": None,
+                        "stages": {}, "peak_rss_mb": None, "peak_tracemalloc_mb": None,
+                    }
+
+    # 建置紀錄只在主行程更新，避免多個行程同時寫檔
+    for r in results:
+        if r["status"] == "built":
+            manifest[r["event_id"]] = {"build_key": r["build_key"], "js": r["js"], "built_at": r["built_at"]}
+    save_build_manifest(manifest)
+    evict_build_cache()
+    if options.get("shards"):
+        output_site_manifest(events)
+    return results
+
+
+def record_published_build(event: dict, options: dict, built_at: str, cache_dir: str = BUILD_CACHE_DIR):
+    """
+    publish_event.py 直接由網站寫出 {id}_data.js 後呼叫：建置紀錄記成「目前的 Excel + 這次的選項」，
+    下次 run_builds 在 Excel 與選項都沒變時略過這個賽事，不會用較舊的 Excel 蓋掉剛發布的檔案。
+    Excel 內容更新、選項改變或 --force 時以 Excel 為準重新建置。
+    """
+    excel_path = event.get("excel")
+    excel_hash = file_sha256(excel_path) if excel_path and os.path.exists(excel_path) else None
+    manifest = load_build_manifest(cache_dir)
+    manifest[event["id"]] = {
+        "build_key": event_build_key(event, excel_hash, options) if excel_hash else None,
+        "js": f"{event['id']}_data.js",
+        "built_at": built_at,
+        "source": "publish_event",
+    }
+    save_build_manifest(manifest, cache_dir)
+
+
+def print_build_summary(results: list[dict], elapsed_sec: float, workers: int):
+    counts = {status: sum(1 for r in results if r["status"] == status)
+              for status in ("built", "skipped", "failed")}
+    print(f"📋 建置結果：{counts['built']} 成功 / {counts['skipped']} 略過 / {counts['failed']} 失敗"
+          f"（共 {elapsed_sec:.1f} 秒，workers={workers}）")
+    icons = {"built": "✅", "skipped": "⏭️", "failed": "❌"}
+    for r in results:
+        line = f"   {icons[r['status']]} {r['name']}"
+        if r.get("elapsed_sec") is not None:
+            line += f" ({r['elapsed_sec']:.1f}s)"
+        # 只看頂層階段（write_js 已包含串流中計算的 histograms 等）
+        top = {k: v for k, v in (r.get("stages") or {}).items()
+               if k not in ("histograms", "sorted_seconds", "dense_tables")}
+        if top:
+            slowest = max(top, key=lambda k: top[k]["wall_sec"])
+            line += f" 最慢：{slowest} {top[slowest]['wall_sec']:.1f}s"
+        if r["error"]:
+            line += f"：{r['error']}"
+        print(line)
+
+
+def write_run_report(path: str, results: list[dict], options: dict, workers: int, elapsed_sec: float):
+    """把這次建置的各賽事、各階段量測寫成 JSON"""
+    report = {
+        "generated_at": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "options": options,
+        "workers": workers,
+        "elapsed_sec": round(elapsed_sec, 3),
+        "events": results,
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report, f, ensure_ascii=False, indent=2)
+    print(f"🧾 量測報告：{path}")
+
+
 def main():
     """支援未來無限擴充新賽事！"""
-    
-    # 🌟 賽事配置表（未來加新賽事只要加一列！）
-    EVENTS = [
-        {
-            "id": "2025_tpe",
-            "name": "2025台北馬拉松",
-            "excel": "2025_台北馬拉松_完整成績.xlsx",
-            "date": "2025-12-21",
-            "race_types": ["MA", "HM"],
-            "total_count": 0  # 會自動計算
-        },
-        {
-            "id": "2026_chartered_tpe", 
-            "name": "2026渣打台北公益馬拉松",
-            "excel": "2026_渣打台北馬拉松_完整成績.xlsx",
-            "date": "2026-01-18",
-            "race_types": ["全程馬拉松(42.195KM)", "半程馬拉松(21.0975km)", "11KM"],
-            "total_count": 0
-        }
-        # 未來加新賽事：
-        # {
-        #     "id": "2027_tpe_full", 
-        #     "name": "2027台北馬拉松",
-        #     "excel": "2027_xxx.xlsx",
-        #     "date": "2027-12-19",
-        #     "race_types": ["MA", "HM"],
-        #     "total_count": 0
-        # }
-    ]
-    
-    for event in EVENTS:
-        try:
-            excel_path = event["excel"]
-            combined, metadata = build_data(excel_path, event)
-            js_filename = f"{event['id']}_data.js"
-            output_event_js(combined, metadata, js_filename)
-            print()
-        except Exception as e:
-            print(f"❌ {event['name']} 處理失敗：{e}")
+    parser = argparse.ArgumentParser(description="把賽事成績 Excel 轉成網頁用的 {id}_data.js")
+    parser.add_argument("--compact", action="store_true",
+                        help="sorted_seconds 以 delta + base64 typed array 輸出（檔案小很多）")
+    parser.add_argument("--shards", action="store_true",
+                        help=f"另外輸出 {SHARD_DIR}/{SITE_MANIFEST} 與每個 (賽事, 賽別) 的 shard，供網頁按需載入")
+    parser.add_argument("--dense-tables", action="store_true",
+                        help="每個分組附上 dense 名次表與 0.1%% PR 反查表（網頁 O(1) 查詢）；"
+                             "賽事設定 \"pr_only\": True 時自動開啟並省略 sorted_seconds")
+    parser.add_argument("--force", action="store_true",
+                        help="忽略建置快取，全部賽事重新建置")
+    parser.add_argument("--workers", type=int, default=1,
+                        help="平行建置的行程數（預設 1 = 依序；0 = CPU 核心數）")
+    parser.add_argument("--store", nargs="?", const=STORE_DIR, metavar="DIR",
+                        help=f"另外把所有賽事的秒數寫成一個 memory-mapped 秒數庫（預設 {STORE_DIR}/）")
+    parser.add_argument("--equivalence", action="store_true",
+                        help=f"輸出跨賽事 PR 換算表 {EQUIVALENCE_JS}（同賽別、同分組的賽事兩兩換算）")
+    parser.add_argument("--report", metavar="PATH",
+                        help="把各賽事、各階段的耗時 / 筆數 / 記憶體寫成 JSON")
+    parser.add_argument("--trace-memory", action="store_true",
+                        help="以 tracemalloc 記錄各階段 Python 記憶體峰值（較慢）")
+    args = parser.parse_args()
+
+    workers = args.workers if args.workers > 0 else (os.cpu_count() or 1)
+    options = {"compact": args.compact, "shards": args.shards, "dense_tables": args.dense_tables}
+
+    started = time.perf_counter()
+    results = run_builds(EVENTS, options, force=args.force, workers=workers,
+                         trace_memory=args.trace_memory)
+    if args.store:
+        build_seconds_store(EVENTS, results, args.store)
+    if args.equivalence:
+        output_equivalence_js(build_equivalence_tables(iter_built_event_seconds(EVENTS, results)))
+    update_index_scripts(shards=args.shards)
+    elapsed_sec = time.perf_counter() - started
+    print_build_summary(results, elapsed_sec, workers)
+    if args.report:
+        write_run_report(args.report, results, options, workers, elapsed_sec)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
@@ -0,0 +1,158 @@
+"""
+rank_server 壓力測試：以固定速率（open loop）送出查詢，回報延遲分位數
+
+    python rank_server.py --root . &
+    python loadtest_rank_server.py --rate 500 --duration 10
+    python loadtest_rank_server.py --rate 50 --batch 200 --output loadtest.json
+
+查詢內容從 /events 取得的分組隨機產生（rank / pr 各半；--batch 時改送 POST /batch）。
+延遲從「排定送出的時間」開始算，伺服器來不及處理時排隊的時間也會算進去，
+才不會因為請求被延後送出而低估 p99。
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+from urllib.parse import urlencode
+import numpy as np
+
+
+async def http_request(reader, writer, method: str, target: str, host: str, body: bytes = b"") -> tuple[int, bytes]:
+    """在既有的 keep-alive 連線上送一個請求，回傳 (status, body)"""
+    head = (f"{method} {target} HTTP/1.1\r\nHost: {host}\r\n"
+            f"Content-Length: {len(body)}\r\nContent-Type: application/json\r\n\r\n")
+    writer.write(head.encode("utf-8") + body)
+    await writer.drain()
+
+    status_line = await reader.readline()
+    if not status_line:
+        raise ConnectionError("連線被關閉")
+    status = int(status_line.split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        if name.strip().lower() == "content-length":
+            length = int(value.strip())
+    return status, await reader.readexactly(length)
+
+
+def make_query_factory(events: list[dict], seed: int):
+    """從 /events 的分組清單隨機產生查詢"""
+    rng = random.Random(seed)
+    groups = [(e["event_id"], rt, g) for e in events for rt, gs in e["race_types"].items() for g in gs]
+    if not groups:
+        raise SystemExit("❌ 伺服器沒有任何分組資料")
+
+    def make_query() -> dict:
+        event, race_type, group = rng.choice(groups)
+        q = {"event": event, "race_type": race_type, "group": group}
+        if rng.random() < 0.5:
+            sec = rng.randint(40 * 60, 7 * 3600)
+            q["time"] = f"{sec // 3600:02d}:{sec % 3600 // 60:02d}:{sec % 60:02d}"
+        else:
+            q["pr"] = round(rng.uniform(0, 100), 1)
+        return q
+
+    return make_query
+
+
+async def run_load(host: str, port: int, rate: float, duration: float, connections: int,
+                   batch: int, seed: int) -> dict:
+    reader, writer = await asyncio.open_connection(host, port)
+    status, body = await http_request(reader, writer, "GET", "/events", host)
+    writer.close()
+    make_query = make_query_factory(json.loads(body), seed)
+
+    n_requests = int(rate * duration)
+    queue: asyncio.Queue = asyncio.Queue()
+    latencies: list[float] = []
+    errors = {"http": 0, "connection": 0}
+
+    async def worker():
+        conn = None
+        while True:
+            item = await queue.get()
+            if item is None:
+                break
+            scheduled, method, target, payload = item
+            try:
+                if conn is None:
+                    conn = await asyncio.open_connection(host, port)
+                status, _ = await http_request(*conn, method, target, host, payload)
+                if status != 200:
+                    errors["http"] += 1
+                latencies.append(time.perf_counter() - scheduled)
+            except (ConnectionError, asyncio.IncompleteReadError, OSError):
+                errors["connection"] += 1
+                conn = None
+        if conn is not None:
+            conn[1].close()
+
+    workers = [asyncio.create_task(worker()) for _ in range(connections)]
+    started = time.perf_counter()
+    for i in range(n_requests):
+        scheduled = started + i / rate
+        delay = scheduled - time.perf_counter()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        if batch > 1:
+            payload = json.dumps({"queries": [make_query() for _ in range(batch)]}).encode("utf-8")
+            queue.put_nowait((scheduled, "POST", "/batch", payload))
+        else:
+            q = make_query()
+            path = "/rank" if "time" in q else "/pr"
+            queue.put_nowait((scheduled, "GET", f"{path}?{urlencode(q)}", b""))
+    for _ in workers:
+        queue.put_nowait(None)
+    await asyncio.gather(*workers)
+    elapsed = time.perf_counter() - started
+
+    lat_ms = np.array(latencies) * 1000
+    pct = (lambda p: round(float(np.percentile(lat_ms, p)), 3)) if len(lat_ms) else (lambda p: None)
+    return {
+        "target_rate": rate,
+        "duration_sec": duration,
+        "connections": connections,
+        "batch": batch,
+        "requests": n_requests,
+        "completed": len(latencies),
+        "errors": errors,
+        "achieved_rate": round(len(latencies) / elapsed, 1) if elapsed else None,
+        "queries_per_sec": round(len(latencies) * max(batch, 1) / elapsed, 1) if elapsed else None,
+        "latency_ms": {"p50": pct(50), "p90": pct(90), "p99": pct(99),
+                       "max": round(float(lat_ms.max()), 3) if len(lat_ms) else None},
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="rank_server 壓力測試（p50 / p99 延遲）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rate", type=float, default=200, help="每秒請求數")
+    parser.add_argument("--duration", type=float, default=10, help="測試秒數")
+    parser.add_argument("--connections", type=int, default=16, help="keep-alive 連線數")
+    parser.add_argument("--batch", type=int, default=1, help="> 1 時每個請求是含 N 筆查詢的 POST /batch")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="結果另存 JSON")
+    args = parser.parse_args()
+
+    result = asyncio.run(run_load(args.host, args.port, args.rate, args.duration,
+                                  args.connections, args.batch, args.seed))
+    lat = result["latency_ms"]
+    print(f"📈 {result['completed']:,}/{result['requests']:,} 請求完成，"
+          f"實際 {result['achieved_rate']} req/s（{result['queries_per_sec']} 查詢/s）")
+    print(f"   ⏱️ p50 {lat['p50']} ms / p90 {lat['p90']} ms / p99 {lat['p99']} ms / max {lat['max']} ms")
+    if any(result["errors"].values()):
+        print(f"   ❌ 錯誤：HTTP {result['errors']['http']} / 連線 {result['errors']['connection']}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+        print(f"✅ 輸出：{args.output}")
+
+
+if __name__ == "__main__":
+    main()
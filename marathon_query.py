@@ -0,0 +1,439 @@
+"""
+marathon_query：在 Python 裡查名次 / PR，算法與 index.html 相同
+
+讀取 extract_excel_result 產生的資料（{id}_data.js、--compact、--dense-tables、
+data/manifest.js + shard、--store 的 memory-mapped 秒數庫皆可），提供：
+    rank_for_time   輸入時間 → 名次 / 總人數 / 贏過人數 / PR（= lookupPrForTime）
+    time_for_pr     輸入 PR → 剛好達到該 PR 的時間（= lookupTimeForPr）
+    rank_many       同一分組大量時間一次 searchsorted
+    equivalent_time 跨賽事換算：同樣的 PR 在另一場賽事的時間（讀 equivalence.js）
+
+批次 CLI：
+    python marathon_query.py team.csv -o team_ranked.csv
+    python marathon_query.py team.csv --root /path/to/site
+    python marathon_query.py team.csv --store marathon_store
+CSV 需要 賽事 / 賽別 / 分組 / 完賽時間 四欄（或 event / race_type / group / time）；
+賽事可填 event_id 或賽事名稱，分組可填 ALL、原始分組或「一般/男合計」等性別合計。
+"""
+import os
+import re
+import sys
+import glob
+import json
+import math
+import argparse
+import numpy as np
+import pandas as pd
+
+from extract_excel_result import (
+    SHARD_DIR,
+    SITE_MANIFEST,
+    STORE_DIR,
+    EQUIVALENCE_JS,
+    PR_TABLE_STEPS,
+    decode_sorted_seconds,
+    open_seconds_store,
+    parse_time_column,
+    seconds_to_time_str,
+    time_str_to_seconds,
+)
+
+
+# ========= 讀取 .js 資料檔 =========
+
+# window.marathonData['id'] = {...};  /  window.marathonShards['sid'] = {...};  /  window.marathonManifest = {...};
+_JS_ASSIGNMENT = re.compile(r"^window\.(marathonData|marathonShards|marathonManifest|marathonEquivalence)"
+                            r"(?:\['([^']+)'\])?\s*=\s*",
+                            re.MULTILINE)
+
+
+def parse_data_js(path: str) -> list[tuple[str, str | None, dict]]:
+    """
+    解析 build 產生的 .js，回傳所有 (變數名, key, 物件)：
+        [("marathonData", "2025_tpe", {...})]
+    物件本身是 JSON，只要跳過前面的 window.xxx[...] = 即可。
+    """
+    with open(path, encoding="utf-8") as f:
+        text = f.read()
+    decoder = json.JSONDecoder()
+    result = []
+    for m in _JS_ASSIGNMENT.finditer(text):
+        start = m.end()
+        if text.startswith(f"window.{m.group(1)} ||", start):
+            continue  # window.marathonData = window.marathonData || {};
+        obj, _ = decoder.raw_decode(text, start)
+        result.append((m.group(1), m.group(2), obj))
+    return result
+
+
+def _time_to_seconds(t) -> int | None:
+    """'HH:MM:SS' → 秒數；空值或格式錯誤回傳 None"""
+    try:
+        return time_str_to_seconds(str(t).strip())
+    except ValueError:
+        return None
+
+
+# ========= 單一分組的查詢 =========
+
+def _sorted_seconds(entry: dict) -> np.ndarray | None:
+    """binsAndPr 單一 key 的 sorted_seconds（解碼 packed 後快取回 entry）"""
+    if "_sorted" not in entry:
+        if "sorted_seconds" in entry:
+            entry["_sorted"] = np.asarray(entry["sorted_seconds"], dtype=np.int64)
+        elif "sorted_seconds_packed" in entry:
+            entry["_sorted"] = decode_sorted_seconds(entry["sorted_seconds_packed"]).astype(np.int64)
+        else:
+            entry["_sorted"] = None
+    return entry["_sorted"]
+
+
+def _decoded_table(entry: dict, name: str) -> np.ndarray | None:
+    cache = f"_{name}"
+    if cache not in entry:
+        entry[cache] = (decode_sorted_seconds(entry[name]).astype(np.int64)
+                        if name in entry else None)
+    return entry[cache]
+
+
+def entry_count(entry: dict) -> int:
+    """分組總人數"""
+    if "finishers" in entry:
+        return int(entry["finishers"])
+    rank_table = _decoded_table(entry, "rank_table")
+    if rank_table is not None:
+        return int(rank_table[-1])
+    arr = _sorted_seconds(entry)
+    return 0 if arr is None else len(arr)
+
+
+def count_faster(entry: dict, seconds) -> np.ndarray:
+    """
+    比 seconds 快的人數（與 index.html 的 lowerBound / rank_table 相同），可一次查一整個陣列。
+    有 dense rank_table 時直接查表，否則對 sorted_seconds 做 searchsorted。
+    """
+    seconds = np.asarray(seconds, dtype=np.int64)
+    rank_table = _decoded_table(entry, "rank_table")
+    if rank_table is not None:
+        start = entry["rank_table"]["start_sec"]
+        idx = np.clip(seconds - start, 0, len(rank_table) - 1)
+        return np.where(seconds <= start, 0, rank_table[idx])
+    arr = _sorted_seconds(entry)
+    if arr is None:
+        raise ValueError("此分組沒有 sorted_seconds 或 rank_table")
+    if arr.dtype != seconds.dtype:
+        # 秒數庫是 uint32 memmap：把查詢值轉成同型別，避免 searchsorted 複製整個分組
+        seconds = np.clip(seconds, 0, np.iinfo(arr.dtype).max).astype(arr.dtype)
+    return np.searchsorted(arr, seconds, side="left")
+
+
+def rank_many(entry: dict, seconds) -> dict[str, np.ndarray]:
+    """
+    一次算一批時間的名次：
+        {"rank", "total", "slower", "pr"}（pr 為 0~100 的百分比，未四捨五入）
+    """
+    total = entry_count(entry)
+    faster = count_faster(entry, seconds)
+    slower = np.maximum(0, total - faster)
+    return {
+        "rank": faster + 1,
+        "total": np.full(len(faster), total, dtype=np.int64),
+        "slower": slower,
+        "pr": slower / total * 100 if total else np.full(len(faster), np.nan),
+    }
+
+
+def entry_time_for_pr(entry: dict, pr_pct: float) -> dict:
+    """
+    PR 反查（與 lookupTimeForPr 相同）：
+        贏過人數 = floor(PR% × N)，目標名次 = N − 贏過人數（PR 100% 時取第 1 名）
+    PR 落在 0.1% 格點且有 pr_table 時查表；否則取 sorted_seconds 的第 目標名次 位；
+    只有查表（pr_only）時取最接近的 0.1% 格點。
+    """
+    total = entry_count(entry)
+    slower = math.floor((pr_pct / 100) * total)
+    target_rank = max(total - slower, 1)
+
+    steps = math.floor(pr_pct * 10 + 0.5)  # 與 Math.round 相同（.5 進位），round() 是銀行家捨入
+    on_grid = abs(pr_pct * 10 - steps) < 1e-9
+    pr_table = _decoded_table(entry, "pr_table")
+    arr = _sorted_seconds(entry)
+    if pr_table is not None and (on_grid or arr is None):
+        seconds = int(pr_table[PR_TABLE_STEPS - steps])
+    else:
+        seconds = int(arr[target_rank - 1])
+    return {"seconds": seconds, "time": seconds_to_time_str(seconds),
+            "rank": target_rank, "total": total, "slower": slower}
+
+
+# ========= 跨賽事換算 =========
+
+def load_equivalence(path: str = EQUIVALENCE_JS) -> dict:
+    """讀取 extract_excel_result --equivalence 產生的 equivalence.js"""
+    for kind, _, obj in parse_data_js(path):
+        if kind == "marathonEquivalence":
+            return obj
+    raise ValueError(f"{path} 不是跨賽事換算表")
+
+
+def _resolve_equivalence_event(equivalence: dict, event: str) -> str:
+    if event in equivalence["events"]:
+        return event
+    for event_id, info in equivalence["events"].items():
+        if info["event_name"] == event:
+            return event_id
+    raise KeyError(f"換算表沒有賽事：{event}")
+
+
+def equivalent_time(equivalence: dict, from_event: str, to_event: str,
+                    race_type: str, group: str, time) -> dict:
+    """
+    from_event 的 (賽別, 分組) 跑 time → 同樣 PR 在 to_event 同賽別同分組的時間（與 index.html 區塊 4 相同）。
+    race_type 可以是 from_event 的原始賽別名稱或統一名稱（MA / HM / ...）。
+    只讀兩場賽事的 0.1% pr_table，不需要 sorted_seconds。
+    """
+    seconds = time if isinstance(time, (int, np.integer)) else _time_to_seconds(time)
+    if seconds is None:
+        raise ValueError(f"時間格式錯誤：{time}")
+    src = _resolve_equivalence_event(equivalence, from_event)
+    dst = _resolve_equivalence_event(equivalence, to_event)
+    canonical = equivalence["events"][src]["race_types"].get(race_type, race_type)
+    per_event = equivalence["tables"].get(f"{canonical}__{group}", {})
+    if src not in per_event or dst not in per_event:
+        raise KeyError(f"{canonical} / {group} 沒有 {src} ↔ {dst} 的換算表")
+
+    from_table = _decoded_table(per_event[src], "pr_table")
+    to_table = _decoded_table(per_event[dst], "pr_table")
+    i = min(int(np.searchsorted(from_table, seconds, side="left")), len(from_table) - 1)
+    target = int(to_table[i])
+    return {
+        "pr": (len(from_table) - 1 - i) / 10,
+        "seconds": target,
+        "time": seconds_to_time_str(target),
+        "race_type": per_event[dst]["race_type"],
+        "finishers": per_event[dst]["finishers"],
+    }
+
+
+# ========= 資料集 =========
+
+class MarathonDataset:
+    """
+    一或多場賽事的 binsAndPr，以 (賽事, 賽別) 為單位載入 / 釋放。
+    from_root() 會優先使用 data/manifest.js（shard 按需載入），沒有時讀取 *_data.js；
+    lazy=True 時 *_data.js 只留 metadata 與分組清單，查詢到該賽別才重新讀取。
+    from_store() 開啟 memory-mapped 秒數庫，每個分組只是 memmap 的一段 view。
+    """
+
+    def __init__(self):
+        self.events: dict[str, dict] = {}     # event_id → {"metadata", "binsAndPr"}
+        self.groups: dict[tuple[str, str], list[str]] = {}  # (event_id, 賽別) → 分組列表
+        self._sources: dict[tuple[str, str], str] = {}     # (event_id, 賽別) → 資料檔路徑
+        self._loaded: set[tuple[str, str]] = set()
+        self._root = "."
+
+    @classmethod
+    def from_root(cls, root: str = ".", lazy: bool = False) -> "MarathonDataset":
+        ds = cls()
+        ds._root = root
+        manifest_path = os.path.join(root, SHARD_DIR, SITE_MANIFEST)
+        if os.path.exists(manifest_path):
+            ds.load_manifest(manifest_path)
+        else:
+            for path in sorted(glob.glob(os.path.join(root, "*_data.js"))):
+                ds.load_file(path)
+            if lazy:
+                for event_id, race_type in list(ds._loaded):
+                    ds.unload_race(event_id, race_type)
+        return ds
+
+    @classmethod
+    def from_store(cls, store_dir: str = STORE_DIR) -> "MarathonDataset":
+        """開啟 extract_excel_result --store 寫出的秒數庫（只讀 index.json，秒數按頁讀取）"""
+        ds = cls()
+        index, seconds = open_seconds_store(store_dir)
+        for event_id, metadata in index["events"].items():
+            ds.events[event_id] = {"metadata": metadata, "binsAndPr": {}}
+        for event_id, race_type, group_key, offset, count in index["groups"]:
+            ds.events[event_id]["binsAndPr"][f"{event_id}__{race_type}__{group_key}"] = {
+                "finishers": count,
+                "_sorted": seconds[offset:offset + count],
+            }
+            ds.groups.setdefault((event_id, race_type), []).append(group_key)
+        return ds
+
+    def _merge(self, event_id: str, entries: dict, race_types: set | None = None):
+        """把 binsAndPr 併入賽事；有指定 race_types 時只留這些賽別"""
+        bins = self.events[event_id]["binsAndPr"]
+        for full_key, entry in entries.items():
+            _, rt, group_key = full_key.split("__", 2)
+            if race_types is not None and rt not in race_types:
+                continue
+            bins[full_key] = entry
+            groups = self.groups.setdefault((event_id, rt), [])
+            if group_key not in groups:
+                groups.append(group_key)
+            self._loaded.add((event_id, rt))
+
+    def load_file(self, path: str, race_type: str | set | None = None, parsed: list | None = None):
+        """
+        載入單一 {id}_data.js 或 shard .js（race_type：只保留該賽別，可給多個）。
+        parsed 為已經解析好的 parse_data_js(path)（例如在別的執行緒讀好），有給就不再讀檔。
+        """
+        race_types = {race_type} if isinstance(race_type, str) else race_type
+        for kind, key, obj in parsed if parsed is not None else parse_data_js(path):
+            if kind == "marathonData":
+                self.events.setdefault(key, {"metadata": obj["metadata"], "binsAndPr": {}})
+                self.events[key]["metadata"] = obj["metadata"]
+                for full_key in obj["binsAndPr"]:
+                    self._sources.setdefault((key, full_key.split("__", 2)[1]), path)
+                self._merge(key, obj["binsAndPr"], race_types)
+            elif kind == "marathonShards":
+                event_id = next((eid for (eid, _), src in self._sources.items()
+                                 if os.path.basename(src) == f"{key}.js"),
+                                key.rsplit("__", 1)[0])
+                self.events.setdefault(event_id, {"metadata": {"event_id": event_id}, "binsAndPr": {}})
+                self._merge(event_id, obj, race_types)
+            elif kind == "marathonManifest":
+                self._add_manifest(obj)
+
+    def load_manifest(self, path: str):
+        """載入 data/manifest.js；shard 等到查詢時才讀"""
+        for kind, _, obj in parse_data_js(path):
+            if kind == "marathonManifest":
+                self._add_manifest(obj)
+
+    def _add_manifest(self, manifest: dict):
+        for event in manifest.get("events", []):
+            event_id = event["metadata"]["event_id"]
+            self.events.setdefault(event_id, {"metadata": event["metadata"], "binsAndPr": {}})
+            for race_type, shard in event.get("race_types", {}).items():
+                self._sources[(event_id, race_type)] = os.path.join(self._root, shard["url"])
+                self.groups[(event_id, race_type)] = list(shard.get("groups", []))
+
+    def race_source(self, event_id: str, race_type: str) -> str | None:
+        """(賽事, 賽別) 還沒載入時回傳要讀的來源檔；已載入或沒有來源檔時回傳 None"""
+        key = (event_id, race_type)
+        return None if key in self._loaded else self._sources.get(key)
+
+    def load_source(self, path: str, parsed: list | None = None) -> list[tuple[str, str]]:
+        """
+        載入以 path 為來源、目前沒載入的所有賽別，回傳這次載入的 (賽事, 賽別)。
+        舊格式 *_data.js 一個檔含整場賽事，一次讀進所有賽別，不會每個賽別各解析一次整個檔。
+        """
+        keys = [key for key, src in self._sources.items() if src == path and key not in self._loaded]
+        if keys:
+            self.load_file(path, {rt for _, rt in keys}, parsed)
+            self._loaded.update(keys)
+        return keys
+
+    def ensure_race(self, event_id: str, race_type: str) -> list[tuple[str, str]]:
+        """確保 (賽事, 賽別) 已載入；回傳這次一起讀進來的 (賽事, 賽別)（沒有讀檔時為空）"""
+        path = self.race_source(event_id, race_type)
+        return self.load_source(path) if path else []
+
+    def unload_race(self, event_id: str, race_type: str):
+        """釋放 (賽事, 賽別) 的資料；之後查詢時會再從來源檔讀回"""
+        key = (event_id, race_type)
+        if key not in self._sources:
+            return  # 沒有來源檔可以再讀，不能丟
+        prefix = f"{event_id}__{race_type}__"
+        bins = self.events[event_id]["binsAndPr"]
+        for full_key in [k for k in bins if k.startswith(prefix)]:
+            del bins[full_key]
+        self._loaded.discard(key)
+
+    def resolve_event(self, event: str) -> str:
+        """event_id 或賽事名稱 → event_id"""
+        if event in self.events:
+            return event
+        for event_id, data in self.events.items():
+            if data["metadata"].get("event_name") == event:
+                return event_id
+        raise KeyError(f"找不到賽事：{event}")
+
+    def entry(self, event: str, race_type: str, group: str) -> dict:
+        """取得 binsAndPr 單一分組（必要時先載入對應賽別）"""
+        event_id = self.resolve_event(event)
+        self.ensure_race(event_id, race_type)
+        full_key = f"{event_id}__{race_type}__{group}"
+        try:
+            return self.events[event_id]["binsAndPr"][full_key]
+        except KeyError:
+            raise KeyError(f"找不到分組：{full_key}") from None
+
+    def rank_for_time(self, event: str, race_type: str, group: str, time) -> dict:
+        """單筆查名次；time 可以是秒數或 'HH:MM:SS'"""
+        seconds = time if isinstance(time, (int, np.integer)) else _time_to_seconds(time)
+        if seconds is None:
+            raise ValueError(f"時間格式錯誤：{time}")
+        r = rank_many(self.entry(event, race_type, group), [seconds])
+        return {k: (float(v[0]) if k == "pr" else int(v[0])) for k, v in r.items()}
+
+    def time_for_pr(self, event: str, race_type: str, group: str, pr_pct: float) -> dict:
+        if not 0 <= pr_pct <= 100:
+            raise ValueError("PR 必須在 0 ~ 100 之間")
+        return entry_time_for_pr(self.entry(event, race_type, group), pr_pct)
+
+
+# ========= 批次查詢 =========
+
+CSV_COLUMNS = {"event": "賽事", "race_type": "賽別", "group": "分組", "time": "完賽時間"}
+
+
+def rank_table_rows(ds: MarathonDataset, df: pd.DataFrame) -> pd.DataFrame:
+    """
+    df 需有 賽事 / 賽別 / 分組 / 完賽時間 欄，回傳加上 名次 / 總人數 / 贏過人數 / PR / 錯誤 的副本。
+    同一 (賽事, 賽別, 分組) 的所有時間一次 searchsorted。
+    """
+    df = df.rename(columns=CSV_COLUMNS).copy()
+    missing = [c for c in CSV_COLUMNS.values() if c not in df.columns]
+    if missing:
+        raise ValueError(f"CSV 缺少欄位：{', '.join(missing)}")
+
+    seconds, valid = parse_time_column(df["完賽時間"])
+    out = {name: np.full(len(df), np.nan) for name in ("名次", "總人數", "贏過人數", "PR")}
+    errors = np.where(valid, "", "時間格式錯誤").astype(object)
+
+    keys = df[["賽事", "賽別", "分組"]].astype(str)
+    for (event, race_type, group), rows in keys[valid].groupby(["賽事", "賽別", "分組"], sort=False).groups.items():
+        idx = df.index.get_indexer(rows)
+        try:
+            r = rank_many(ds.entry(event, race_type, group), seconds[idx])
+        except (KeyError, ValueError) as e:
+            errors[idx] = str(e).strip("'\"")
+            continue
+        out["名次"][idx] = r["rank"]
+        out["總人數"][idx] = r["total"]
+        out["贏過人數"][idx] = r["slower"]
+        out["PR"][idx] = np.round(r["pr"], 2)
+
+    for name in ("名次", "總人數", "贏過人數"):
+        df[name] = pd.array(np.where(np.isnan(out[name]), None, out[name]), dtype="Int64")
+    df["PR"] = out["PR"]
+    df["錯誤"] = errors
+    return df
+
+
+def main():
+    parser = argparse.ArgumentParser(description="批次查詢名次 / PR（與網頁算法相同）")
+    parser.add_argument("csv", help="輸入 CSV：賽事, 賽別, 分組, 完賽時間")
+    parser.add_argument("-o", "--output", help="輸出 CSV（預設印到螢幕）")
+    parser.add_argument("--root", default=".", help="資料所在目錄（*_data.js 或 data/manifest.js）")
+    parser.add_argument("--store", help="改用 memory-mapped 秒數庫目錄（extract_excel_result --store）")
+    args = parser.parse_args()
+
+    ds = MarathonDataset.from_store(args.store) if args.store else MarathonDataset.from_root(args.root)
+    df = pd.read_csv(args.csv, dtype=str, keep_default_na=False)
+    result = rank_table_rows(ds, df)
+
+    if args.output:
+        result.to_csv(args.output, index=False, encoding="utf-8-sig")
+        ok = int((result["錯誤"] == "").sum())
+        print(f"✅ 輸出：{args.output}（{ok:,} / {len(result):,} 筆成功）")
+    else:
+        result.to_csv(sys.stdout, index=False)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,127 @@
+"""
+爬取成績並直接輸出網頁用的 {id}_data.js（不經過 Excel）
+
+原本的流程是 scrap_result.py → 完整成績.xlsx → extract_excel_result.py → {id}_data.js，
+中間要整份寫出再整份讀回 Excel。這裡把爬到的紀錄直接在記憶體中交給
+group_seconds_from_frame，再用 extract_excel_result 同一套輸出（histogram /
+sorted_seconds / compact / shards），賽事設定一律取自 EVENTS（需有 "rank_url"）。
+有任何頁 / 分組沒抓到（重試用完）就不輸出、以非 0 結束，線上的 {id}_data.js 維持原樣。
+
+發布後會寫進 extract_excel_result 的建置紀錄（.build_cache/builds.json）：之後執行
+extract_excel_result.py 時，只要賽事的 Excel 與輸出選項都沒變，就保留這裡發布的版本；
+Excel 更新（例如重新跑 scrap_result.py）、選項改變或加 --force 時，以 Excel 重新建置並覆蓋。
+
+用法：
+    python publish_event.py --event 2026_chartered_tpe
+    python publish_event.py --event 2026_chartered_tpe --compact --shards --workers 16
+    python publish_event.py --event 2026_chartered_tpe --backend selenium --workers 3
+"""
+import sys
+import time
+import argparse
+import pandas as pd
+
+from scrap_result import (
+    HTTP_WORKERS,
+    RECORD_COLUMNS,
+    ScrapeIncompleteError,
+    scrape_contest_http,
+    scrape_contest_selenium,
+)
+from extract_excel_result import (
+    EVENTS,
+    group_seconds_from_frame,
+    new_stage_report,
+    timed_stage,
+    format_stage_report,
+    write_event_outputs,
+    output_site_manifest,
+    update_index_scripts,
+    record_published_build,
+)
+
+
+def find_event(event_id: str) -> dict:
+    for event in EVENTS:
+        if event["id"] == event_id:
+            return event
+    raise SystemExit(f"❌ EVENTS 裡沒有賽事 {event_id}（可用：{', '.join(e['id'] for e in EVENTS)}）")
+
+
+def scrape_event_records(rank_url: str, backend: str, workers: int) -> list:
+    """
+    用 scrap_result 的 http / selenium 後端抓完整場賽事，回傳紀錄列表；
+    有頁或分組沒抓到時兩個後端都會丟出 ScrapeIncompleteError。
+    """
+    if backend == "http":
+        return scrape_contest_http(rank_url, workers)
+    return scrape_contest_selenium(rank_url, workers)
+
+
+def publish_event(event: dict, records: list, options: dict, report: dict | None = None) -> dict | None:
+    """
+    把爬到的紀錄整理成秒數並寫出 {id}_data.js（與 shards），回傳 metadata。
+    沒有任何紀錄時不寫檔（避免用空資料蓋掉線上的檔案），回傳 None。
+    寫出後記進建置紀錄（見 record_published_build），extract_excel_result.py 不會拿沒變的 Excel 蓋掉。
+    """
+    if not records:
+        print("⚠️ 沒有抓到任何成績資料，不輸出")
+        return None
+    with timed_stage(report, "group_seconds") as stage:
+        df = pd.DataFrame(records, columns=RECORD_COLUMNS)
+        group_seconds = group_seconds_from_frame(df)
+        stage["rows"] = len(df)
+    metadata = write_event_outputs(event, group_seconds, options, report)
+    record_published_build(event, options, metadata["generated_at"])
+    if options.get("shards"):
+        output_site_manifest(EVENTS)
+    update_index_scripts(shards=bool(options.get("shards")))
+    return metadata
+
+
+def main():
+    parser = argparse.ArgumentParser(description="爬取賽事成績並直接輸出 {id}_data.js（不經過 Excel）")
+    parser.add_argument("--event", required=True, help="EVENTS 裡的賽事 id")
+    parser.add_argument("--base-url", help="覆寫賽事設定的 rank_url")
+    parser.add_argument("--backend", choices=["http", "selenium"], default="http",
+                        help="http：直接打成績頁（預設）；selenium：headless Chrome 點選單翻頁")
+    parser.add_argument("--workers", type=int,
+                        help=f"http：同時進行的請求數（預設 {HTTP_WORKERS}）；selenium：並行的 driver 數（預設 1）")
+    parser.add_argument("--compact", action="store_true",
+                        help="sorted_seconds 以 delta + base64 typed array 輸出")
+    parser.add_argument("--shards", action="store_true",
+                        help="另外輸出 shard 與 manifest，供網頁按需載入")
+    parser.add_argument("--dense-tables", action="store_true",
+                        help="每個分組附上 dense 名次表與 0.1%% PR 反查表")
+    args = parser.parse_args()
+
+    event = find_event(args.event)
+    rank_url = args.base_url or event.get("rank_url")
+    if not rank_url:
+        parser.error(f"賽事 {event['id']} 沒有設定 rank_url，請加進 EVENTS 或用 --base-url 指定")
+    workers = max(args.workers or (HTTP_WORKERS if args.backend == "http" else 1), 1)
+    options = {"compact": args.compact, "shards": args.shards, "dense_tables": args.dense_tables}
+
+    started = time.perf_counter()
+    report = new_stage_report(event["id"])
+    try:
+        with timed_stage(report, "scrape") as stage:
+            records = scrape_event_records(rank_url, args.backend, workers)
+            stage["rows"] = len(records)
+    except ScrapeIncompleteError as e:
+        print(f"❌ 抓取不完整，不輸出（{event['id']}_data.js 維持原樣）：{e}")
+        for item in e.missing:
+            print(f"   - {item}")
+        sys.exit(1)
+    metadata = publish_event(event, records, options, report)
+    if metadata is None:
+        sys.exit(1)
+
+    for line in format_stage_report(report):
+        print(line)
+    print(f"✅ {event['name']}：{metadata['total_participants']:,} 人，"
+          f"已輸出 {event['id']}_data.js（共 {time.perf_counter() - started:.1f} 秒）")
+
+
+if __name__ == "__main__":
+    main()
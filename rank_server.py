@@ -0,0 +1,321 @@
+"""
+本機名次查詢服務（asyncio HTTP，只用標準函式庫 + marathon_query）
+
+    python rank_server.py --root . --port 8765 --max-races 8
+    python rank_server.py --store marathon_store
+
+GET  /events                                             賽事 / 賽別 / 分組清單
+GET  /rank?event=&race_type=&group=&time=HH:MM:SS        名次 / PR（= lookupPrForTime）
+GET  /pr?event=&race_type=&group=&pr=90                  PR → 時間（= lookupTimeForPr）
+GET  /histogram?event=&race_type=&group=&bin=5min        histogram（1min / 5min / 10min / 15min）
+POST /batch   {"queries": [{"event", "race_type", "group", "time" | "pr"}, ...]}
+GET  /stats                                              LRU 狀態與請求數
+
+資料以 (賽事, 賽別) 為單位放在記憶體，最多 --max-races 組，超過時釋放最久沒用到的；
+還沒載入的賽別在背景執行緒解析（不卡住其他連線），同一個檔同時只解析一次；
+--store 時直接 memmap 秒數庫（由作業系統分頁快取，不需 LRU），histogram 即時計算。
+回應一律為 UTF-8 JSON；支援 HTTP/1.1 keep-alive。
+"""
+import json
+import asyncio
+import argparse
+from collections import OrderedDict
+from urllib.parse import urlsplit, parse_qs
+import numpy as np
+
+from marathon_query import MarathonDataset, parse_data_js, rank_many, entry_time_for_pr, _time_to_seconds
+from extract_excel_result import histogram_label, build_histogram_pyramid
+
+
+MAX_BODY_BYTES = 4 << 20
+MAX_BATCH_QUERIES = 100_000
+DEFAULT_MAX_RACES = 8
+
+
+class HttpError(Exception):
+    def __init__(self, status: int, message: str):
+        super().__init__(message)
+        self.status = status
+
+
+REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed",
+           413: "Payload Too Large", 500: "Internal Server Error"}
+
+
+# ========= 查詢（含 LRU） =========
+
+class RankService:
+    """包住 MarathonDataset，依 LRU 保留最多 max_races 組 (賽事, 賽別) 的資料"""
+
+    def __init__(self, dataset: MarathonDataset, max_races: int = DEFAULT_MAX_RACES):
+        self.ds = dataset
+        self.max_races = max(max_races, 1)
+        self._lru: OrderedDict[tuple[str, str], None] = OrderedDict()
+        self._loading: dict[str, asyncio.Task] = {}  # 來源檔 → 正在解析的 task
+        self.stats = {"requests": 0, "queries": 0, "loads": 0, "evictions": 0}
+
+    def _touch(self, key: tuple[str, str]):
+        """把 (賽事, 賽別) 標成最近用過，超過 max_races 時釋放最久沒用到的"""
+        self._lru[key] = None
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.max_races:
+            old, _ = self._lru.popitem(last=False)
+            self.ds.unload_race(*old)
+            self.stats["evictions"] += 1
+
+    async def _load(self, path: str, key: tuple[str, str]):
+        """在執行緒裡解析來源檔，回到 event loop 再併入資料集（同一個檔的一起載入，key 排最後）"""
+        parsed = await asyncio.get_running_loop().run_in_executor(None, parse_data_js, path)
+        loaded = self.ds.load_source(path, parsed)
+        if loaded:
+            self.stats["loads"] += 1
+        for other in sorted(loaded, key=lambda k: k == key):
+            self._touch(other)
+
+    async def entry(self, event: str, race_type: str, group: str) -> dict:
+        try:
+            event_id = self.ds.resolve_event(event)
+        except KeyError as e:
+            raise HttpError(404, str(e).strip("'\"")) from None
+        key = (event_id, race_type)
+        if group not in self.ds.groups.get(key, ()):
+            raise HttpError(404, f"找不到分組：{event_id}__{race_type}__{group}")
+        # 等待期間可能被別的請求擠出 LRU，所以讀完要再確認一次
+        while (path := self.ds.race_source(*key)) is not None:
+            task = self._loading.get(path)
+            if task is None:
+                task = self._loading[path] = asyncio.ensure_future(self._load(path, key))
+                task.add_done_callback(lambda _, p=path: self._loading.pop(p, None))
+            await task
+        self._touch(key)
+        try:
+            return self.ds.entry(event_id, race_type, group)
+        except KeyError as e:
+            raise HttpError(404, str(e).strip("'\"")) from None
+
+    def events(self) -> list[dict]:
+        result = []
+        for event_id, data in self.ds.events.items():
+            races = {rt: groups for (eid, rt), groups in self.ds.groups.items() if eid == event_id}
+            result.append({"event_id": event_id,
+                           "event_name": data["metadata"].get("event_name", event_id),
+                           "race_types": races})
+        return result
+
+    async def rank(self, event: str, race_type: str, group: str, time_str: str) -> dict:
+        seconds = _time_to_seconds(time_str)
+        if seconds is None:
+            raise HttpError(400, f"時間格式錯誤：{time_str}")
+        r = rank_many(await self.entry(event, race_type, group), [seconds])
+        return {"time": time_str, "rank": int(r["rank"][0]), "total": int(r["total"][0]),
+                "slower": int(r["slower"][0]), "pr": round(float(r["pr"][0]), 2)}
+
+    async def time_for_pr(self, event: str, race_type: str, group: str, pr) -> dict:
+        try:
+            pr_pct = float(pr)
+        except (TypeError, ValueError):
+            raise HttpError(400, f"PR 格式錯誤：{pr}") from None
+        if not 0 <= pr_pct <= 100:
+            raise HttpError(400, "PR 必須在 0 ~ 100 之間")
+        return {"pr": pr_pct, **entry_time_for_pr(await self.entry(event, race_type, group), pr_pct)}
+
+    async def histogram(self, event: str, race_type: str, group: str, bin_label: str) -> dict:
+        entry = await self.entry(event, race_type, group)
+        histograms = entry.get("histograms")
+        if histograms:
+            if bin_label not in histograms:
+                raise HttpError(400, f"bin 只支援：{', '.join(histograms)}")
+            return histograms[bin_label]
+        if "histogram_5min" in entry and bin_label == "5min":  # 舊格式
+            return {"bins": entry["histogram_5min"]}
+        if entry.get("_sorted") is not None:  # 秒數庫：由秒數即時計算
+            entry["histograms"] = build_histogram_pyramid(entry["_sorted"])
+            return await self.histogram(event, race_type, group, bin_label)
+        raise HttpError(404, "此分組沒有 histogram")
+
+    async def batch(self, queries: list[dict]) -> list[dict]:
+        """
+        批次查詢：同一分組的 time 查詢合併成一次 rank_many（searchsorted），
+        並依 (賽事, 賽別) 排序處理，每個賽別在一個批次內只載入一次（不會被 LRU 來回替換）。
+        結果依輸入順序回傳；單筆錯誤以 {"error": ...} 表示，不影響其他筆。
+        """
+        results: list[dict | None] = [None] * len(queries)
+        by_group: dict[tuple[str, str, str], list[tuple[int, str, object]]] = {}
+        for i, q in enumerate(queries):
+            try:
+                if not isinstance(q, dict):
+                    raise HttpError(400, "每筆查詢需為物件")
+                key = (str(q["event"]), str(q["race_type"]), str(q["group"]))
+                if "time" in q:
+                    by_group.setdefault(key, []).append((i, "time", q["time"]))
+                elif "pr" in q:
+                    by_group.setdefault(key, []).append((i, "pr", q["pr"]))
+                else:
+                    raise HttpError(400, "每筆查詢需要 time 或 pr")
+            except KeyError as e:
+                results[i] = {"error": f"缺少欄位：{e.args[0]}"}
+            except HttpError as e:
+                results[i] = {"error": str(e)}
+
+        for key in sorted(by_group):
+            items = by_group[key]
+            times = []
+            for i, kind, value in items:
+                try:
+                    if kind == "pr":
+                        results[i] = await self.time_for_pr(*key, value)
+                        continue
+                    seconds = _time_to_seconds(value)
+                    if seconds is None:
+                        raise HttpError(400, f"時間格式錯誤：{value}")
+                    times.append((i, seconds, value))
+                except HttpError as e:
+                    results[i] = {"error": str(e)}
+            if not times:
+                continue
+            try:
+                r = rank_many(await self.entry(*key), np.array([s for _, s, _ in times], dtype=np.int64))
+            except HttpError as e:
+                for i, _, _ in times:
+                    results[i] = {"error": str(e)}
+                continue
+            for j, (i, _, time_str) in enumerate(times):
+                results[i] = {"time": time_str, "rank": int(r["rank"][j]), "total": int(r["total"][j]),
+                              "slower": int(r["slower"][j]), "pr": round(float(r["pr"][j]), 2)}
+        self.stats["queries"] += len(queries)
+        return results
+
+    async def handle(self, method: str, target: str, body: bytes) -> dict | list:
+        url = urlsplit(target)
+        params = {k: v[0] for k, v in parse_qs(url.query).items()}
+
+        def need(*names):
+            missing = [n for n in names if not params.get(n)]
+            if missing:
+                raise HttpError(400, f"缺少參數：{', '.join(missing)}")
+            return [params[n] for n in names]
+
+        if url.path == "/batch":
+            if method != "POST":
+                raise HttpError(405, "請用 POST")
+            try:
+                queries = json.loads(body or b"{}")["queries"]
+            except (ValueError, KeyError, TypeError):
+                raise HttpError(400, 'body 需為 {"queries": [...]}') from None
+            if not isinstance(queries, list) or len(queries) > MAX_BATCH_QUERIES:
+                raise HttpError(400, f"queries 需為最多 {MAX_BATCH_QUERIES:,} 筆的陣列")
+            return {"results": await self.batch(queries)}
+
+        if method != "GET":
+            raise HttpError(405, "請用 GET")
+        if url.path == "/events":
+            return self.events()
+        if url.path == "/rank":
+            return await self.rank(*need("event", "race_type", "group", "time"))
+        if url.path == "/pr":
+            return await self.time_for_pr(*need("event", "race_type", "group", "pr"))
+        if url.path == "/histogram":
+            bin_label = params.get("bin", histogram_label(5 * 60))
+            return await self.histogram(*need("event", "race_type", "group"), bin_label)
+        if url.path == "/stats":
+            return {**self.stats, "loaded": [list(k) for k in self._lru], "max_races": self.max_races}
+        raise HttpError(404, f"沒有這個路徑：{url.path}")
+
+
+# ========= HTTP =========
+
+async def read_request(reader: asyncio.StreamReader) -> tuple[str, str, dict, bytes] | None:
+    """讀一個 HTTP/1.1 請求；連線關閉時回傳 None"""
+    line = await reader.readline()
+    if not line:
+        return None
+    try:
+        method, target, version = line.decode("utf-8", errors="replace").split()
+    except ValueError:
+        raise HttpError(400, "請求格式錯誤") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, _, value = line.decode("latin-1").partition(":")
+        headers[name.strip().lower()] = value.strip()
+    try:
+        length = int(headers.get("content-length", 0) or 0)
+    except ValueError:
+        raise HttpError(400, "Content-Length 格式錯誤") from None
+    if length < 0:
+        raise HttpError(400, "Content-Length 格式錯誤")
+    if length > MAX_BODY_BYTES:
+        raise HttpError(413, "body 太大")
+    body = await reader.readexactly(length) if length else b""
+    headers[":version"] = version
+    return method.upper(), target, headers, body
+
+
+def encode_response(status: int, payload, keep_alive: bool) -> bytes:
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    head = (f"HTTP/1.1 {status} {REASONS.get(status, '')}\r\n"
+            "Content-Type: application/json; charset=utf-8\r\n"
+            f"Content-Length: {len(body)}\r\n"
+            "Access-Control-Allow-Origin: *\r\n"
+            f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+    return head.encode("latin-1") + body
+
+
+def make_handler(service: RankService):
+    async def handle_connection(reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            while True:
+                try:
+                    request = await read_request(reader)
+                    if request is None:
+                        break
+                    method, target, headers, body = request
+                    keep_alive = (headers.get("connection", "").lower() != "close"
+                                  and headers[":version"] == "HTTP/1.1")
+                    service.stats["requests"] += 1
+                    status, payload = 200, await service.handle(method, target, body)
+                except HttpError as e:
+                    status, payload, keep_alive = e.status, {"error": str(e)}, False
+                except (asyncio.IncompleteReadError, ConnectionError):
+                    break
+                except Exception as e:
+                    status, payload, keep_alive = 500, {"error": str(e)}, False
+                writer.write(encode_response(status, payload, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        finally:
+            writer.close()
+    return handle_connection
+
+
+async def serve(root: str, host: str, port: int, max_races: int, store: str | None = None):
+    dataset = MarathonDataset.from_store(store) if store else MarathonDataset.from_root(root, lazy=True)
+    service = RankService(dataset, max_races)
+    server = await asyncio.start_server(make_handler(service), host, port)
+    n_races = len(service.ds.groups)
+    print(f"🚀 名次查詢服務：http://{host}:{port}（{len(service.ds.events)} 場賽事 / {n_races} 賽別，"
+          f"最多同時載入 {service.max_races} 賽別）")
+    async with server:
+        await server.serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本機名次 / PR 查詢 HTTP 服務")
+    parser.add_argument("--root", default=".", help="資料所在目錄（*_data.js 或 data/manifest.js）")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-races", type=int, default=DEFAULT_MAX_RACES,
+                        help="記憶體中最多保留幾組 (賽事, 賽別)")
+    parser.add_argument("--store", help="改用 memory-mapped 秒數庫目錄（extract_excel_result --store）")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.root, args.host, args.port, args.max_races, args.store))
+    except KeyboardInterrupt:
+        print("👋 已停止")
+
+
+if __name__ == "__main__":
+    main()
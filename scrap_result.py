@@ -1,41 +1,228 @@
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from bs4 import BeautifulSoup
 import pandas as pd
+import os
 import time
 import re
+import sys
+import json
+import queue
+import base64
+import shutil
+import hashlib
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
 from selenium import webdriver
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
+from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.chrome.options import Options
 
+try:
+    import pyarrow  # 選用：分頁資料集存成 Parquet
+except ImportError:
+    pyarrow = None
+
 # --------------------------------------------------
 # Selenium / 瀏覽器設定
 # --------------------------------------------------
 
 BASE_URL = "https://www.bravelog.tw/contest/rank/2026011101"
+OUTPUT_FILE = "2026_渣打台北馬拉松_完整成績.xlsx"
 
-chrome_options = Options()
-chrome_options.add_argument("--headless=new")
-chrome_options.add_argument("--no-sandbox")
-chrome_options.add_argument("--disable-dev-shm-usage")
-chrome_options.add_argument("--disable-gpu")
-chrome_options.add_argument("--window-size=1920,1080")
-chrome_options.add_argument(
-    "--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
+USER_AGENT = (
+    "Mozilla/5.0 (Windows NT 10.0; Win64; x64) "
     "AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120 Safari/537.36"
 )
 
 
+def build_chrome_options(capture_network: bool = False) -> Options:
+    """
+    headless Chrome 設定。capture_network=True 時開啟 performance log（只收 Network 事件），
+    供 --extract network 從 CDP 讀出成績 API 的回應。
+    """
+    options = Options()
+    options.add_argument("--headless=new")
+    options.add_argument("--no-sandbox")
+    options.add_argument("--disable-dev-shm-usage")
+    options.add_argument("--disable-gpu")
+    options.add_argument("--window-size=1920,1080")
+    options.add_argument(f"--user-agent={USER_AGENT}")
+    if capture_network:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        options.add_experimental_option("perfLoggingPrefs", {"enableNetwork": True, "enablePage": False})
+    return options
+
+
+chrome_options = build_chrome_options()
+
+
 #現在會這樣，有很多地方寫太死，原本是MA/HA，現在是半程馬拉松(21.0975km)/ 全程馬拉松(42.095KM)/ 11KM these 3
 #please make it more general
-def setup_driver() -> webdriver.Chrome:
-    """建立並回傳一個已設定好的 Chrome WebDriver。"""
-    driver = webdriver.Chrome(options=chrome_options)
+def setup_driver(capture_network: bool = False) -> webdriver.Chrome:
+    """建立並回傳一個已設定好的 Chrome WebDriver（capture_network=True 時另開 performance log）。"""
+    options = build_chrome_options(capture_network=True) if capture_network else chrome_options
+    driver = webdriver.Chrome(options=options)
     driver.implicitly_wait(5)
     return driver
 
 
+# --------------------------------------------------
+# 頁面就緒條件（取代固定秒數的 time.sleep）
+# --------------------------------------------------
+
+# 各類等待的逾時秒數（可用 --wait-timeout 調整）；條件成立就立刻往下走，
+# 只有逾時才會真的等滿。
+WAIT_TIMEOUTS = {
+    "page_load": 20,    # 開啟成績頁：選單與成績卡片出現
+    "dropdown": 3,      # nice-select 展開、選項可見
+    "race_switch": 15,  # 切換賽事類型後成績更新
+    "group_switch": 15, # 切換分組後成績更新
+    "page_turn": 15,    # 翻頁後 data-page 與第一張卡片都換掉
+    "cards": 10,        # 成績卡片出現
+    "network": 10,      # --extract network：成績 API 回應載入完成
+}
+WAIT_POLL_SEC = 0.1
+
+# 每類等待實際花了多久：{label: {"count", "total_sec", "max_sec", "timeouts"}}
+WAIT_STATS: dict = {}
+_wait_stats_lock = threading.Lock()
+
+
+def record_wait(label: str, elapsed: float, ok: bool):
+    with _wait_stats_lock:
+        stats = WAIT_STATS.setdefault(label, {"count": 0, "total_sec": 0.0, "max_sec": 0.0, "timeouts": 0})
+        stats["count"] += 1
+        stats["total_sec"] += elapsed
+        stats["max_sec"] = max(stats["max_sec"], elapsed)
+        if not ok:
+            stats["timeouts"] += 1
+
+
+def wait_until(driver: webdriver.Chrome, condition, label: str, timeout: float = None) -> bool:
+    """
+    輪詢 condition(driver) 直到為真，回傳是否成立（逾時回傳 False，不丟例外）。
+    實際等待時間記到 WAIT_STATS[label]。
+    """
+    started = time.perf_counter()
+    try:
+        WebDriverWait(driver, timeout or WAIT_TIMEOUTS[label], poll_frequency=WAIT_POLL_SEC).until(condition)
+        ok = True
+    except TimeoutException:
+        ok = False
+    record_wait(label, time.perf_counter() - started, ok)
+    return ok
+
+
+def format_wait_stats() -> list:
+    lines = []
+    for label, s in sorted(WAIT_STATS.items(), key=lambda kv: -kv[1]["total_sec"]):
+        line = (f"   ⏱️ {label:<13} {s['count']:>6} 次  合計 {s['total_sec']:>8.1f}s  "
+                f"平均 {s['total_sec'] / s['count']:.2f}s  最長 {s['max_sec']:.2f}s")
+        if s["timeouts"]:
+            line += f"  逾時 {s['timeouts']} 次"
+        lines.append(line)
+    return lines
+
+
+# 用 execute_script 讀狀態，不經過 find_element 的 implicit wait
+_FIRST_BIB_JS = (
+    "const el = document.querySelector("
+    "'div.fl-wrap.list-single-main-item_content .list-user-info .detail-info span');"
+    "return el ? el.textContent.trim() : null;"
+)
+_PAGINATION_PAGE_JS = (
+    "const el = document.getElementById('pagination');"
+    "return el ? el.getAttribute('data-page') : null;"
+)
+# 整頁卡片的背號 + 總頁數：第一名相同的兩個分組也分得出來
+_CARD_LIST_SIGNATURE_JS = (
+    "const bibs = Array.from(document.querySelectorAll("
+    "'div.fl-wrap.list-single-main-item_content .list-user-info .detail-info span:first-child'),"
+    " el => el.textContent.trim());"
+    "const el = document.getElementById('pagination');"
+    "return bibs.length ? bibs.join(',') + '|' + (el ? el.getAttribute('data-total') : '') : null;"
+)
+_SELECTED_TEXT_JS = (
+    "const el = arguments[0].querySelector('span.current');"
+    "return el ? el.textContent.trim() : null;"
+)
+
+
+def first_card_bib(driver: webdriver.Chrome):
+    """目前第一張成績卡片的背號（沒有卡片則為 None）"""
+    return driver.execute_script(_FIRST_BIB_JS)
+
+
+def pagination_page(driver: webdriver.Chrome):
+    """#pagination 的 data-page（沒有分頁則為 None）"""
+    return driver.execute_script(_PAGINATION_PAGE_JS)
+
+
+def card_list_signature(driver: webdriver.Chrome):
+    """目前成績列表的簽章（所有卡片背號 + 總頁數；沒有卡片則為 None）"""
+    return driver.execute_script(_CARD_LIST_SIGNATURE_JS)
+
+
+def selected_text(driver: webdriver.Chrome, select_root):
+    """nice-select 目前顯示的選項文字"""
+    return driver.execute_script(_SELECTED_TEXT_JS, select_root)
+
+
+def dropdown_open(select_root):
+    """條件：nice-select 已展開且至少一個選項可見"""
+    def check(driver):
+        if "open" not in (select_root.get_attribute("class") or ""):
+            return False
+        return driver.execute_script(
+            "return Array.from(arguments[0].querySelectorAll('li.option'))"
+            ".some(li => li.offsetParent !== null);", select_root)
+    return check
+
+
+def first_bib_changed(old_bib):
+    """條件：第一張卡片出現且背號與 old_bib 不同（成績列表已換成新內容）"""
+    def check(driver):
+        bib = first_card_bib(driver)
+        return bib is not None and bib != old_bib
+    return check
+
+
+def group_switched(select_root, option_text: str, old_signature):
+    """條件：選單已顯示 option_text，且成績列表（背號 + 總頁數）已換掉"""
+    def check(driver):
+        if selected_text(driver, select_root) != option_text:
+            return False
+        signature = card_list_signature(driver)
+        return signature is not None and signature != old_signature
+    return check
+
+
+def page_turned(old_page, old_bib):
+    """條件：data-page 已不是 old_page，且第一張卡片也換掉了（避免讀到舊頁面的卡片）"""
+    def check(driver):
+        return pagination_page(driver) != old_page and first_bib_changed(old_bib)(driver)
+    return check
+
+
+def rank_page_ready(driver):
+    """條件：文件載入完成且 nice-select 選單已建好"""
+    return driver.execute_script(
+        "return document.readyState === 'complete' && !!document.querySelector('div.nice-select');")
+
+
+def open_dropdown(driver: webdriver.Chrome, select_root) -> bool:
+    """確保 nice-select 展開（使用 JavaScript 點擊避免元素攔截），回傳是否已展開"""
+    if "open" in (select_root.get_attribute("class") or ""):
+        return True
+    driver.execute_script("arguments[0].click();", select_root)
+    return wait_until(driver, dropdown_open(select_root), "dropdown")
+
+
 # --------------------------------------------------
 # 賽事類型與分組處理
 # --------------------------------------------------
@@ -85,7 +272,7 @@ def get_available_race_types(driver: webdriver.Chrome) -> list:
                 cls = select_root.get_attribute("class") or ""
                 if "open" not in cls:
                     driver.execute_script("arguments[0].click();", select_root)
-                    time.sleep(0.5)
+                    wait_until(driver, dropdown_open(select_root), "dropdown")
                 
                 # 獲取這個選單中的所有選項
                 options = select_root.find_elements(By.CSS_SELECTOR, "li.option")
@@ -222,7 +409,7 @@ def get_available_groups(driver: webdriver.Chrome) -> list:
             if not was_open:
                 try:
                     driver.execute_script("arguments[0].click();", sel)
-                    time.sleep(0.3)
+                    wait_until(driver, dropdown_open(sel), "dropdown")
                 except:
                     continue
             
@@ -267,7 +454,7 @@ def get_available_groups(driver: webdriver.Chrome) -> list:
                 cls = select_root.get_attribute("class") or ""
                 if "open" not in cls:
                     driver.execute_script("arguments[0].click();", select_root)
-                    time.sleep(0.5)  # 簡單等待選單展開
+                    wait_until(driver, dropdown_open(select_root), "dropdown")
                 
                 # 獲取這個選單中的所有選項
                 options = select_root.find_elements(By.CSS_SELECTOR, "li.option")
@@ -392,7 +579,7 @@ def switch_race_type(driver: webdriver.Chrome, race_type_value: str, data_value:
                 if "open" not in cls:
                     # 使用 JavaScript 直接點擊，繞過元素攔截問題
                     driver.execute_script("arguments[0].click();", select_root)
-                    time.sleep(0.3)  # 增加等待時間確保選單完全打開
+                    wait_until(driver, dropdown_open(select_root), "dropdown")
 
                 # 檢查這個選單是否為賽事類型選單
                 # 賽事類型選單的特徵：選項的 data-value 是 4 位數字，且選項數量通常較少（2-5 個）
@@ -458,11 +645,17 @@ def switch_race_type(driver: webdriver.Chrome, race_type_value: str, data_value:
                 driver.execute_script(
                     "arguments[0].scrollIntoView({block: 'center'});", option
                 )
+                old_bib = first_card_bib(driver)
                 # 使用 JavaScript 直接點擊，繞過元素攔截問題
                 driver.execute_script("arguments[0].click();", option)
 
-                # 等待頁面載入和 AJAX 請求完成
-                time.sleep(3)
+                # 等待 AJAX 更新完成：成績卡片換成新賽事類型的內容
+                # （切換前沒有卡片時，只能等頁面載入完成）
+                if old_bib is not None:
+                    if not wait_until(driver, first_bib_changed(old_bib), "race_switch"):
+                        print(f"   ⚠️ {WAIT_TIMEOUTS['race_switch']} 秒內成績列表沒有更新")
+                else:
+                    wait_until(driver, rank_page_ready, "race_switch")
                 
                 # 驗證切換是否成功：檢查當前選中的選項文字
                 try:
@@ -473,17 +666,13 @@ def switch_race_type(driver: webdriver.Chrome, race_type_value: str, data_value:
                     # 檢查是否匹配（允許部分匹配，因為可能有格式差異）
                     if race_type_value in current_text or current_text in race_type_value:
                         print(f"   ✅ 已切換到：{current_text}")
-                        # 額外等待分組選單更新（因為分組選單是動態載入的）
-                        time.sleep(2)
                         return True
                     else:
                         print(f"   ⚠️ 切換後當前選項是「{current_text}」，預期是「{race_type_value}」")
                         # 即使文字不完全匹配，也繼續（可能是格式問題）
-                        time.sleep(2)
                         return True
                 except Exception as e:
                     print(f"   ⚠️ 無法驗證切換結果: {e}，但假設切換成功")
-                    time.sleep(2)
                     return True
             except Exception as e:
                 # 這個 select 失敗就試下一個
@@ -523,7 +712,7 @@ def click_category_tab(driver: webdriver.Chrome, category_name: str, category_da
                 cls = select_root.get_attribute("class") or ""
                 if "open" not in cls:
                     driver.execute_script("arguments[0].click();", select_root)
-                    time.sleep(0.3)
+                    wait_until(driver, dropdown_open(select_root), "dropdown")
 
                 # 獲取所有選項
                 all_options = select_root.find_elements(By.CSS_SELECTOR, "li.option")
@@ -555,14 +744,22 @@ def click_category_tab(driver: webdriver.Chrome, category_name: str, category_da
                     continue
 
                 option = options[0]
+                option_text = driver.execute_script("return arguments[0].textContent.trim();", option)
+                if selected_text(driver, select_root) == option_text and card_list_signature(driver) is not None:
+                    # 已經是這個分組（例如重選目前顯示的分組）：點了也不會重新載入，不必等
+                    if "open" in (select_root.get_attribute("class") or ""):
+                        driver.execute_script("arguments[0].click();", select_root)
+                    return True
                 driver.execute_script(
                     "arguments[0].scrollIntoView({block: 'center'});", option
                 )
+                old_signature = card_list_signature(driver)
                 # 使用 JavaScript 直接點擊，繞過元素攔截問題
                 driver.execute_script("arguments[0].click();", option)
 
-                # 簡單等待頁面載入
-                time.sleep(2)
+                # 等選單顯示這個分組、成績列表也換掉（第一名相同也看得出來）
+                if not wait_until(driver, group_switched(select_root, option_text, old_signature), "group_switch"):
+                    print(f"   ⚠️ 分組「{category_name}」{WAIT_TIMEOUTS['group_switch']} 秒內成績列表沒有更新")
                 return True
             except Exception as e:
                 # 這個 select 失敗就試下一個
@@ -578,7 +775,7 @@ def click_category_tab(driver: webdriver.Chrome, category_name: str, category_da
                     cls = select_root.get_attribute("class") or ""
                     if "open" not in cls:
                         driver.execute_script("arguments[0].click();", select_root)
-                        time.sleep(0.3)
+                        wait_until(driver, dropdown_open(select_root), "dropdown")
                     all_options = select_root.find_elements(By.CSS_SELECTOR, "li.option")
                     available_texts = [opt.text.strip() for opt in all_options if opt.text.strip() and opt.text.strip() not in ("項目", "年齡分組")]
                     if available_texts and len(available_texts) >= 5:
@@ -621,9 +818,34 @@ def parse_time_to_timedelta(time_str: str):
         return pd.NaT
 
 
-def scrape_current_table(driver: webdriver.Chrome, category_name: str, race_type_name: str = ""):
+def build_card_records(rows, category_name: str, race_type_name: str = "") -> list:
+    """
+    把卡片欄位 (姓名, 背號, 賽別, 分組或 None, 完賽時間) 轉成紀錄 dict；
+    BeautifulSoup 與瀏覽器內 JS 兩種解析方式共用，確保輸出一致。
+    """
+    results = []
+    for name, bib, race_type, group_text, finish_time in rows:
+        # 沒有名字或背號就略過（通常是異常卡片）
+        if not name and not bib:
+            continue
+
+        results.append(
+            {
+                "姓名": name,
+                "背號": bib,
+                "賽別": race_type,  # 賽事類型（如：半程馬拉松(21.0975km)）
+                "賽事類型": race_type_name,  # 賽事類型名稱
+                "分組": group_text if group_text is not None else category_name,
+                "完賽時間": finish_time,
+                "來源分組標籤": category_name,
+            }
+        )
+    return results
+
+
+def parse_result_cards(html: str, category_name: str, race_type_name: str = "") -> list:
     """
-    在當前已顯示該分組的頁面上，解析成績卡片列表。
+    解析成績卡片列表（selenium 的 page_source 與 HTTP 後端抓回的 HTML 共用）。
     依照你提供的 HTML 結構，成績每一筆大致為：
     <div class="fl-wrap list-single-main-item_content">
         <div class="list-item">
@@ -639,23 +861,10 @@ def scrape_current_table(driver: webdriver.Chrome, category_name: str, race_type
         </div>
     race_type_name: 賽事類型名稱（例如："全馬"、"半馬"、"11KM"），用於標記資料來源
     """
-    wait = WebDriverWait(driver, 10)
-
-    # 等待至少一個成績卡片出現
-    try:
-        wait.until(
-            EC.presence_of_element_located(
-                (By.CSS_SELECTOR, "div.fl-wrap.list-single-main-item_content")
-            )
-        )
-    except Exception:
-        print(f"⚠️ 分組「{category_name}」找不到成績區塊")
-        return []
-
-    soup = BeautifulSoup(driver.page_source, "html.parser")
+    soup = BeautifulSoup(html, "html.parser")
     cards = soup.select("div.fl-wrap.list-single-main-item_content")
 
-    results = []
+    rows = []
     for card in cards:
         # 姓名
         name_el = card.select_one(".list-user-info .name")
@@ -664,37 +873,363 @@ def scrape_current_table(driver: webdriver.Chrome, category_name: str, race_type
         # 背號、賽別、分組
         spans = card.select(".list-user-info .detail-info span")
         bib = spans[0].get_text(strip=True) if len(spans) >= 1 else ""
-        race_type = spans[1].get_text(strip=True) if len(spans) >= 2 else ""  # 賽事類型（如：半程馬拉松(21.0975km)）
-        group_text = spans[2].get_text(strip=True) if len(spans) >= 3 else category_name
+        race_type = spans[1].get_text(strip=True) if len(spans) >= 2 else ""
+        group_text = spans[2].get_text(strip=True) if len(spans) >= 3 else None
 
         # 完賽時間
         time_el = card.select_one(".time span")
         finish_time = time_el.get_text(strip=True) if time_el else ""
 
-        # 沒有名字或背號就略過（通常是異常卡片）
-        if not name and not bib:
+        rows.append((name, bib, race_type, group_text, finish_time))
+    return build_card_records(rows, category_name, race_type_name)
+
+
+# 在頁面裡直接讀出卡片欄位，回傳 [[姓名, 背號, 賽別, 分組或 null, 完賽時間], ...]；
+# text() 逐一 trim 文字節點後串接，與 BeautifulSoup 的 get_text(strip=True) 相同。
+EXTRACT_CARDS_JS = """
+const text = el => {
+    if (!el) return "";
+    const walker = document.createTreeWalker(el, NodeFilter.SHOW_TEXT);
+    let out = "", node;
+    while ((node = walker.nextNode())) out += node.nodeValue.trim();
+    return out;
+};
+return Array.from(document.querySelectorAll("div.fl-wrap.list-single-main-item_content")).map(card => {
+    const spans = card.querySelectorAll(".list-user-info .detail-info span");
+    return [
+        text(card.querySelector(".list-user-info .name")),
+        spans.length >= 1 ? text(spans[0]) : "",
+        spans.length >= 2 ? text(spans[1]) : "",
+        spans.length >= 3 ? text(spans[2]) : null,
+        text(card.querySelector(".time span")),
+    ];
+});
+"""
+
+# 卡片解析方式："js" 在瀏覽器內一次 execute_script 讀出欄位；
+# "soup" 把整個 page_source 傳回 Python 用 BeautifulSoup 解析（js 失敗時也會退回這個）；
+# "network" 不讀卡片，改從 CDP performance log 取回頁面自己打的成績 API 回應（JSON）
+CARD_EXTRACTION = "js"
+
+
+def extract_cards_in_browser(driver: webdriver.Chrome, category_name: str, race_type_name: str = ""):
+    """用 EXTRACT_CARDS_JS 讀出目前頁面的卡片；結果格式不對時回傳 None"""
+    rows = driver.execute_script(EXTRACT_CARDS_JS)
+    if not isinstance(rows, list) or any(not isinstance(r, list) or len(r) != 5 for r in rows):
+        return None
+    return build_card_records(rows, category_name, race_type_name)
+
+
+# --------------------------------------------------
+# 網路層擷取：從 CDP performance log 取回成績 API 的 JSON
+# --------------------------------------------------
+
+# 成績 API 的網址特徵（可用 --capture-url 覆寫）；另外只收 XHR / Fetch 且 mimeType 含 json 的回應
+RANK_API_PATTERN = re.compile(r"rank|result|score", re.IGNORECASE)
+
+# JSON 欄位別名（比對前先轉小寫、去掉 _ - 與空白）；API 改名時在這裡補上即可
+NETWORK_FIELD_ALIASES = {
+    "name": ("name", "姓名", "runnername", "fullname", "displayname", "chinesename"),
+    "bib": ("bib", "背號", "bibno", "bibnumber", "number", "no"),
+    "race_type": ("racetype", "賽別", "race", "racename", "event", "eventname", "course", "distance"),
+    "group": ("group", "分組", "groupname", "category", "categoryname", "division", "agegroup"),
+    "time": ("finishtime", "完賽時間", "time", "nettime", "chiptime", "guntime", "result"),
+}
+# 欄位值本身是物件時（例如 {"group": {"name": "男20-29歲"}}）改讀這些 key
+_NESTED_VALUE_KEYS = ("name", "title", "label", "value")
+
+# --save-network 時每個用到的回應存成 {dir}/{序號}.json，可用 --replay-network 離線重跑
+NETWORK_FIXTURE_DIR = None
+_fixture_lock = threading.Lock()
+_fixture_seq = 0
+
+
+def _normalize_key(key) -> str:
+    return re.sub(r"[\s_\-]", "", str(key)).lower()
+
+
+def _pick_field(item: dict, aliases: tuple):
+    """依別名順序取欄位值；數字轉字串、物件取 name/title/label/value"""
+    fields = {_normalize_key(k): v for k, v in item.items()}
+    for alias in aliases:
+        value = fields.get(alias)
+        if isinstance(value, dict):
+            value = _pick_field(value, _NESTED_VALUE_KEYS)
+        if value is not None and value != "":
+            return value
+    return None
+
+
+def format_network_time(value) -> str:
+    """API 的完賽時間：'HH:MM:SS' 字串原樣保留，數字視為秒數轉成 'HH:MM:SS'"""
+    if isinstance(value, bool) or value is None:
+        return ""
+    if isinstance(value, (int, float)):
+        sec = int(round(value))
+        return f"{sec // 3600:02d}:{sec % 3600 // 60:02d}:{sec % 60:02d}"
+    return str(value).strip()
+
+
+def find_result_rows(payload):
+    """在 JSON 裡（廣度優先）找第一個「元素是物件、且大多有姓名或背號」的陣列"""
+    pending = [payload]
+    while pending:
+        node = pending.pop(0)
+        if isinstance(node, list):
+            items = [x for x in node if isinstance(x, dict)]
+            if items and len(items) == len(node):
+                keyed = sum(1 for x in items
+                            if _pick_field(x, NETWORK_FIELD_ALIASES["name"]) is not None
+                            or _pick_field(x, NETWORK_FIELD_ALIASES["bib"]) is not None)
+                if keyed * 2 >= len(items):
+                    return items
+            pending.extend(x for x in node if isinstance(x, (dict, list)))
+        elif isinstance(node, dict):
+            pending.extend(v for v in node.values() if isinstance(v, (dict, list)))
+    return None
+
+
+def parse_network_payload(payload, category_name: str, race_type_name: str = ""):
+    """
+    把成績 API 的 JSON 轉成與卡片相同的紀錄（共用 build_card_records）。
+    找不到成績陣列時回傳 None；空陣列（該頁沒有成績）回傳 []。
+    """
+    items = find_result_rows(payload)
+    if items is None:
+        return [] if _is_empty_result(payload) else None
+    rows = []
+    for item in items:
+        name = _pick_field(item, NETWORK_FIELD_ALIASES["name"])
+        bib = _pick_field(item, NETWORK_FIELD_ALIASES["bib"])
+        race_type = _pick_field(item, NETWORK_FIELD_ALIASES["race_type"])
+        group = _pick_field(item, NETWORK_FIELD_ALIASES["group"])
+        rows.append((
+            str(name).strip() if name is not None else "",
+            str(bib).strip() if bib is not None else "",
+            str(race_type).strip() if race_type is not None else race_type_name,
+            str(group).strip() if group is not None else None,
+            format_network_time(_pick_field(item, NETWORK_FIELD_ALIASES["time"])),
+        ))
+    return build_card_records(rows, category_name, race_type_name)
+
+
+def _is_empty_result(payload) -> bool:
+    """回應裡只有空陣列（例如 {"data": []}）"""
+    if isinstance(payload, list):
+        return not payload
+    if isinstance(payload, dict):
+        lists = [v for v in payload.values() if isinstance(v, list)]
+        return bool(lists) and all(not v for v in lists)
+    return False
+
+
+def is_rank_api_response(response: dict) -> bool:
+    return "json" in (response.get("mimeType") or "") and bool(RANK_API_PATTERN.search(response.get("url") or ""))
+
+
+class NetworkCapture:
+    """
+    單一 driver 的成績 API 回應收集器：讀 performance log，記下符合的 responseReceived，
+    等到 loadingFinished 才用 Network.getResponseBody 取 body（太早取會拿不到）。
+    """
+
+    def __init__(self):
+        self.pending = {}  # requestId -> url（已收到標頭、body 還沒載完）
+
+    def poll(self, driver: webdriver.Chrome) -> list:
+        """讀出上次之後載入完成的成績 API 回應：[{"url", "payload"}, ...]，依完成順序"""
+        finished = []
+        for entry in driver.get_log("performance"):
+            try:
+                message = json.loads(entry["message"])["message"]
+            except (KeyError, TypeError, ValueError):
+                continue
+            method = message.get("method")
+            params = message.get("params") or {}
+            request_id = params.get("requestId")
+            if method == "Network.responseReceived":
+                response = params.get("response") or {}
+                if params.get("type") in ("XHR", "Fetch") and is_rank_api_response(response):
+                    self.pending[request_id] = response.get("url")
+            elif method == "Network.loadingFinished" and request_id in self.pending:
+                finished.append((request_id, self.pending.pop(request_id)))
+            elif method == "Network.loadingFailed":
+                self.pending.pop(request_id, None)
+
+        responses = []
+        for request_id, url in finished:
+            try:
+                body = driver.execute_cdp_cmd("Network.getResponseBody", {"requestId": request_id})
+                text = body.get("body") or ""
+                if body.get("base64Encoded"):
+                    text = base64.b64decode(text).decode("utf-8")
+                responses.append({"url": url, "payload": json.loads(text)})
+            except (WebDriverException, ValueError) as e:
+                print(f"⚠️ 無法讀取成績 API 回應 {url}：{e}")
+        return responses
+
+
+# 每個 driver（以 session_id 區分）一個收集器
+_network_captures: dict = {}
+_network_captures_lock = threading.Lock()
+
+
+def network_capture(driver: webdriver.Chrome) -> NetworkCapture:
+    with _network_captures_lock:
+        return _network_captures.setdefault(driver.session_id, NetworkCapture())
+
+
+def release_network_capture(driver: webdriver.Chrome):
+    """driver 關閉前丟掉它的收集器（session_id 不會再被用到）"""
+    with _network_captures_lock:
+        _network_captures.pop(driver.session_id, None)
+
+
+def save_network_fixture(response: dict, race_type_name: str, category_name: str, page):
+    """把用到的回應存成 fixture（{url, race_type, group, page, payload}），檔名依擷取順序編號"""
+    global _fixture_seq
+    with _fixture_lock:
+        _fixture_seq += 1
+        os.makedirs(NETWORK_FIXTURE_DIR, exist_ok=True)
+        path = os.path.join(NETWORK_FIXTURE_DIR, f"{_fixture_seq:05d}.json")
+    fixture = {"url": response["url"], "race_type": race_type_name, "group": category_name,
+               "page": page, "payload": response["payload"]}
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(fixture, f, ensure_ascii=False)
+
+
+def extract_cards_from_network(driver: webdriver.Chrome, category_name: str, race_type_name: str = ""):
+    """
+    取回目前頁面對應的成績 API 回應並解析；等不到（或解析不出來）時回傳 None。
+    切換選單 / 翻頁可能觸發好幾個請求，取最後一個；若頁面上有卡片，
+    要求回應的第一筆背號與第一張卡片相同，避免讀到上一頁的回應。
+    """
+    capture = network_capture(driver)
+    expected_bib = first_card_bib(driver)
+    found = {}
+
+    def response_ready(driver):
+        for response in capture.poll(driver):
+            records = parse_network_payload(response["payload"], category_name, race_type_name)
+            if records is None:
+                continue
+            if expected_bib and records and records[0]["背號"] != expected_bib:
+                continue
+            found["response"], found["records"] = response, records
+        return "records" in found
+
+    if not wait_until(driver, response_ready, "network"):
+        return None
+    if NETWORK_FIXTURE_DIR:
+        save_network_fixture(found["response"], race_type_name, category_name, pagination_page(driver))
+    return found["records"]
+
+
+def iter_network_fixtures(fixture_dir: str):
+    """依檔名順序讀出 --save-network 存的 fixture"""
+    for name in sorted(os.listdir(fixture_dir)):
+        if name.endswith(".json"):
+            with open(os.path.join(fixture_dir, name), encoding="utf-8") as f:
+                yield json.load(f)
+
+
+def replay_network_fixtures(fixture_dir: str, sink: "PageSink" = None) -> list:
+    """
+    離線重跑：把存下來的 API 回應解析成紀錄（與線上擷取同一個 parse_network_payload）。
+    同一 (賽事類型, 分組, 頁) 擷取過多次時取最後一次；分組依第一次出現的順序、頁依頁碼排列。
+    有 sink 時每頁寫進分頁資料集（總頁數取該分組出現過的最大頁碼）。
+    """
+    pages = {}
+    for fixture in iter_network_fixtures(fixture_dir):
+        records = parse_network_payload(fixture["payload"], fixture["group"], fixture["race_type"])
+        if records is None:
+            print(f"⚠️ {fixture.get('url')} 找不到成績陣列，略過")
             continue
+        page = int(fixture.get("page") or 1)
+        pages.setdefault((fixture["race_type"], fixture["group"]), {})[page] = records
 
-        results.append(
-            {
-                "姓名": name,
-                "背號": bib,
-                "賽別": race_type,
-                "賽事類型": race_type_name,  # 賽事類型名稱
-                "分組": group_text,
-                "完賽時間": finish_time,
-                "來源分組標籤": category_name,
-            }
-        )
+    all_results = []
+    for (race_type, group), group_pages in pages.items():
+        total_pages = max(group_pages)
+        group_results = []
+        for page in sorted(group_pages):
+            if sink is not None:
+                sink.record_page(race_type, group, page, total_pages, group_pages[page])
+            group_results.extend(group_pages[page])
+        print(f"=== 「{race_type} / {group}」{len(group_pages)}/{total_pages} 頁，累計 {len(group_results)} 筆 ===")
+        all_results.extend(group_results)
+    return all_results
+
+
+def record_scraped_page(race_type: str, group: str, page: int, total_pages: int, records: list,
+                        checkpoint: "ScrapeCheckpoint" = None, fingerprints: "ScrapeFingerprints" = None,
+                        sink: "PageSink" = None):
+    """一頁抓完（或從 checkpoint 取回）後交給 checkpoint / 指紋 / 資料集；不需要的傳 None"""
+    for observer in (checkpoint, fingerprints, sink):
+        if observer is not None:
+            observer.record_page(race_type, group, page, total_pages, records)
+
+
+def scrape_current_table(driver: webdriver.Chrome, category_name: str, race_type_name: str = ""):
+    """
+    在當前已顯示該分組的頁面上，解析成績卡片列表（欄位見 parse_result_cards）。
+    CARD_EXTRACTION 為 "js" 時在瀏覽器內讀出欄位，省掉序列化整個 DOM 再重新解析；
+    執行失敗則退回 BeautifulSoup。"network" 時直接解析頁面收到的成績 API JSON，
+    等不到回應才退回 BeautifulSoup。
+    race_type_name: 賽事類型名稱（例如："全馬"、"半馬"、"11KM"），用於標記資料來源
+    """
+    # 等待至少一個成績卡片出現
+    cards_present = EC.presence_of_element_located(
+        (By.CSS_SELECTOR, "div.fl-wrap.list-single-main-item_content")
+    )
+    if not wait_until(driver, cards_present, "cards"):
+        print(f"⚠️ 分組「{category_name}」找不到成績區塊")
+        return []
 
+    results = None
+    if CARD_EXTRACTION == "network":
+        results = extract_cards_from_network(driver, category_name, race_type_name)
+        if results is None:
+            print(f"⚠️ 「{category_name}」沒有擷取到成績 API 回應，改讀頁面卡片")
+    if CARD_EXTRACTION == "js":
+        try:
+            results = extract_cards_in_browser(driver, category_name, race_type_name)
+        except WebDriverException as e:
+            print(f"⚠️ 瀏覽器內解析失敗（{e.msg}），改用 BeautifulSoup")
+    if results is None:
+        results = parse_result_cards(driver.page_source, category_name, race_type_name)
     print(f"「{category_name}」解析到 {len(results)} 筆")
     return results
 
 
-def scrape_category(driver: webdriver.Chrome, category_info, race_type_name: str = ""):
+class ScrapeTaskError(Exception):
+    """單一 (賽事類型, 分組) 任務失敗；driver pool 會把它放回佇列重試。"""
+
+
+class ScrapeIncompleteError(Exception):
+    """
+    抓取跑完但有頁 / 分組沒抓到（重試用完）。missing 為沒抓到的項目描述，
+    records 為已抓到的部分紀錄；不完整的結果不應寫成輸出檔。
+    """
+
+    def __init__(self, missing: list, records: list = None):
+        shown = "、".join(missing[:5]) + (" …" if len(missing) > 5 else "")
+        super().__init__(f"{len(missing)} 項沒有抓到：{shown}")
+        self.missing = missing
+        self.records = records or []
+
+
+def scrape_category(driver: webdriver.Chrome, category_info, race_type_name: str = "", strict: bool = False,
+                    checkpoint: "ScrapeCheckpoint" = None, fingerprints: "ScrapeFingerprints" = None,
+                    sink: "PageSink" = None):
     """
     切換到指定分組並抓取該分組「所有頁數」的成績。
     category_info: 分組資訊，可以是字串（分組名稱）或元組 (分組名稱, data_value)
+    strict: 找不到分組、或沒能翻完所有頁時丟出 ScrapeTaskError（而不是回傳已抓到的部分）
+    checkpoint: 每抓完一頁就寫入；已在 checkpoint 裡的頁只翻過去、不重新解析
+    fingerprints: 記錄每頁指紋；增量模式下第 1 頁與總頁數都和上次相同就沿用上次的紀錄
+                  （selenium 無法直接跳到最後一頁，只探測第 1 頁）
+    sink: 每頁寫進分頁資料集
     """
     # 處理分組資訊格式
     if isinstance(category_info, tuple):
@@ -706,34 +1241,57 @@ def scrape_category(driver: webdriver.Chrome, category_info, race_type_name: str
     print(f"=== 處理分組：{category_name} ===")
     ok = click_category_tab(driver, category_name, category_data_value)
     if not ok:
+        if strict:
+            raise ScrapeTaskError(f"找不到分組「{category_name}」")
         return []
 
     all_results = []
+    done_pages = checkpoint.completed_pages(race_type_name, category_name) if checkpoint else {}
 
     page_count = 0
     max_pages = 10000  # 安全上限，避免無限循環
     
     while page_count < max_pages:
         page_count += 1
-        
-        # 先抓目前頁面的所有卡片
-        page_results = scrape_current_table(driver, category_name, race_type_name)
-        all_results.extend(page_results)
 
         # 嘗試找到分頁區塊（每次都重新獲取，因為頁面更新後元素可能失效）
+        # 用 execute_script 讀，沒有分頁時不必等滿 implicit wait
+        pagination = driver.execute_script(
+            "const el = document.getElementById('pagination');"
+            "return el ? [el.getAttribute('data-page'), el.getAttribute('data-total')] : null;"
+        )
         try:
-            pagination = driver.find_element(By.ID, "pagination")
-        except Exception:
-            # 沒有分頁區塊，表示只有一頁
-            print(f"分組「{category_name}」沒有分頁區塊，結束")
-            break
-
-        try:
-            current_page = int(pagination.get_attribute("data-page") or "1")
-            total_pages = int(pagination.get_attribute("data-total") or "1")
+            current_page = int(pagination[0] or "1") if pagination else 1
+            total_pages = int(pagination[1] or "1") if pagination else 1
         except Exception as e:
             # 取不到 page / total 就不要勉強翻頁
+            if strict:
+                raise ScrapeTaskError(f"分組「{category_name}」無法讀取頁數資訊: {e}")
             print(f"⚠️ 分組「{category_name}」無法讀取頁數資訊: {e}")
+            all_results.extend(scrape_current_table(driver, category_name, race_type_name))
+            break
+
+        # 抓目前頁面的所有卡片（checkpoint 已有的頁直接取回）
+        if current_page in done_pages:
+            page_results = done_pages[current_page]
+            record_scraped_page(race_type_name, category_name, current_page, total_pages, page_results,
+                                fingerprints=fingerprints, sink=sink)
+        else:
+            page_results = scrape_current_table(driver, category_name, race_type_name)
+            record_scraped_page(race_type_name, category_name, current_page, total_pages, page_results,
+                                checkpoint, fingerprints, sink)
+        if (page_count == 1 and fingerprints is not None
+                and fingerprints.can_reuse(race_type_name, category_name, total_pages, {current_page: page_results})):
+            print(f"✅ 分組「{category_name}」第 1 頁與總頁數（{total_pages} 頁）都和上次相同，沿用上次的紀錄")
+            records = fingerprints.reuse(race_type_name, category_name)
+            if sink is not None:
+                sink.keep_group(race_type_name, category_name, records)
+            return records
+        all_results.extend(page_results)
+
+        if pagination is None:
+            # 沒有分頁區塊，表示只有一頁
+            print(f"分組「{category_name}」沒有分頁區塊，結束")
             break
 
         # 顯示目前頁數資訊
@@ -758,198 +1316,1103 @@ def scrape_category(driver: webdriver.Chrome, category_info, race_type_name: str
 
         # 滾動並點擊下一頁
         try:
+            old_bib = first_card_bib(driver)
             driver.execute_script(
                 "arguments[0].scrollIntoView({block: 'center'});", next_btn
             )
             next_btn.click()
-            
-            # 簡單等待頁面載入
-            time.sleep(2)
         except Exception as e:
             print(f"⚠️ 分組「{category_name}」翻頁時發生錯誤: {e}")
             break
 
+        # 等 data-page 變成下一頁、第一張卡片也換掉，才不會重複讀到上一頁
+        if not wait_until(driver, page_turned(str(current_page), old_bib), "page_turn"):
+            message = f"分組「{category_name}」{WAIT_TIMEOUTS['page_turn']} 秒內沒有翻到第 {current_page + 1} 頁"
+            if strict:
+                raise ScrapeTaskError(message)
+            print(f"⚠️ {message}")
+            break
+
+    if strict and pagination is not None and current_page < total_pages:
+        raise ScrapeTaskError(f"分組「{category_name}」只抓到第 {current_page} / {total_pages} 頁")
     print(f"=== 分組「{category_name}」累計 {len(all_results)} 筆 ===")
     return all_results
 
 
 # --------------------------------------------------
-# 主流程
+# Checkpoint：每抓完一頁就寫進 append-only 的 JSONL
 # --------------------------------------------------
 
-def main():
-    driver = setup_driver()
+CHECKPOINT_FILE = "scrape_checkpoint.jsonl"
+
+
+class ScrapeCheckpoint:
+    """
+    每行一頁：{"race_type", "group", "page", "total_pages", "records"}，寫完立即 fsync，
+    程式或瀏覽器中途掛掉時最多只丟掉正在抓的那一頁。
+    resume=True 時讀回既有紀錄（同一頁出現多次以最後一次為準），
+    結尾若有寫到一半的行就截掉，之後接著 append。
+    HTTP 後端會從多個執行緒寫入，所以寫檔加鎖。
+    """
+
+    def __init__(self, path: str = CHECKPOINT_FILE, resume: bool = False):
+        self.path = path
+        self.pages: dict = {}   # (賽事類型, 分組) -> {page: records}
+        self.totals: dict = {}  # (賽事類型, 分組) -> 總頁數
+        self._lock = threading.Lock()
+        if resume and os.path.exists(path):
+            self._load()
+        elif os.path.exists(path) and os.path.getsize(path) > 0:
+            os.replace(path, path + ".bak")
+            print(f"⚠️ 既有的 checkpoint 已改名為 {path}.bak（要接續請加 --resume）")
+        self._file = open(path, "a", encoding="utf-8")
+
+    def _load(self):
+        valid_bytes = 0
+        with open(self.path, "rb") as f:
+            for raw in f:
+                if not raw.endswith(b"\n"):
+                    break
+                try:
+                    entry = json.loads(raw)
+                except ValueError:
+                    break
+                key = (entry["race_type"], entry["group"])
+                self.pages.setdefault(key, {})[entry["page"]] = entry["records"]
+                self.totals[key] = entry["total_pages"]
+                valid_bytes += len(raw)
+        if valid_bytes < os.path.getsize(self.path):
+            print(f"⚠️ checkpoint 結尾有不完整的紀錄，已截掉 {os.path.getsize(self.path) - valid_bytes} bytes")
+            with open(self.path, "r+b") as f:
+                f.truncate(valid_bytes)
+        n_pages = sum(len(p) for p in self.pages.values())
+        print(f"♻️ 從 {self.path} 讀回 {len(self.pages)} 個分組、{n_pages} 頁，"
+              f"{sum(self.is_group_done(*key) for key in self.pages)} 個分組已完成")
+
+    def record_page(self, race_type: str, group: str, page: int, total_pages: int, records: list):
+        line = json.dumps({"race_type": race_type, "group": group, "page": page,
+                           "total_pages": total_pages, "records": records}, ensure_ascii=False)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+            os.fsync(self._file.fileno())
+            self.pages.setdefault((race_type, group), {})[page] = records
+            self.totals[(race_type, group)] = total_pages
+
+    def completed_pages(self, race_type: str, group: str) -> dict:
+        return self.pages.get((race_type, group), {})
+
+    def total_pages(self, race_type: str, group: str):
+        return self.totals.get((race_type, group))
+
+    def is_group_done(self, race_type: str, group: str) -> bool:
+        total = self.totals.get((race_type, group))
+        pages = self.pages.get((race_type, group), {})
+        return total is not None and all(p in pages for p in range(1, total + 1))
+
+    def group_records(self, race_type: str, group: str) -> list:
+        pages = self.pages.get((race_type, group), {})
+        return [r for page in sorted(pages) for r in pages[page]]
+
+    def close(self):
+        self._file.close()
+
+
+# --------------------------------------------------
+# 增量更新：每頁指紋（總頁數 + 卡片內容 hash）
+# --------------------------------------------------
 
+FINGERPRINT_FILE = "scrape_fingerprints.json"
+RECORD_COLUMNS = ["姓名", "背號", "賽別", "賽事類型", "分組", "完賽時間", "來源分組標籤"]
+
+
+def load_existing_records(excel_path: str) -> dict:
+    """讀回上次輸出的 Excel「完整成績」，依 (賽事類型, 來源分組標籤) 分組成紀錄列表"""
+    df = pd.read_excel(excel_path, sheet_name="完整成績", dtype=str, keep_default_na=False)
+    groups = {}
+    for record in df[RECORD_COLUMNS].to_dict("records"):
+        groups.setdefault((record["賽事類型"], record["來源分組標籤"]), []).append(record)
+    return groups
+
+
+def page_fingerprint(records: list) -> str:
+    """一頁卡片的指紋：背號 / 姓名 / 分組 / 完賽時間依頁面順序 hash，任何一筆修正都會改變"""
+    rows = [[r["背號"], r["姓名"], r["分組"], r["完賽時間"]] for r in records]
+    return hashlib.sha1(json.dumps(rows, ensure_ascii=False).encode("utf-8")).hexdigest()[:16]
+
+
+class ScrapeFingerprints:
+    """
+    記錄這次每個 (賽事類型, 分組) 的總頁數與每頁指紋，跑完寫進 FINGERPRINT_FILE。
+
+    incremental=True 時讀回上次的指紋，existing_records 是上次輸出的紀錄（依分組）：
+    分組的總頁數與探測的頁（第 1 頁；HTTP 後端再加最後一頁）指紋都和上次相同，
+    就沿用上次的紀錄、不抓其餘頁。成績新增或刪除會讓後面的卡片前後移動而改變最後一頁，
+    前段的名次修正會改變第 1 頁；但只改中間頁、不影響名次順序的更正（例如晶片時間差幾秒）
+    探測不到，要等下一次完整抓取或 verify_pages。
+    verify_pages=True 時不沿用任何分組，每一頁都重抓並比對指紋（花的請求數與完整抓取相同），
+    跑完列出每個分組有變動的頁。
+    """
+
+    def __init__(self, path: str = FINGERPRINT_FILE, incremental: bool = False,
+                 existing_records: dict = None, verify_pages: bool = False):
+        self.path = path
+        self.incremental = incremental
+        self.existing = existing_records or {}
+        self.verify_pages = verify_pages
+        self.previous: dict = {}  # (賽事類型, 分組) -> {"total_pages", "pages": {page: 指紋}}
+        self.current: dict = {}
+        self.reused: list = []
+        self._lock = threading.Lock()
+        if incremental:
+            if os.path.exists(path):
+                with open(path, encoding="utf-8") as f:
+                    for g in json.load(f)["groups"]:
+                        self.previous[(g["race_type"], g["group"])] = {
+                            "total_pages": g["total_pages"],
+                            "pages": {int(page): fp for page, fp in g["pages"].items()},
+                        }
+                print(f"🔎 讀回 {len(self.previous)} 個分組的頁面指紋（{path}）")
+            else:
+                print(f"⚠️ 沒有上次的指紋檔 {path}，所有分組都會視為新分組")
+
+    def record_page(self, race_type: str, group: str, page: int, total_pages: int, records: list):
+        with self._lock:
+            entry = self.current.setdefault((race_type, group), {"total_pages": total_pages, "pages": {}})
+            entry["total_pages"] = total_pages
+            entry["pages"][page] = page_fingerprint(records)
+
+    def previous_total(self, race_type: str, group: str):
+        prev = self.previous.get((race_type, group))
+        return prev["total_pages"] if prev else None
+
+    def can_reuse(self, race_type: str, group: str, total_pages: int, probe_pages: dict) -> bool:
+        """
+        probe_pages: {page: records}（至少有第 1 頁）。總頁數與這些頁的指紋都與上次相同、
+        且上次輸出的紀錄和上次的指紋對得上（筆數落在總頁數範圍內、第 1 頁的背號都在）才沿用。
+        """
+        key = (race_type, group)
+        prev, existing = self.previous.get(key), self.existing.get(key)
+        if not self.incremental or self.verify_pages or prev is None or existing is None:
+            return False
+        if prev["total_pages"] != total_pages or 1 not in probe_pages:
+            return False
+        if any(prev["pages"].get(page) != page_fingerprint(records) for page, records in probe_pages.items()):
+            return False
+        per_page = len(probe_pages[1])
+        if not per_page * (total_pages - 1) < len(existing) <= per_page * total_pages:
+            return False
+        bibs = {r["背號"] for r in existing}
+        return all(r["背號"] in bibs for r in probe_pages[1])
+
+    def reuse(self, race_type: str, group: str) -> list:
+        """沿用上次的紀錄與指紋"""
+        key = (race_type, group)
+        with self._lock:
+            self.current[key] = self.previous[key]
+            self.reused.append(key)
+        return self.existing[key]
+
+    def changed_pages(self, race_type: str, group: str):
+        """
+        與上次相比有變動的頁（含新增 / 消失的頁）；上次沒有這個分組則回傳 None。
+        這次沒抓齊的頁也算變動，不會被當成沒變。
+        """
+        key = (race_type, group)
+        prev, cur = self.previous.get(key), self.current.get(key)
+        if prev is None:
+            return None
+        cur = cur or {"total_pages": 0, "pages": {}}
+        last = max(prev["total_pages"], cur["total_pages"])
+        return [page for page in range(1, last + 1)
+                if page > cur["total_pages"] or page > prev["total_pages"]
+                or cur["pages"].get(page) is None or cur["pages"].get(page) != prev["pages"].get(page)]
+
+    def unchanged(self, race_type: str, group: str) -> bool:
+        """每一頁的指紋與總頁數都與上次相同"""
+        return self.changed_pages(race_type, group) == []
+
+    def change_report(self) -> list:
+        """增量模式的變動摘要（一行一項），依 賽事類型 / 分組 排序"""
+        lines = []
+        unchanged = 0
+        for race_type, group in sorted(self.current):
+            if (race_type, group) in self.reused:
+                continue
+            pages = self.changed_pages(race_type, group)
+            if pages is None:
+                lines.append(f"   🆕 {race_type} / {group}：新分組")
+            elif pages:
+                lines.append(f"   ✏️ {race_type} / {group}：第 {'、'.join(map(str, pages))} 頁有變動")
+            else:
+                unchanged += 1
+        for race_type, group in sorted(set(self.previous) - set(self.current)):
+            lines.append(f"   🗑️ {race_type} / {group}：這次沒有這個分組")
+        refetched = len(self.current) - len(self.reused)
+        head = (f"🔎 增量更新：{len(self.reused)} 個分組沿用上次的紀錄，{refetched} 個分組重抓"
+                f"（其中 {unchanged} 個沒有變動），{len(lines)} 項變動")
+        return [head] + lines
+
+    def save(self):
+        groups = [{"race_type": race, "group": group, "total_pages": entry["total_pages"],
+                   "pages": {str(page): fp for page, fp in sorted(entry["pages"].items())}}
+                  for (race, group), entry in self.current.items()]
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": 1, "groups": groups}, f, ensure_ascii=False, indent=1)
+        os.replace(tmp_path, self.path)
+
+
+# --------------------------------------------------
+# 分頁資料集：每抓完一頁就寫一個欄式檔，取代最後一次寫 Excel
+# --------------------------------------------------
+
+DATASET_DIR = "scrape_dataset"
+DATASET_STATS = "stats.json"
+_PAGE_FILE_RE = re.compile(r"^page-(\d+)\.(parquet|csv)$")
+
+
+def _partition_name(value: str) -> str:
+    """
+    賽事類型 / 分組名稱轉成資料夾名稱：換掉檔名不允許的字元，後面加原始名稱的短雜湊。
+    只換字元會撞名（「男/女」與「男_女」都變成 男_女），兩個分組的頁檔就會互相覆蓋。
+    """
+    safe = re.sub(r'[<>:"/\\|?*]', "_", value).strip() or "_"
+    return f"{safe}_{hashlib.sha1(value.encode('utf-8')).hexdigest()[:8]}"
+
+
+class PageSink:
+    """
+    依 (賽事類型, 來源分組標籤) 分區，每頁一個檔：
+        <out_dir>/<賽事類型>_<雜湊>/<分組>_<雜湊>/page-00001.parquet（見 _partition_name）
+    有 pyarrow 時寫 Parquet，沒有就退回 CSV（pip install pyarrow 可省空間、讀得更快）。
+    每頁先寫暫存檔再 rename；同一頁重抓直接覆蓋。
+
+    每次執行都寫進全新的 <out_dir>.partial/，抓取完整並算完統計後才 publish() 換成 out_dir，
+    所以資料集裡只有這次寫入的頁：網站上已消失的分組、這次沒抓到的頁不會殘留。
+    --resume 時 checkpoint 裡的頁也會重新交給 record_page，不需要沿用舊資料夾。
+    抓取不完整時 out_dir 維持上次的內容。
+    """
+
+    def __init__(self, out_dir: str = DATASET_DIR):
+        self.out_dir = out_dir
+        self.staging_dir = out_dir.rstrip("/\\") + ".partial"
+        self.ext = ".parquet" if pyarrow is not None else ".csv"
+        self.totals: dict = {}  # (賽事類型, 分組) -> 這次寫入時的總頁數
+        self.pages_written = 0
+        self._lock = threading.Lock()
+        if os.path.isdir(self.staging_dir):
+            shutil.rmtree(self.staging_dir)
+        os.makedirs(self.staging_dir)
+        if pyarrow is None:
+            print("⚠️ 沒有安裝 pyarrow，資料集改存 CSV")
+
+    def group_dir(self, race_type: str, group: str, root: str = None) -> str:
+        return os.path.join(root or self.staging_dir, _partition_name(race_type), _partition_name(group))
+
+    def record_page(self, race_type: str, group: str, page: int, total_pages: int, records: list):
+        group_dir = self.group_dir(race_type, group)
+        os.makedirs(group_dir, exist_ok=True)
+        path = os.path.join(group_dir, f"page-{page:05d}{self.ext}")
+        df = pd.DataFrame(records, columns=RECORD_COLUMNS)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        if self.ext == ".parquet":
+            df.to_parquet(tmp_path, index=False)
+        else:
+            df.to_csv(tmp_path, index=False)
+        os.replace(tmp_path, path)
+        with self._lock:
+            self.totals[(race_type, group)] = total_pages
+            self.pages_written += 1
+
+    def keep_group(self, race_type: str, group: str, records: list):
+        """
+        增量更新沿用的分組：把上次發布的資料集裡該分組的頁檔複製過來（探測時寫入的頁一併換掉）；
+        上次沒有資料集（例如沿用的是 Excel）就整組寫成一頁。
+        """
+        group_dir = self.group_dir(race_type, group)
+        if os.path.isdir(group_dir):
+            shutil.rmtree(group_dir)
+        published = self.group_dir(race_type, group, self.out_dir)
+        pages = sorted(int(m.group(1)) for f in (os.listdir(published) if os.path.isdir(published) else [])
+                       if (m := _PAGE_FILE_RE.match(f)))
+        if not pages:
+            self.record_page(race_type, group, 1, 1, records)
+            return
+        shutil.copytree(published, group_dir)
+        with self._lock:
+            self.totals[(race_type, group)] = pages[-1]
+            self.pages_written += len(pages)
+
+    def close(self):
+        """分組頁數變少時，刪掉超過這次總頁數的舊頁檔"""
+        for (race_type, group), total in self.totals.items():
+            group_dir = self.group_dir(race_type, group)
+            for name in os.listdir(group_dir):
+                m = _PAGE_FILE_RE.match(name)
+                if m and int(m.group(1)) > total:
+                    os.remove(os.path.join(group_dir, name))
+
+    def publish(self):
+        """把這次的資料集（staging_dir）換成 out_dir，上次的整個刪掉"""
+        old_dir = self.out_dir.rstrip("/\\") + ".old"
+        if os.path.isdir(old_dir):
+            shutil.rmtree(old_dir)
+        if os.path.isdir(self.out_dir):
+            os.replace(self.out_dir, old_dir)
+        os.replace(self.staging_dir, self.out_dir)
+        if os.path.isdir(old_dir):
+            shutil.rmtree(old_dir)
+
+
+def load_dataset_records(dataset_dir: str = DATASET_DIR) -> dict:
+    """讀回資料集，依 (賽事類型, 來源分組標籤) 分組成紀錄列表（增量更新用）"""
+    groups = {}
+    for df in iter_dataset_pages(dataset_dir):
+        for record in df[RECORD_COLUMNS].to_dict("records"):
+            groups.setdefault((record["賽事類型"], record["來源分組標籤"]), []).append(record)
+    return groups
+
+
+def read_page_file(path: str) -> pd.DataFrame:
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path).astype(str)
+    return pd.read_csv(path, dtype=str, keep_default_na=False)
+
+
+def iter_dataset_pages(dataset_dir: str = DATASET_DIR):
+    """依 賽事類型 / 分組 / 頁 的順序逐頁讀出資料集，一次只有一頁在記憶體"""
+    for race_dir in sorted(os.scandir(dataset_dir), key=lambda e: e.name):
+        if not race_dir.is_dir():
+            continue
+        for group_dir in sorted(os.scandir(race_dir.path), key=lambda e: e.name):
+            if not group_dir.is_dir():
+                continue
+            pages = sorted((int(m.group(1)), f) for f in os.listdir(group_dir.path)
+                           if (m := _PAGE_FILE_RE.match(f)))
+            for _, name in pages:
+                yield read_page_file(os.path.join(group_dir.path, name))
+
+
+def _stats_rows(stats: pd.DataFrame) -> list:
+    rows = []
+    for key, row in stats.iterrows():
+        keys = key if isinstance(key, tuple) else (key,)
+        rows.append({
+            **dict(zip(stats.index.names, keys)),
+            "完賽人數": int(row["完賽人數"]),
+            "最快時間": None if pd.isna(row["最快時間"]) else str(row["最快時間"]).split(" days ")[-1],
+            "最慢時間": None if pd.isna(row["最慢時間"]) else str(row["最慢時間"]).split(" days ")[-1],
+        })
+    return rows
+
+
+def finalize_dataset(dataset_dir: str = DATASET_DIR) -> dict:
+    """
+    逐頁彙總 (賽事類型, 分組) 的完賽人數 / 最快 / 最慢時間，再往上合併成
+    分組、賽事類型兩層（與 Excel 的三個統計分頁相同），寫進 <dataset_dir>/stats.json。
+    """
+    parts = []
+    for df in iter_dataset_pages(dataset_dir):
+        td = df["完賽時間"].apply(parse_time_to_timedelta)
+        page = pd.DataFrame({"賽事類型": df["賽事類型"], "分組": df["分組"], "td": td})
+        parts.append(page.groupby(["賽事類型", "分組"]).agg(
+            完賽人數=("td", "size"), 最快時間=("td", "min"), 最慢時間=("td", "max")))
+    if not parts:
+        print(f"⚠️ 資料集 {dataset_dir} 沒有任何成績")
+        return {}
+
+    combine = {"完賽人數": "sum", "最快時間": "min", "最慢時間": "max"}
+    race_group_stats = pd.concat(parts).groupby(level=["賽事類型", "分組"]).agg(combine)
+    stats = {
+        "total": int(race_group_stats["完賽人數"].sum()),
+        "分組統計": _stats_rows(race_group_stats.groupby(level="分組").agg(combine)),
+        "賽事類型統計": _stats_rows(race_group_stats.groupby(level="賽事類型").agg(combine)),
+        "賽事類型_分組統計": _stats_rows(race_group_stats),
+    }
+    stats_path = os.path.join(dataset_dir, DATASET_STATS)
+    with open(stats_path, "w", encoding="utf-8") as f:
+        json.dump(stats, f, ensure_ascii=False, indent=1)
+    print(f"✅ 資料集共 {stats['total']} 筆成績，統計已寫入 {stats_path}")
+    for row in stats["賽事類型統計"]:
+        print(f"   {row['賽事類型']}：{row['完賽人數']} 人（{row['最快時間']} ~ {row['最慢時間']}）")
+    return stats
+
+
+def export_dataset_excel(dataset_dir: str = DATASET_DIR, output_file: str = OUTPUT_FILE) -> bool:
+    """把資料集整份讀進來輸出成原本格式的 Excel（選用）"""
+    frames = list(iter_dataset_pages(dataset_dir))
+    if not frames:
+        return write_results_excel([], output_file)
+    return write_results_excel(pd.concat(frames, ignore_index=True)[RECORD_COLUMNS], output_file)
+
+
+# --------------------------------------------------
+# HTTP 後端：不開瀏覽器，直接打成績頁
+# --------------------------------------------------
+
+# 成績頁就是一個 GET 表單：賽事類型 select[name=raceId]、分組 select[name=group]，
+# 翻頁則是 page 參數；nice-select 只是把原生 <select> 包一層，選項在原始 HTML 裡就有。
+RANK_PARAM_RACE = "raceId"
+RANK_PARAM_GROUP = "group"
+RANK_PARAM_PAGE = "page"
+
+HTTP_WORKERS = 8      # 同時進行的請求數（也是連線池大小）
+HTTP_TIMEOUT = 20     # 單一請求逾時秒數
+HTTP_RETRIES = 3      # 連線錯誤 / 429 / 5xx 的重試次數
+HTTP_PAGE_ROUNDS = 3  # 重試用完（或 4xx）仍失敗的頁，最多再排幾輪重抓（含第一輪）
+
+
+def create_http_session(pool_size: int = HTTP_WORKERS) -> requests.Session:
+    """建立共用的 keep-alive Session：連線池大小 = 併發數，失敗時指數退避重試。"""
+    session = requests.Session()
+    retry = Retry(
+        total=HTTP_RETRIES,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=("GET",),
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    session.headers.update({"User-Agent": USER_AGENT})
+    return session
+
+
+def fetch_rank_page(session: requests.Session, base_url: str, race_id: str = None,
+                    group: str = None, page: int = 1) -> str:
+    """抓一頁成績 HTML；race_id / group 為 None 時不帶該參數（用來取得選單）。"""
+    params = {}
+    if race_id:
+        params[RANK_PARAM_RACE] = race_id
+    if group:
+        params[RANK_PARAM_GROUP] = group
+    if page > 1:
+        params[RANK_PARAM_PAGE] = page
+    resp = session.get(base_url, params=params, timeout=HTTP_TIMEOUT)
+    resp.raise_for_status()
+    return resp.text
+
+
+def parse_select_options(html: str, select_name: str) -> list:
+    """讀取原生 <select name=...> 的選項，回傳 [(文字, value)]，略過 placeholder。"""
+    soup = BeautifulSoup(html, "html.parser")
+    select = soup.select_one(f"select[name='{select_name}']")
+    if select is None:
+        return []
+    options = []
+    for opt in select.select("option"):
+        text = opt.get_text(strip=True)
+        value = (opt.get("value") or "").strip()
+        if not text or text in ("項目", "年齡分組") or opt.has_attr("disabled"):
+            continue
+        options.append((text, value or None))
+    return options
+
+
+def parse_pagination(html: str) -> tuple:
+    """從 #pagination 的 data-page / data-total 讀出 (目前頁, 總頁數)，沒有分頁則為 (1, 1)。"""
+    soup = BeautifulSoup(html, "html.parser")
+    pagination = soup.select_one("#pagination")
+    if pagination is None:
+        return 1, 1
     try:
-        print("開啟成績頁面…")
-        driver.get(BASE_URL)
-        time.sleep(3)
+        return int(pagination.get("data-page") or 1), int(pagination.get("data-total") or 1)
+    except ValueError:
+        return 1, 1
 
-        all_results = []
 
-        # 動態獲取所有可用的賽事類型
-        race_types = get_available_race_types(driver)
-        
+def scrape_contest_http(base_url: str = BASE_URL, workers: int = HTTP_WORKERS,
+                        checkpoint: ScrapeCheckpoint = None, fingerprints: ScrapeFingerprints = None,
+                        sink: PageSink = None) -> list:
+    """
+    以 HTTP 直接抓取整場賽事，回傳與 scrape_current_table 相同格式的紀錄列表。
+    1. 首頁取得賽事類型；每個賽事類型抓一次取得分組選單
+    2. 所有 (賽事類型, 分組) 的第 1 頁一起抓，順便讀出總頁數
+    3. 其餘頁數全部丟進同一個執行緒池
+    同時進行的請求數固定為 workers；結果依 (賽事類型, 分組, 頁) 的原始順序合併，
+    輸出與併發數無關。增量模式下總頁數沒變的分組再探測最後一頁，總頁數、第 1 頁與最後一頁
+    都和上次相同的分組沿用上次的紀錄（見 ScrapeFingerprints）。失敗的頁在同一個執行緒池裡重排，最多 HTTP_PAGE_ROUNDS 輪；
+    仍有頁沒抓到（第 1 頁失敗時該分組其餘頁數也無從得知）就丟出 ScrapeIncompleteError。
+    有 checkpoint 時已抓過的頁不再請求，失敗的頁不寫入，下次 --resume 會補抓。
+    有 sink 時每頁抓到就寫進分頁資料集。
+    """
+    session = create_http_session(workers)
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        print(f"開啟成績頁面（HTTP，{workers} 併發）…")
+        race_types = [(text, text, value) for text, value in
+                      parse_select_options(fetch_rank_page(session, base_url), RANK_PARAM_RACE)]
         if not race_types:
-            print("⚠️ 無法獲取任何賽事類型，結束程式")
-            return
+            print("⚠️ 成績頁沒有賽事類型選單，結束")
+            return []
+        print(f"✅ 取得 {len(race_types)} 個賽事類型：{[rt[0] for rt in race_types]}")
+
+        race_pages = pool.map(lambda rt: fetch_rank_page(session, base_url, rt[2]), race_types)
+        tasks = []  # (賽事類型名稱, race_id, 分組名稱, 分組 value)
+        for (race_name, _, race_id), html in zip(race_types, race_pages):
+            groups = parse_select_options(html, RANK_PARAM_GROUP)
+            if not groups:
+                print(f"⚠️ 「{race_name}」沒有分組選單，使用預設分組列表")
+                groups = [(name, None) for name in DEFAULT_GROUP_NAMES]
+            print(f"   「{race_name}」：{len(groups)} 個分組")
+            tasks.extend((race_name, race_id, name, value or name) for name, value in groups)
+
+        pages = {}   # (任務索引, 頁) -> records
+        totals = {}  # 任務索引 -> 總頁數
+        if checkpoint is not None:
+            for i, (race_name, _, group_name, _) in enumerate(tasks):
+                for page, records in checkpoint.completed_pages(race_name, group_name).items():
+                    pages[(i, page)] = records
+                    record_scraped_page(race_name, group_name, page, checkpoint.total_pages(race_name, group_name),
+                                        records, fingerprints=fingerprints, sink=sink)
+                if checkpoint.total_pages(race_name, group_name) is not None:
+                    totals[i] = checkpoint.total_pages(race_name, group_name)
+
+        def fetch(i, page):
+            race_name, race_id, group_name, group_value = tasks[i]
+            try:
+                html = fetch_rank_page(session, base_url, race_id, group_value, page)
+            except requests.RequestException as e:
+                print(f"⚠️ 「{race_name} / {group_name}」第 {page} 頁抓取失敗: {e}")
+                return None
+            records = parse_result_cards(html, group_name, race_name)
+            _, total = parse_pagination(html)
+            record_scraped_page(race_name, group_name, page, total, records, checkpoint, fingerprints, sink)
+            return records, total
+
+        def fetch_pages(items):
+            """抓 [(任務索引, 頁)]，失敗的頁排進下一輪；回傳 {item: (records, total)}"""
+            done = {}
+            for round_no in range(1, HTTP_PAGE_ROUNDS + 1):
+                if not items:
+                    break
+                if round_no > 1:
+                    print(f"🔁 第 {round_no} 輪重抓 {len(items)} 頁…")
+                failed = []
+                for item, result in zip(items, pool.map(lambda item: fetch(*item), items)):
+                    if result is None:
+                        failed.append(item)
+                    else:
+                        done[item] = result
+                items = failed
+            return done
+
+        first = [i for i in range(len(tasks)) if (i, 1) not in pages]
+        for (i, _), result in fetch_pages([(i, 1) for i in first]).items():
+            pages[(i, 1)], totals[i] = result
+
+        reused = {}  # 任務索引 -> 沿用上次的紀錄
+        probed = []
+        if fingerprints is not None and fingerprints.incremental and not fingerprints.verify_pages:
+            # 總頁數與第 1 頁都沒變的分組再抓最後一頁：成績新增或刪除時後面的卡片都會移動，
+            # 最後一頁一定會變；第 1 頁則涵蓋最前段的名次修正
+            candidates = [i for i, total in sorted(totals.items())
+                          if fingerprints.can_reuse(tasks[i][0], tasks[i][2], total, {1: pages[(i, 1)]})]
+            probed = [(i, totals[i]) for i in candidates if totals[i] > 1 and (i, totals[i]) not in pages]
+            for item, result in fetch_pages(probed).items():
+                pages[item] = result[0]
+            for i in candidates:
+                race_name, _, group_name, _ = tasks[i]
+                probe = {page: pages.get((i, page)) for page in {1, totals[i]}}
+                if None not in probe.values() and fingerprints.can_reuse(race_name, group_name, totals[i], probe):
+                    reused[i] = fingerprints.reuse(race_name, group_name)
+                    if sink is not None:
+                        sink.keep_group(race_name, group_name, reused[i])
+            print(f"🔎 {len(reused)} 個分組與上次相同，{len(tasks) - len(reused)} 個需要重抓"
+                  f"（探測 {len(first) + len(probed)} 頁）")
+
+        rest = [(i, page) for i, total in sorted(totals.items()) if i not in reused
+                for page in range(2, total + 1) if (i, page) not in pages]
+        print(f"📄 {len(tasks)} 個分組，共 {sum(totals.values())} 頁，"
+              f"本次抓取 {len(first) + len(probed) + len(rest)} 頁")
+        for item, result in fetch_pages(rest).items():
+            pages[item] = result[0]
 
-        # 循環處理每種賽事類型
-        for race_type_info in race_types:
-            # race_type_info 可能是 (name, value) 或 (name, value, data_value)
-            if len(race_type_info) == 3:
-                race_type_name, race_type_value, data_value = race_type_info
-            else:
-                race_type_name, race_type_value = race_type_info
-                data_value = None
-            
-            print(f"\n{'='*50}")
-            print(f"開始處理賽事類型：{race_type_name} ({race_type_value})")
-            print(f"{'='*50}\n")
-            
-            # 切換到對應的賽事類型（最多重試 3 次）
-            max_switch_retries = 3
-            switch_success = False
-            for switch_retry in range(max_switch_retries):
-                if switch_race_type(driver, race_type_value, data_value):
-                    # 額外等待頁面完全載入（包括分組選單的 AJAX 更新）
-                    print("   等待分組選單更新...")
-                    time.sleep(3)
-                    
-                    # 驗證當前賽事類型是否正確
+    all_results = []
+    missing = []
+    for i, (race_name, _, group_name, _) in enumerate(tasks):
+        if i in reused:
+            print(f"=== 「{race_name} / {group_name}」沒有變動，沿用上次的 {len(reused[i])} 筆 ===")
+            all_results.extend(reused[i])
+            continue
+        if i not in totals:
+            missing.append(f"{race_name} / {group_name}（第 1 頁，總頁數未知）")
+            continue
+        total = totals[i]
+        lost = [page for page in range(1, total + 1) if (i, page) not in pages]
+        if lost:
+            missing.append(f"{race_name} / {group_name} 第 {'、'.join(map(str, lost))} 頁")
+        group_pages = [pages[(i, page)] for page in range(1, total + 1) if (i, page) in pages]
+        count = sum(len(p) for p in group_pages)
+        print(f"=== 「{race_name} / {group_name}」{len(group_pages)}/{total} 頁，累計 {count} 筆 ===")
+        for records in group_pages:
+            all_results.extend(records)
+    if missing:
+        raise ScrapeIncompleteError(missing, all_results)
+    return all_results
+
+
+# --------------------------------------------------
+# 主流程
+# --------------------------------------------------
+
+def select_race_type(driver: webdriver.Chrome, race_type_info) -> bool:
+    """
+    切換到指定賽事類型並確認選單目前的文字（最多重試 3 次）。
+    race_type_info 可能是 (name, value) 或 (name, value, data_value)
+    """
+    if len(race_type_info) == 3:
+        race_type_name, race_type_value, data_value = race_type_info
+    else:
+        race_type_name, race_type_value = race_type_info
+        data_value = None
+    
+    print(f"\n{'='*50}")
+    print(f"開始處理賽事類型：{race_type_name} ({race_type_value})")
+    print(f"{'='*50}\n")
+    
+    # 切換到對應的賽事類型（最多重試 3 次）
+    max_switch_retries = 3
+    switch_success = False
+    for switch_retry in range(max_switch_retries):
+        if switch_race_type(driver, race_type_value, data_value):
+            # 驗證當前賽事類型是否正確
+            try:
+                # 查找賽事類型選單的當前選項
+                race_selects = driver.find_elements(By.CSS_SELECTOR, "div.nice-select.chosen-select")
+                for rs in race_selects:
                     try:
-                        # 查找賽事類型選單的當前選項
-                        race_selects = driver.find_elements(By.CSS_SELECTOR, "div.nice-select.chosen-select")
-                        for rs in race_selects:
-                            try:
-                                parent = rs.find_element(By.XPATH, "./..")
-                                select_elem = parent.find_element(By.CSS_SELECTOR, "select[name='raceId']")
-                                current_span = rs.find_element(By.CSS_SELECTOR, "span.current")
-                                current_text = current_span.text.strip()
-                                print(f"   當前選中的賽事類型：{current_text}")
-                                
-                                # 驗證是否真的切換成功
-                                if (race_type_value in current_text or 
-                                    current_text in race_type_value or
-                                    race_type_name in current_text):
-                                    print(f"   ✅ 確認已切換到「{current_text}」")
-                                    switch_success = True
-                                    break
-                                else:
-                                    print(f"   ⚠️ 切換後仍然是「{current_text}」，預期是「{race_type_value}」")
-                                    if switch_retry < max_switch_retries - 1:
-                                        print(f"   重試切換... ({switch_retry + 1}/{max_switch_retries})")
-                                        time.sleep(2)
-                                        break
-                            except:
-                                continue
+                        parent = rs.find_element(By.XPATH, "./..")
+                        select_elem = parent.find_element(By.CSS_SELECTOR, "select[name='raceId']")
+                        current_span = rs.find_element(By.CSS_SELECTOR, "span.current")
+                        current_text = current_span.text.strip()
+                        print(f"   當前選中的賽事類型：{current_text}")
                         
-                        if switch_success:
-                            break
-                    except Exception as e:
-                        print(f"   ⚠️ 驗證時發生錯誤: {e}")
-                        if switch_retry < max_switch_retries - 1:
-                            print(f"   重試切換... ({switch_retry + 1}/{max_switch_retries})")
-                            time.sleep(2)
-                            continue
-                        else:
-                            print(f"   ⚠️ 無法驗證，但假設切換成功")
+                        # 驗證是否真的切換成功
+                        if (race_type_value in current_text or 
+                            current_text in race_type_value or
+                            race_type_name in current_text):
+                            print(f"   ✅ 確認已切換到「{current_text}」")
                             switch_success = True
                             break
-                else:
-                    if switch_retry < max_switch_retries - 1:
-                        print(f"   ⚠️ 切換失敗，重試中... ({switch_retry + 1}/{max_switch_retries})")
-                        time.sleep(2)
+                        else:
+                            print(f"   ⚠️ 切換後仍然是「{current_text}」，預期是「{race_type_value}」")
+                            if switch_retry < max_switch_retries - 1:
+                                print(f"   重試切換... ({switch_retry + 1}/{max_switch_retries})")
+                                time.sleep(2)
+                                break
+                    except:
                         continue
-                    else:
-                        print(f"   ⚠️ 無法切換到「{race_type_name}」，跳過此賽事類型")
-                        break
-            
-            if not switch_success:
-                print(f"⚠️ 無法切換到「{race_type_name}」，跳過此賽事類型")
-                continue
-            
-            # 動態獲取當前賽事類型下可用的分組列表
-            available_groups = get_available_groups(driver)
-            
-            if not available_groups:
-                print(f"⚠️ 「{race_type_name}」沒有可用分組，跳過")
+                
+                if switch_success:
+                    break
+            except Exception as e:
+                print(f"   ⚠️ 驗證時發生錯誤: {e}")
+                if switch_retry < max_switch_retries - 1:
+                    print(f"   重試切換... ({switch_retry + 1}/{max_switch_retries})")
+                    time.sleep(2)
+                    continue
+                else:
+                    print(f"   ⚠️ 無法驗證，但假設切換成功")
+                    switch_success = True
+                    break
+        else:
+            if switch_retry < max_switch_retries - 1:
+                print(f"   ⚠️ 切換失敗，重試中... ({switch_retry + 1}/{max_switch_retries})")
+                time.sleep(2)
                 continue
-            
-            # 爬取這個賽事類型下的所有分組
-            for cat_info in available_groups:
-                data = scrape_category(driver, cat_info, race_type_name)
-                all_results.extend(data)
-                # 避免太頻繁操作
-                time.sleep(1)
-
-        df = pd.DataFrame(all_results)
-        if df.empty:
-            print("⚠️ 最後沒有抓到任何成績資料，請檢查 selector 或頁面結構。")
-            return
+            else:
+                print(f"   ⚠️ 無法切換到「{race_type_name}」，跳過此賽事類型")
+                break
+    
+    return switch_success
 
-        # 轉換完賽時間為 Timedelta 並排序
-        df["完賽時間_td"] = df["完賽時間"].apply(parse_time_to_timedelta)
-        df = df.sort_values(["完賽時間_td", "分組", "姓名"], na_position="last")
-
-        # 加一個整體排名欄位
-        df["總排名"] = range(1, len(df) + 1)
-
-        # 儲存到 Excel
-        output_file = "2026_渣打台北馬拉松_完整成績.xlsx"
-        with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
-            df.to_excel(writer, sheet_name="完整成績", index=False)
-
-            # 分組統計（只在確定欄位存在時進行）
-            if "分組" in df.columns:
-                group_stats = (
-                    df.groupby("分組")
-                    .agg(
-                        完賽人數=("姓名", "count"),
-                        最快時間=("完賽時間_td", "min"),
-                        最慢時間=("完賽時間_td", "max"),
-                    )
+
+def open_rank_page(base_url: str = BASE_URL, capture_network: bool = False) -> webdriver.Chrome:
+    """建立一個新的 driver 並開啟成績頁面。"""
+    driver = setup_driver(capture_network)
+    try:
+        driver.get(base_url)
+        if not wait_until(driver, rank_page_ready, "page_load"):
+            print(f"⚠️ {WAIT_TIMEOUTS['page_load']} 秒內成績頁面沒有載入完成")
+    except Exception:
+        driver.quit()
+        raise
+    return driver
+
+
+def discover_tasks(driver: webdriver.Chrome, race_types: list) -> tuple:
+    """
+    逐一切換賽事類型讀出分組選單，回傳 (tasks, skipped)：
+    tasks 為 [(race_type_info, cat_info)]，順序即最後合併的順序；skipped 為讀不到分組的賽事類型描述。
+    """
+    tasks = []
+    skipped = []
+    for race_type_info in race_types:
+        race_type_name = race_type_info[0]
+        if not select_race_type(driver, race_type_info):
+            print(f"⚠️ 無法切換到「{race_type_name}」，跳過此賽事類型")
+            skipped.append(f"{race_type_name}（無法切換）")
+            continue
+
+        # 動態獲取當前賽事類型下可用的分組列表
+        available_groups = get_available_groups(driver)
+        if not available_groups:
+            print(f"⚠️ 「{race_type_name}」沒有可用分組，跳過")
+            skipped.append(f"{race_type_name}（沒有分組選單）")
+            continue
+        tasks.extend((race_type_info, cat_info) for cat_info in available_groups)
+    return tasks, skipped
+
+
+class DriverWorker:
+    """
+    driver pool 裡的一個 worker：自己的 Chrome 與導覽狀態（目前停在哪個賽事類型）。
+    同一個賽事類型的分組接連處理時不必重新切換；任務失敗後整個 driver 重開，
+    避免把壞掉的頁面狀態帶到下一個任務。
+    """
+
+    def __init__(self, worker_id: int, base_url: str, driver: webdriver.Chrome = None, current_race=None,
+                 checkpoint: ScrapeCheckpoint = None, fingerprints: ScrapeFingerprints = None,
+                 sink: PageSink = None, capture_network: bool = False):
+        self.worker_id = worker_id
+        self.base_url = base_url
+        self.capture_network = capture_network
+        self.driver = driver
+        self.current_race = current_race if driver is not None else None
+        self.checkpoint = checkpoint
+        self.fingerprints = fingerprints
+        self.sink = sink
+
+    def run(self, race_type_info, cat_info) -> list:
+        category_name = cat_info[0] if isinstance(cat_info, tuple) else cat_info
+        if self.checkpoint is not None and self.checkpoint.is_group_done(race_type_info[0], category_name):
+            total = self.checkpoint.total_pages(race_type_info[0], category_name)
+            for page, records in self.checkpoint.completed_pages(race_type_info[0], category_name).items():
+                record_scraped_page(race_type_info[0], category_name, page, total, records,
+                                    fingerprints=self.fingerprints, sink=self.sink)
+            return self.checkpoint.group_records(race_type_info[0], category_name)
+        if self.driver is None:
+            self.driver = open_rank_page(self.base_url, self.capture_network)
+        if self.current_race != race_type_info:
+            self.current_race = None
+            if not select_race_type(self.driver, race_type_info):
+                raise ScrapeTaskError(f"無法切換到「{race_type_info[0]}」")
+            self.current_race = race_type_info
+        return scrape_category(self.driver, cat_info, race_type_info[0], strict=True,
+                               checkpoint=self.checkpoint, fingerprints=self.fingerprints, sink=self.sink)
+
+    def reset(self):
+        self.close()
+        self.current_race = None
+
+    def close(self):
+        if self.driver is not None:
+            release_network_capture(self.driver)
+            try:
+                self.driver.quit()
+            except Exception:
+                pass
+            self.driver = None
+
+
+TASK_MAX_ATTEMPTS = 3  # 同一個 (賽事類型, 分組) 最多嘗試次數
+
+
+def run_driver_pool(tasks: list, workers: list, max_attempts: int = TASK_MAX_ATTEMPTS) -> list:
+    """
+    workers 個 driver 從同一個佇列領 (賽事類型, 分組) 任務；失敗的任務重開 driver 後
+    放回佇列（最多 max_attempts 次）。回傳依 tasks 順序合併的紀錄，與 worker 數無關；
+    有任務用完次數仍失敗時丟出 ScrapeIncompleteError（records 為其餘分組的紀錄）。
+    """
+    task_queue = queue.Queue()
+    for index in range(len(tasks)):
+        task_queue.put((index, 1))
+    results = [None] * len(tasks)
+    failed = []
+
+    def work(worker: DriverWorker):
+        while True:
+            item = task_queue.get()
+            if item is None:
+                task_queue.task_done()
+                return
+            index, attempt = item
+            race_type_info, cat_info = tasks[index]
+            try:
+                results[index] = worker.run(race_type_info, cat_info)
+            except Exception as e:
+                label = f"{race_type_info[0]} / {cat_info[0] if isinstance(cat_info, tuple) else cat_info}"
+                worker.reset()
+                if attempt < max_attempts:
+                    print(f"⚠️ [worker {worker.worker_id}] 「{label}」失敗（{e}），重新排入佇列 ({attempt}/{max_attempts})")
+                    task_queue.put((index, attempt + 1))
+                else:
+                    print(f"❌ [worker {worker.worker_id}] 「{label}」失敗 {max_attempts} 次，放棄: {e}")
+                    failed.append((index, label))
+            finally:
+                task_queue.task_done()
+
+    threads = [threading.Thread(target=work, args=(w,), daemon=True) for w in workers]
+    for t in threads:
+        t.start()
+    task_queue.join()
+    for _ in threads:
+        task_queue.put(None)
+    for t in threads:
+        t.join()
+
+    all_results = []
+    for records in results:
+        all_results.extend(records or [])
+    if failed:
+        raise ScrapeIncompleteError([label for _, label in sorted(failed)], all_results)
+    return all_results
+
+
+def scrape_contest_selenium(base_url: str = BASE_URL, workers: int = 1,
+                            checkpoint: ScrapeCheckpoint = None, fingerprints: ScrapeFingerprints = None,
+                            sink: PageSink = None, capture_network: bool = False) -> list:
+    """
+    用 headless Chrome 點選單、翻頁抓取整場賽事，回傳紀錄列表。
+    capture_network=True 時每個 driver 都開 performance log（--extract network 用）。
+    第一個 driver 先讀出所有 (賽事類型, 分組) 任務，再與其他 workers - 1 個 driver
+    一起從佇列領任務。checkpoint 裡已完成的分組直接取回，不再開頁面。
+    有賽事類型讀不到分組、或分組重試用完仍失敗時丟出 ScrapeIncompleteError。
+    """
+    print("開啟成績頁面…")
+    driver = open_rank_page(base_url, capture_network)
+    pool = [DriverWorker(0, base_url, driver, checkpoint=checkpoint, fingerprints=fingerprints, sink=sink,
+                         capture_network=capture_network)]
+
+    try:
+        # 動態獲取所有可用的賽事類型
+        race_types = get_available_race_types(driver)
+        
+        if not race_types:
+            print("⚠️ 無法獲取任何賽事類型，結束程式")
+            return []
+
+        tasks, skipped = discover_tasks(driver, race_types)
+        if not tasks:
+            if skipped:
+                raise ScrapeIncompleteError(skipped)
+            return []
+        # 第一個 driver 停在最後一個賽事類型，接手時可以省一次切換
+        pool[0].current_race = tasks[-1][0]
+        pool.extend(DriverWorker(i, base_url, checkpoint=checkpoint, fingerprints=fingerprints, sink=sink,
+                                 capture_network=capture_network)
+                    for i in range(1, min(workers, len(tasks))))
+        print(f"🚗 {len(tasks)} 個分組，{len(pool)} 個 driver 並行")
+        try:
+            all_results = run_driver_pool(tasks, pool)
+        except ScrapeIncompleteError as e:
+            raise ScrapeIncompleteError(skipped + e.missing, e.records) from None
+        if skipped:
+            raise ScrapeIncompleteError(skipped, all_results)
+        return all_results
+
+    finally:
+        for worker in pool:
+            worker.close()
+
+
+def write_results_excel(all_results: list, output_file: str = OUTPUT_FILE) -> bool:
+    """排序、加總排名後寫出 Excel（完整成績 + 各種統計分頁），沒有資料則回傳 False。"""
+    df = pd.DataFrame(all_results)
+    if df.empty:
+        print("⚠️ 最後沒有抓到任何成績資料，請檢查 selector 或頁面結構。")
+        return False
+
+    # 轉換完賽時間為 Timedelta 並排序
+    df["完賽時間_td"] = df["完賽時間"].apply(parse_time_to_timedelta)
+    df = df.sort_values(["完賽時間_td", "分組", "姓名"], na_position="last")
+
+    # 加一個整體排名欄位
+    df["總排名"] = range(1, len(df) + 1)
+
+    # 儲存到 Excel
+    with pd.ExcelWriter(output_file, engine="openpyxl") as writer:
+        df.to_excel(writer, sheet_name="完整成績", index=False)
+
+        # 分組統計（只在確定欄位存在時進行）
+        if "分組" in df.columns:
+            group_stats = (
+                df.groupby("分組")
+                .agg(
+                    完賽人數=("姓名", "count"),
+                    最快時間=("完賽時間_td", "min"),
+                    最慢時間=("完賽時間_td", "max"),
                 )
-                group_stats.to_excel(writer, sheet_name="分組統計")
-            
-            # 按賽事類型統計
-            if "賽事類型" in df.columns:
-                race_type_stats = (
-                    df.groupby("賽事類型")
-                    .agg(
-                        完賽人數=("姓名", "count"),
-                        最快時間=("完賽時間_td", "min"),
-                        最慢時間=("完賽時間_td", "max"),
-                    )
+            )
+            group_stats.to_excel(writer, sheet_name="分組統計")
+        
+        # 按賽事類型統計
+        if "賽事類型" in df.columns:
+            race_type_stats = (
+                df.groupby("賽事類型")
+                .agg(
+                    完賽人數=("姓名", "count"),
+                    最快時間=("完賽時間_td", "min"),
+                    最慢時間=("完賽時間_td", "max"),
                 )
-                race_type_stats.to_excel(writer, sheet_name="賽事類型統計")
-                
-                # 按賽事類型+分組統計
-                race_group_stats = (
-                    df.groupby(["賽事類型", "分組"])
-                    .agg(
-                        完賽人數=("姓名", "count"),
-                        最快時間=("完賽時間_td", "min"),
-                        最慢時間=("完賽時間_td", "max"),
-                    )
+            )
+            race_type_stats.to_excel(writer, sheet_name="賽事類型統計")
+            
+            # 按賽事類型+分組統計
+            race_group_stats = (
+                df.groupby(["賽事類型", "分組"])
+                .agg(
+                    完賽人數=("姓名", "count"),
+                    最快時間=("完賽時間_td", "min"),
+                    最慢時間=("完賽時間_td", "max"),
                 )
-                race_group_stats.to_excel(writer, sheet_name="賽事類型_分組統計")
+            )
+            race_group_stats.to_excel(writer, sheet_name="賽事類型_分組統計")
+
+    print(f"✅ 完成！共爬取 {len(df)} 筆成績，已儲存至 {output_file}")
+    if "分組" in df.columns:
+        print("\n各分組筆數：")
+        print(df["分組"].value_counts())
+    if "賽事類型" in df.columns:
+        print("\n各賽事類型筆數：")
+        print(df["賽事類型"].value_counts())
+    return True
 
-        print(f"✅ 完成！共爬取 {len(df)} 筆成績，已儲存至 {output_file}")
-        if "分組" in df.columns:
-            print("\n各分組筆數：")
-            print(df["分組"].value_counts())
-        if "賽事類型" in df.columns:
-            print("\n各賽事類型筆數：")
-            print(df["賽事類型"].value_counts())
+
+def main():
+    global CARD_EXTRACTION, RANK_API_PATTERN, NETWORK_FIXTURE_DIR
+    parser = argparse.ArgumentParser(description="爬取賽事成績並輸出 Excel")
+    parser.add_argument("--backend", choices=["selenium", "http"], default="selenium",
+                        help="selenium：headless Chrome 點選單翻頁；http：直接打成績頁（快很多）")
+    parser.add_argument("--base-url", default=BASE_URL, help=f"成績頁網址（預設 {BASE_URL}）")
+    parser.add_argument("--workers", type=int,
+                        help=f"http：同時進行的請求數（預設 {HTTP_WORKERS}）；selenium：並行的 driver 數（預設 1）")
+    parser.add_argument("--output", default=OUTPUT_FILE, help=f"輸出 Excel（預設 {OUTPUT_FILE}）")
+    parser.add_argument("--dataset", nargs="?", const=DATASET_DIR,
+                        help=f"每頁寫進分頁資料集（預設 {DATASET_DIR}/），跑完只計算統計、不寫 Excel")
+    parser.add_argument("--excel", action="store_true", help="搭配 --dataset：另外從資料集輸出 --output Excel")
+    parser.add_argument("--wait-timeout", action="append", default=[], metavar="[NAME=]SEC",
+                        help=f"selenium 等待逾時秒數；NAME 為 {'/'.join(WAIT_TIMEOUTS)} 之一，"
+                             "省略 NAME 則全部套用（可重複指定）")
+    parser.add_argument("--extract", choices=["js", "soup", "network"], default=CARD_EXTRACTION,
+                        help="selenium 卡片解析方式：js 在瀏覽器內讀欄位（預設）；soup 傳回 page_source 用 BeautifulSoup；"
+                             "network 從 CDP performance log 讀頁面收到的成績 API JSON")
+    parser.add_argument("--capture-url", metavar="REGEX",
+                        help=f"搭配 --extract network：成績 API 網址的 regex（預設 {RANK_API_PATTERN.pattern}）")
+    parser.add_argument("--save-network", metavar="DIR",
+                        help="搭配 --extract network：把用到的 API 回應存成 fixture，可用 --replay-network 重跑")
+    parser.add_argument("--replay-network", metavar="DIR",
+                        help="不開瀏覽器，直接解析 --save-network 存下的 fixture 並輸出")
+    parser.add_argument("--checkpoint", default=CHECKPOINT_FILE,
+                        help=f"每頁寫入的 checkpoint 檔（預設 {CHECKPOINT_FILE}）")
+    parser.add_argument("--resume", action="store_true",
+                        help="從 checkpoint 接續：已完成的頁不再抓取")
+    parser.add_argument("--no-checkpoint", action="store_true", help="不寫 checkpoint")
+    parser.add_argument("--incremental", action="store_true",
+                        help="增量更新：只重抓總頁數或探測頁（第 1 頁，http 再加最後一頁）指紋與上次不同的分組，"
+                             "其餘沿用既有的 --dataset 資料集或 --output Excel 合併輸出；"
+                             "只改中間頁、不影響名次順序的更正探測不到")
+    parser.add_argument("--verify-pages", action="store_true",
+                        help="搭配 --incremental：不沿用任何分組，每一頁都重抓比對指紋"
+                             "（抓得到中間頁的更正，但請求數與完整抓取相同），跑完列出有變動的頁")
+    parser.add_argument("--fingerprints", default=FINGERPRINT_FILE,
+                        help=f"每頁指紋檔（預設 {FINGERPRINT_FILE}）")
+    args = parser.parse_args()
+    if args.incremental and args.resume:
+        parser.error("--incremental 與 --resume 不能同時使用")
+    if args.verify_pages and not args.incremental:
+        parser.error("--verify-pages 需要搭配 --incremental")
+    if args.replay_network and (args.incremental or args.resume):
+        parser.error("--replay-network 不能與 --incremental / --resume 同時使用")
+
+    CARD_EXTRACTION = args.extract
+    if args.capture_url:
+        RANK_API_PATTERN = re.compile(args.capture_url, re.IGNORECASE)
+    NETWORK_FIXTURE_DIR = args.save_network
+    for item in args.wait_timeout:
+        name, _, sec = item.rpartition("=")
+        if name and name not in WAIT_TIMEOUTS:
+            parser.error(f"未知的等待類型：{name}")
+        try:
+            timeout = float(sec)
+        except ValueError:
+            parser.error(f"--wait-timeout 的秒數不是數字：{item}")
+        if timeout <= 0:
+            parser.error(f"--wait-timeout 的秒數必須大於 0：{item}")
+        for key in ([name] if name else list(WAIT_TIMEOUTS)):
+            WAIT_TIMEOUTS[key] = timeout
+
+    existing = None
+    if args.incremental and not args.verify_pages:
+        if args.dataset and os.path.isdir(args.dataset):
+            existing = load_dataset_records(args.dataset)
+        elif os.path.exists(args.output):
+            existing = load_existing_records(args.output)
+        if existing is None:
+            print(f"⚠️ 沒有上次的輸出 {args.dataset or args.output}，所有分組都會重抓")
+        else:
+            print(f"📂 讀回上次的 {sum(len(r) for r in existing.values())} 筆成績（{len(existing)} 個分組）")
+    fingerprints = ScrapeFingerprints(args.fingerprints, incremental=args.incremental,
+                                      existing_records=existing, verify_pages=args.verify_pages)
+
+    # 重跑 fixture 不發請求，也就不動 checkpoint / 指紋檔
+    checkpoint = None
+    if not args.no_checkpoint and not args.replay_network:
+        checkpoint = ScrapeCheckpoint(args.checkpoint, resume=args.resume)
+    sink = PageSink(args.dataset) if args.dataset else None
+
+    saved = False
+    try:
+        if args.replay_network:
+            all_results = replay_network_fixtures(args.replay_network, sink)
+        elif args.backend == "http":
+            all_results = scrape_contest_http(args.base_url, max(args.workers or HTTP_WORKERS, 1),
+                                              checkpoint, fingerprints, sink)
+        else:
+            all_results = scrape_contest_selenium(args.base_url, max(args.workers or 1, 1),
+                                                  checkpoint, fingerprints, sink,
+                                                  capture_network=args.extract == "network")
+            if WAIT_STATS:
+                print("⏱️ 等待時間統計：")
+                for line in format_wait_stats():
+                    print(line)
+        if sink is not None:
+            sink.close()
+            saved = bool(finalize_dataset(sink.staging_dir))
+            if saved:
+                sink.publish()
+                if args.excel:
+                    export_dataset_excel(args.dataset, args.output)
+        else:
+            saved = write_results_excel(all_results, args.output)
+        if saved and not args.replay_network:
+            fingerprints.save()
+            if fingerprints.incremental:
+                for line in fingerprints.change_report():
+                    print(line)
+
+    except ScrapeIncompleteError as e:
+        # 少了頁 / 分組的結果不寫出，避免不完整的 Excel 被當成完整成績
+        print(f"❌ 抓取不完整，未輸出：{e}")
+        for item in e.missing:
+            print(f"   - {item}")
+        if checkpoint is not None:
+            print(f"   已完成的頁記錄在 {checkpoint.path}，可加 --resume 補抓")
 
     except Exception as e:
         print(f"❌ 執行過程發生錯誤: {e}")
+        if checkpoint is not None:
+            print(f"   已完成的頁記錄在 {checkpoint.path}，可加 --resume 接續")
 
     finally:
-        driver.quit()
+        if checkpoint is not None:
+            checkpoint.close()
+
+    if not saved:
+        sys.exit(1)
 
 
 if __name__ == "__main__":
-    # 需要套件：pip install selenium beautifulsoup4 pandas openpyxl
+    # 需要套件：pip install selenium beautifulsoup4 pandas openpyxl requests
     main()
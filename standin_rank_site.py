@@ -0,0 +1,215 @@
+"""
+本機假成績頁：模擬 bravelog 成績頁的 GET 表單（raceId / group / page），
+給 scrap_result 的 HTTP 後端與 check_scrapers.py 離線測試用。
+
+    python standin_rank_site.py --port 8901 --latency 50
+    python scrap_result.py --backend http --base-url http://127.0.0.1:8901/
+
+成績由固定種子產生，每次啟動都一樣；另外可用 POST JSON 改變狀態：
+    {"op": "reset"}                                              清除所有修改與錯誤注入
+    {"op": "time", "race", "group", "index", "sec"}              修改第 index 位跑者的完賽秒數
+    {"op": "add", "race", "group", "name", "bib", "sec"}         新增一位跑者
+    {"op": "remove", "race", "group", "index"}                   刪掉第 index 位跑者（例如 DQ）
+    {"op": "fail", "race", "group", "page", "times", "status"}   該頁接下來 times 次回傳 status（times < 0 為永遠）
+GET /_hits 回傳目前為止的成績頁請求數。
+
+另有模擬前端 XHR 的 JSON API（欄位名稱刻意與卡片不同，給 --extract network 的解析測試用）：
+    GET /api/rank/list?raceId=&group=&page=   {"code": 0, "data": {"list": [...], "page", "total_page"}}
+    GET /api/rank/summary?raceId=             {"code": 0, "result": {"finishers": N}}（不是成績列表）
+"""
+import json
+import time
+import zlib
+import random
+import argparse
+import threading
+from html import escape
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+from urllib.parse import urlparse, parse_qs
+
+PER_PAGE = 20
+RACES = {"1001": "全程馬拉松(42.195KM)", "1002": "半程馬拉松(21.0975km)", "1003": "11KM"}
+GROUPS = {
+    "1001": ["男30-39歲", "女30-39歲", "男40-49歲", "女視障選手"],
+    "1002": ["男30-39歲", "女30-39歲", "男19歲-"],
+    "1003": ["男30-39歲", "女20-29歲", "女60歲+"],
+}
+SIZES = {"男30-39歲": 137, "女30-39歲": 61, "男40-49歲": 95, "女視障選手": 3,
+         "男19歲-": 40, "女20-29歲": 22, "女60歲+": 7}
+
+
+def format_seconds(sec: int) -> str:
+    return f"{sec // 3600:02d}:{sec % 3600 // 60:02d}:{sec % 60:02d}"
+
+
+class StandinSite:
+    """成績資料與修改 / 錯誤注入狀態（多執行緒共用，以 lock 保護）"""
+
+    def __init__(self, latency: float = 0.0):
+        self.latency = latency
+        self.mutations: list = []
+        self.failures: dict = {}  # (race, group, page) -> {"times", "status"}
+        self.hits = 0
+        self._lock = threading.Lock()
+
+    def runners(self, race: str, group: str) -> list:
+        """(race, group) 的跑者 [姓名, 背號, 賽別, 分組, 秒數]，依完賽秒數排序"""
+        rng = random.Random(f"{race}|{group}")
+        n = SIZES[group] + (5 if race == "1002" else 0)
+        prefix = f"{race[-1]}{zlib.crc32(group.encode('utf-8')) % 97:02d}"
+        rows = [[f"跑者{race[-1]}{i}", f"{prefix}{i:04d}", RACES[race], group, rng.randint(3600, 6 * 3600)]
+                for i in range(n)]
+        with self._lock:
+            mutations = [m for m in self.mutations if m["race"] == race and m["group"] == group]
+        for m in mutations:
+            if m["op"] == "time":
+                rows[m["index"]][4] = m["sec"]
+            elif m["op"] == "add":
+                rows.append([m["name"], m["bib"], RACES[race], group, m["sec"]])
+            elif m["op"] == "remove":
+                rows.pop(m["index"])
+        rows.sort(key=lambda r: (r[4], r[1]))
+        return rows
+
+    def total_pages(self, race: str, group: str) -> int:
+        return max(1, -(-len(self.runners(race, group)) // PER_PAGE))
+
+    def expected_records(self) -> list:
+        """完整抓取應得到的紀錄（與 scrap_result.build_card_records 同格式，依賽事類型 / 分組 / 名次排列）"""
+        records = []
+        for race, race_name in RACES.items():
+            for group in GROUPS[race]:
+                for name, bib, race_type, group_text, sec in self.runners(race, group):
+                    records.append({"姓名": name, "背號": bib, "賽別": race_type, "賽事類型": race_name,
+                                    "分組": group_text, "完賽時間": format_seconds(sec), "來源分組標籤": group})
+        return records
+
+    def control(self, message: dict):
+        with self._lock:
+            if message.get("op") == "reset":
+                self.mutations.clear()
+                self.failures.clear()
+                self.hits = 0
+            elif message.get("op") == "fail":
+                key = (message["race"], message["group"], int(message.get("page", 1)))
+                self.failures[key] = {"times": int(message.get("times", 1)),
+                                      "status": int(message.get("status", 500))}
+            else:
+                self.mutations.append(message)
+
+    def injected_status(self, race: str, group: str, page: int):
+        """該頁這次要回傳的錯誤狀態碼（沒有注入錯誤則為 None）"""
+        with self._lock:
+            self.hits += 1
+            failure = self.failures.get((race, group, page))
+            if failure is None or failure["times"] == 0:
+                return None
+            if failure["times"] > 0:
+                failure["times"] -= 1
+            return failure["status"]
+
+    def page_json(self, race: str, group: str, page: int) -> dict:
+        """成績列表 API：完賽時間奇數名次給秒數、偶數名次給字串，兩種寫法都要能解析"""
+        rows = self.runners(race, group) if race in RACES and group in GROUPS[race] else []
+        items = [{"Runner_Name": name, "bib_no": bib, "race": {"name": race_type}, "group_name": group_text,
+                  "net_time": sec if rank % 2 else format_seconds(sec), "rank": rank}
+                 for rank, (name, bib, race_type, group_text, sec)
+                 in enumerate(rows[(page - 1) * PER_PAGE: page * PER_PAGE], start=(page - 1) * PER_PAGE + 1)]
+        return {"code": 0, "data": {"list": items, "page": page,
+                                    "total_page": max(1, -(-len(rows) // PER_PAGE))}}
+
+    def summary_json(self, race: str) -> dict:
+        return {"code": 0, "result": {"finishers": sum(len(self.runners(race, g)) for g in GROUPS.get(race, []))}}
+
+    def page_html(self, race: str, group: str, page: int) -> str:
+        race = race if race in RACES else "1001"
+        options = "".join(f'<option value="{k}"{" selected" if k == race else ""}>{v}</option>'
+                          for k, v in RACES.items())
+        group_options = "".join(f'<option value="{g}">{g}</option>' for g in GROUPS[race])
+        body = ""
+        if group in GROUPS[race]:
+            rows = self.runners(race, group)
+            total = max(1, -(-len(rows) // PER_PAGE))
+            body = "".join(card_html(r) for r in rows[(page - 1) * PER_PAGE: page * PER_PAGE])
+            body += f'<div id="pagination" data-page="{page}" data-total="{total}"></div>'
+        return (f'<html><body><form>'
+                f'<select name="raceId"><option value="">項目</option>{options}</select>'
+                f'<select name="group"><option value="">年齡分組</option>{group_options}</select>'
+                f'</form>{body}</body></html>')
+
+
+def card_html(row) -> str:
+    name, bib, race_type, group, sec = row
+    return (f'<div class="fl-wrap list-single-main-item_content"><div class="list-item">'
+            f'<div class="list-user-info"><div class="name">{escape(name)}</div><div class="detail-info">'
+            f'<span>{bib}</span><span>{escape(race_type)}</span><span>{escape(group)}</span></div></div>'
+            f'<div class="time"><span>{format_seconds(sec)}</span></div></div></div>')
+
+
+def make_handler(site: StandinSite):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            site.control(json.loads(self.rfile.read(length) or b"{}"))
+            self._send(200, b"ok", "text/plain")
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = {k: v[0] for k, v in parse_qs(url.query).items()}
+            if url.path == "/_hits":
+                return self._send(200, str(site.hits).encode(), "text/plain")
+            race, group = query.get("raceId"), query.get("group")
+            page = int(query.get("page", 1))
+            status = site.injected_status(race, group, page)
+            if site.latency:
+                time.sleep(site.latency)
+            if status is not None:
+                return self._send(status, b"injected failure", "text/plain")
+            if url.path == "/api/rank/list":
+                payload = site.page_json(race, group, page)
+            elif url.path == "/api/rank/summary":
+                payload = site.summary_json(race)
+            else:
+                return self._send(200, site.page_html(race, group, page).encode("utf-8"), "text/html; charset=utf-8")
+            self._send(200, json.dumps(payload, ensure_ascii=False).encode("utf-8"), "application/json")
+
+        def _send(self, status: int, body: bytes, content_type: str):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def start_standin_server(port: int = 0, latency: float = 0.0):
+    """在背景執行緒啟動假成績頁，回傳 (server, site, base_url)；用完呼叫 server.shutdown()"""
+    site = StandinSite(latency)
+    server = ThreadingHTTPServer(("127.0.0.1", port), make_handler(site))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, site, f"http://127.0.0.1:{server.server_address[1]}/"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="本機假成績頁（scrap_result HTTP 後端測試用）")
+    parser.add_argument("--port", type=int, default=8901)
+    parser.add_argument("--latency", type=float, default=50, help="每個成績頁請求的延遲毫秒數")
+    args = parser.parse_args()
+
+    server, _, base_url = start_standin_server(args.port, args.latency / 1000)
+    print(f"🏁 假成績頁：{base_url}（Ctrl+C 結束）")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()